@@ -1,15 +1,14 @@
 from crewai import Agent
-from langchain_google_genai import ChatGoogleGenerativeAI
+from agents.llm import get_llm
+from config.settings import settings
 
-formatting_agent = Agent(
-    role="Answer Formatter",
-    goal="Format a concise, exam-ready answer",
-    backstory=(
-        "You convert verified content into clear student-friendly answers."
-    ),
-    llm=ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        temperature=0.1
-    ),
-    verbose=True
-)
+def make_formatting_agent(on_token=None):
+    return Agent(
+        role="Answer Formatter",
+        goal="Format a concise, exam-ready answer",
+        backstory=(
+            "You convert verified content into clear student-friendly answers."
+        ),
+        llm=get_llm("formatter", on_token),
+        verbose=settings.qa_verbose
+    )
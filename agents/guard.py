@@ -1,15 +1,14 @@
 from crewai import Agent
-from langchain_google_genai import ChatGoogleGenerativeAI
+from agents.llm import get_llm
+from config.settings import settings
 
-guard_agent = Agent(
-    role="Confidence Guard",
-    goal="Decide whether the answer is reliable enough to return",
-    backstory=(
-        "You block weak or hallucinated answers."
-    ),
-    llm=ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        temperature=0.1
-    ),
-    verbose=True
-)
+def make_guard_agent():
+    return Agent(
+        role="Confidence Guard",
+        goal="Decide whether the answer is reliable enough to return",
+        backstory=(
+            "You block weak or hallucinated answers."
+        ),
+        llm=get_llm("guard"),
+        verbose=settings.qa_verbose
+    )
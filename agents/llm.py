@@ -0,0 +1,291 @@
+import hashlib
+import json
+import os
+import threading
+import time
+from collections import Counter
+from functools import lru_cache
+
+from typing import Callable, Optional
+
+from crewai.llms.base_llm import BaseLLM, call_stop_override, call_stream_override
+
+import metrics
+from config.settings import settings
+
+# Replies of the stub LLM per agent role. Tests may change them, e.g.
+# STUB_REPLIES["guard"] = "NO_CONFIDENT_ANSWER" to exercise a rejection.
+STUB_REPLIES = {
+    "researcher": "A binary search tree keeps smaller keys in the left subtree "
+                  "and larger keys in the right subtree.",
+    "validator": "The answer is correct and complete.",
+    "guard": "ANSWER_ACCEPTED",
+    "reviewer": '{"verdict": "ACCEPT", "issues": []}',
+    "formatter": "A binary search tree (BST) is a binary tree where every node's "
+                 "left subtree holds smaller keys and its right subtree larger keys.",
+}
+STUB_CALLS = Counter()  # stub LLM calls per role
+_calls_lock = threading.Lock()
+
+
+class RateLimiter:
+    """Spaces calls at least 60 / rpm seconds apart, across threads"""
+
+    def __init__(self, rpm, clock=time.monotonic, sleep=time.sleep):
+        self.interval = 60.0 / rpm
+        self.clock = clock
+        self.sleep = sleep
+        self._next = 0.0
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        with self._lock:
+            now = self.clock()
+            start = max(now, self._next)
+            self._next = start + self.interval
+        if start > now:
+            self.sleep(start - now)
+
+
+@lru_cache(maxsize=None)
+def rate_limiter(rpm):
+    """The process-wide limiter for `rpm` LLM requests per minute"""
+    return RateLimiter(rpm)
+
+
+class FinalAnswerStreamer:
+    """Passes an agent's streamed tokens to `on_token`, from its Final Answer on.
+
+    crewai agents reply "Thought: ... Final Answer: <answer>"; everything up
+    to the "Final Answer:" marker is held back.
+    """
+
+    marker = "Final Answer:"
+
+    def __init__(self, on_token):
+        self.on_token = on_token
+        self._buffer = ""
+        self._answering = False
+
+    def feed(self, token):
+        if not self._answering:
+            self._buffer += token
+            if self.marker not in self._buffer:
+                return
+            self._answering = True
+            token = self._buffer.split(self.marker, 1)[1]
+        if not self._buffer:
+            self.on_token(token)
+            return
+        # Still skipping the whitespace after the marker
+        token = token.lstrip()
+        if token:
+            self._buffer = ""
+            self.on_token(token)
+
+
+class RoleLLM(BaseLLM):
+    """The LLM of one agent role, in the form crewai agents take it.
+
+    crewai invokes call(); subclasses produce the reply in _complete().
+    Every call first waits for `limiter` (settings.llm_rpm), is reported
+    to metrics.py with its latency and token counts, and with `on_token`
+    streams the agent's final answer. `on_token` must not raise: crewai
+    retries LLM calls that fail.
+    """
+
+    role: str
+    on_token: Optional[Callable[[str], None]] = None
+    limiter: Optional[RateLimiter] = None
+
+    def call(self, messages, tools=None, callbacks=None, available_functions=None,
+             from_task=None, from_agent=None, response_model=None):
+        if isinstance(messages, str):
+            messages = [{"role": "user", "content": messages}]
+        if self.limiter is not None:
+            self.limiter.acquire()  # before the clock starts: waiting is not latency
+        streamer = FinalAnswerStreamer(self.on_token) if self.on_token else None
+        start = time.perf_counter()
+        reply, usage = self._complete(messages, streamer)
+        seconds = time.perf_counter() - start
+        if usage is None:
+            usage = (_estimate_tokens(_prompt(messages)), _estimate_tokens(reply))
+        metrics.record_llm_call(self.role, seconds, *usage)
+        return self._apply_stop_words(reply)
+
+    def _complete(self, messages, streamer):
+        """(reply, (prompt tokens, completion tokens)) for `messages`.
+
+        The usage is None when the model does not report it; it is then
+        estimated at ~4 characters per token. Models that stream feed the
+        reply's tokens to `streamer` when it is set.
+        """
+        raise NotImplementedError
+
+
+class StubLLM(RoleLLM):
+    """Offline stand-in for Gemini: a canned reply per role after `delay` seconds.
+
+    Streamed, the reply comes word by word with the delay spread over them.
+    """
+
+    delay: float = 0.0
+
+    def _complete(self, messages, streamer):
+        with _calls_lock:
+            STUB_CALLS[self.role] += 1
+        reply = "Final Answer: " + STUB_REPLIES[self.role]
+        if streamer is None:
+            if self.delay:
+                time.sleep(self.delay)
+            return reply, None
+        words = reply.split(" ")
+        for i, word in enumerate(words):
+            if self.delay:
+                time.sleep(self.delay / len(words))
+            streamer.feed(word if i == 0 else " " + word)
+        return reply, None
+
+
+class RecordedLLM(RoleLLM):
+    """Records Gemini replies to a JSONL file, or replays them offline.
+
+    Replies are keyed by role and prompt, so a replayed crew run sees the
+    same conversation it was recorded from. Replay sleeps for the recorded
+    latency, which keeps timing comparisons meaningful.
+    """
+
+    path: str
+    replay: bool = True
+
+    def _complete(self, messages, streamer):
+        key = hashlib.sha256(f"{self.role}\n{_prompt(messages)}".encode("utf-8")).hexdigest()
+        if self.replay:
+            recording = _recordings(self.path).get(key)
+            if recording is None:
+                raise KeyError(f"No recorded reply for this {self.role} prompt in {self.path}; "
+                               "record it first with QA_LLM=record")
+            time.sleep(recording["latency"])
+            usage = recording.get("usage")
+            return recording["reply"], tuple(usage) if usage else None
+
+        start = time.perf_counter()
+        reply, usage = _gemini_call(messages, self.stop_sequences)
+        latency = time.perf_counter() - start
+        entry = {"key": key, "role": self.role, "reply": reply,
+                 "latency": round(latency, 3), "usage": usage}
+        with _calls_lock:
+            with open(self.path, "a") as f:
+                f.write(json.dumps(entry) + "\n")
+            _recordings(self.path)[key] = entry
+        return reply, usage
+
+
+class GeminiLLM(RoleLLM):
+    """Gemini through crewai's native provider (LLM(model="gemini/..."))"""
+
+    def _complete(self, messages, streamer):
+        return _gemini_call(messages, self.stop_sequences, streamer)
+
+
+def _estimate_tokens(text):
+    return max(1, round(len(text) / 4)) if text else 0
+
+
+def _prompt(messages):
+    return "\n".join(str(message.get("content") or "") for message in messages)
+
+
+@lru_cache(maxsize=None)
+def _recordings(path):
+    recordings = {}
+    if os.path.exists(path):
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                recordings[entry["key"]] = entry
+    return recordings
+
+
+def get_llm(role, on_token=None):
+    """LLM for an agent role, as selected by settings.llm_provider.
+
+    With `on_token` the LLM streams, and the tokens of the agent's final
+    answer are passed to it as they are generated. Models that cannot
+    stream (recordings) answer in one piece and `on_token` is not called.
+    With settings.llm_rpm set, calls wait for the shared rate limiter.
+    """
+    options = {"role": role, "on_token": on_token}
+    if settings.llm_rpm:
+        options["limiter"] = rate_limiter(settings.llm_rpm)
+    if settings.llm_provider == "stub":
+        return StubLLM(model="stub", delay=settings.stub_llm_delay, **options)
+    if settings.llm_provider in ("record", "replay"):
+        return RecordedLLM(model=f"gemini/{settings.llm_model}", path=settings.llm_recordings,
+                           replay=settings.llm_provider == "replay", **options)
+    return GeminiLLM(model=f"gemini/{settings.llm_model}",
+                     temperature=settings.llm_temperature, **options)
+
+
+# Gemini clients, one per thread: reused across calls and crew runs, and
+# the token counters of a client only ever cover one call at a time
+_clients = threading.local()
+
+
+def _gemini_client():
+    client = getattr(_clients, "gemini", None)
+    if client is None:
+        from crewai import LLM
+        client = _clients.gemini = LLM(model=f"gemini/{settings.llm_model}",
+                                       temperature=settings.llm_temperature)
+    return client
+
+
+def _gemini_call(messages, stop=None, streamer=None):
+    """One Gemini call: (reply, (prompt tokens, completion tokens) or None)"""
+    client = _gemini_client()
+    before = client.get_token_usage_summary()
+    with call_stop_override(client, stop or None), \
+            call_stream_override(client, streamer is not None):
+        if streamer is None:
+            reply = client.call(messages)
+        else:
+            _listen_for_chunks()
+            _clients.streamer = (client, streamer)
+            try:
+                reply = client.call(messages)
+            finally:
+                _clients.streamer = None
+    usage = client.get_token_usage_summary().delta_since(before)
+    if not usage.successful_requests:
+        return reply, None
+    return reply, (usage.prompt_tokens, usage.completion_tokens)
+
+
+@lru_cache(maxsize=None)
+def _listen_for_chunks():
+    from crewai.events import LLMStreamChunkEvent, crewai_event_bus
+
+    @crewai_event_bus.on(LLMStreamChunkEvent)
+    def forward(source, event):
+        # The bus delivers stream chunks synchronously, on the calling thread
+        client, streamer = getattr(_clients, "streamer", None) or (None, None)
+        if source is client and event.tool_call is None:
+            streamer.feed(event.chunk)
+
+
+def stub_embed(text, dim=256):
+    """Offline embedding: hashed bag of words (shared words -> similar vectors)"""
+    vector = [0.0] * dim
+    for word in text.lower().split():
+        digest = hashlib.md5(word.encode("utf-8")).digest()
+        vector[int.from_bytes(digest[:4], "little") % dim] += 1.0
+    return vector
+
+
+def get_embedder():
+    """text -> vector function for the semantic answer cache"""
+    if settings.llm_provider == "stub":
+        return stub_embed
+    from langchain_google_genai import GoogleGenerativeAIEmbeddings
+    return GoogleGenerativeAIEmbeddings(model=settings.embedding_model).embed_query
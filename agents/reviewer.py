@@ -0,0 +1,15 @@
+from crewai import Agent
+from agents.llm import get_llm
+from config.settings import settings
+
+def make_review_agent():
+    return Agent(
+        role="Answer Reviewer",
+        goal="Check an answer and decide whether it is reliable enough to return",
+        backstory=(
+            "You review answers like a strict GCTC examiner "
+            "and block weak or hallucinated ones."
+        ),
+        llm=get_llm("reviewer"),
+        verbose=settings.qa_verbose
+    )
@@ -1,15 +1,14 @@
 from crewai import Agent
-from langchain_google_genai import ChatGoogleGenerativeAI
+from agents.llm import get_llm
+from config.settings import settings
 
-validation_agent = Agent(
-    role="Answer Validator",
-    goal="Verify correctness and identify gaps or mistakes",
-    backstory=(
-        "You review answers like a strict GCTC examiner."
-    ),
-    llm=ChatGoogleGenerativeAI(
-        model="gemini-2.5-flash",
-        temperature=0.1
-    ),
-    verbose=True
-)
+def make_validation_agent():
+    return Agent(
+        role="Answer Validator",
+        goal="Verify correctness and identify gaps or mistakes",
+        backstory=(
+            "You review answers like a strict GCTC examiner."
+        ),
+        llm=get_llm("validator"),
+        verbose=settings.qa_verbose
+    )
@@ -0,0 +1,116 @@
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+
+
+class AnswerCache:
+    """TTL + LRU cache of crew answers keyed by normalized question.
+
+    Confident answers live for `ttl` seconds, low-confidence outcomes
+    only for `low_confidence_ttl` (the crew may do better on a retry). At
+    most `max_entries` confident answers are kept, and separately at most
+    `max_low_confidence_entries` low-confidence ones, so a run of
+    unanswerable questions cannot evict good answers; in each the least
+    recently used go first.
+
+    With an `embedder` (text -> vector) a miss on the exact key falls back
+    to the most similar cached question, if its cosine similarity reaches
+    `similarity_threshold`. Entries put with a `scope` (e.g. the crew
+    profile) only match lookups in the same scope.
+    """
+
+    def __init__(self, max_entries=1024, ttl=86400, low_confidence_ttl=300,
+                 embedder=None, similarity_threshold=0.92, clock=time.monotonic,
+                 max_low_confidence_entries=128):
+        self.max_entries = max_entries
+        self.max_low_confidence_entries = max_low_confidence_entries
+        self.ttl = ttl
+        self.low_confidence_ttl = low_confidence_ttl
+        self.embedder = embedder
+        self.similarity_threshold = similarity_threshold
+        self.clock = clock
+        # key -> (answer, low_confidence, expires, embedding, scope), for
+        # confident answers and low-confidence outcomes respectively
+        self._entries = OrderedDict()
+        self._low = OrderedDict()
+        self._lock = threading.Lock()
+        self.counts = {"exact": 0, "semantic": 0, "miss": 0}
+
+    @property
+    def semantic(self):
+        return self.embedder is not None
+
+    def embed(self, key):
+        vector = np.asarray(self.embedder(key), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def _expire(self, now):
+        for store in (self._entries, self._low):
+            stale = [key for key, entry in store.items() if entry[2] <= now]
+            for key in stale:
+                del store[key]
+
+    def get(self, key):
+        """Cached answer for an exact key, or None"""
+        with self._lock:
+            store = self._entries if key in self._entries else self._low
+            entry = store.get(key)
+            if entry is None:
+                return None
+            if entry[2] <= self.clock():
+                del store[key]
+                return None
+            store.move_to_end(key)
+            return entry[0]
+
+    def get_similar(self, embedding, scope=None):
+        """Answer of the most similar cached question above the threshold, or None"""
+        with self._lock:
+            self._expire(self.clock())
+            candidates = [(store, key) for store in (self._entries, self._low)
+                          for key, entry in store.items()
+                          if entry[3] is not None and entry[4] == scope]
+            if candidates:
+                matrix = np.stack([store[key][3] for store, key in candidates])
+                scores = matrix @ embedding
+                store, key = candidates[int(np.argmax(scores))]
+                if scores.max() >= self.similarity_threshold:
+                    store.move_to_end(key)
+                    return store[key][0]
+            return None
+
+    def count(self, outcome):
+        """Record a lookup outcome ("exact", "semantic" or "miss")"""
+        with self._lock:
+            self.counts[outcome] += 1
+
+    def put(self, key, answer, low_confidence=False, embedding=None, scope=None):
+        if low_confidence:
+            ttl, store, other, limit = (self.low_confidence_ttl, self._low, self._entries,
+                                        self.max_low_confidence_entries)
+        else:
+            ttl, store, other, limit = self.ttl, self._entries, self._low, self.max_entries
+        with self._lock:
+            other.pop(key, None)
+            store[key] = (answer, low_confidence, self.clock() + ttl, embedding, scope)
+            store.move_to_end(key)
+            while len(store) > limit:
+                store.popitem(last=False)
+
+    def stats(self):
+        with self._lock:
+            hits = self.counts["exact"] + self.counts["semantic"]
+            lookups = hits + self.counts["miss"]
+            return {
+                "size": len(self._entries) + len(self._low),
+                "low_confidence": len(self._low),
+                "max_entries": self.max_entries,
+                "max_low_confidence_entries": self.max_low_confidence_entries,
+                "exact_hits": self.counts["exact"],
+                "semantic_hits": self.counts["semantic"],
+                "misses": self.counts["miss"],
+                "hit_rate": hits / lookups if lookups else 0.0,
+            }
@@ -1,21 +1,115 @@
-from fastapi import FastAPI
-from crew import run_crew
+import json
+import time
+from contextlib import contextmanager
+
+from fastapi import FastAPI, HTTPException
+from fastapi.responses import PlainTextResponse, StreamingResponse
+import metrics
+from crew import PROFILES
+from qa_service import QAService, QueueFull, QueueTimeout
 
 app = FastAPI()
+qa_service = QAService()
 
 @app.post("/qa")
-def qa(payload: dict):
+async def qa(payload: dict):
+    question, profile = _question(payload)
+    start = time.perf_counter()
+    with _service_errors():
+        answer = _answer(*await qa_service.ask(question, profile))
+    _observe("/qa", start, answer)
+    return answer
+
+@app.post("/qa/stream")
+async def qa_stream(payload: dict):
+    """Server-Sent Events: started, stage..., token..., then answer.
+
+    Errors before the first event (bad question or profile, queue full or
+    timed out) are plain HTTP errors, as for /qa.
+    """
+    question, profile = _question(payload)
+    start = time.perf_counter()
+    events = qa_service.stream(question, profile)
+    with _service_errors():
+        first = await events.__anext__()
+
+    async def body():
+        try:
+            event = first
+            while True:
+                yield _sse(*event)
+                if event[0] == "answer":
+                    _observe("/qa/stream", start, _answer(*event[1]))
+                event = await events.__anext__()
+        except StopAsyncIteration:
+            pass
+        finally:
+            # The client went away or the stream ended: stop the crew
+            await events.aclose()
+
+    return StreamingResponse(body(), media_type="text/event-stream",
+                             headers={"Cache-Control": "no-cache"})
+
+def _sse(event, data):
+    if event == "answer":
+        data = _answer(*data)
+    elif event == "token":
+        data = {"text": data}
+    elif event == "started":
+        data = {"profile": data}
+    else:
+        data = {event: data}
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+def _observe(endpoint, start, answer):
+    metrics.REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint=endpoint,
+                                    confidence=answer["confidence"],
+                                    cached=str(answer["cached"]).lower())
+
+def _question(payload):
     question = payload.get("question")
+    if not question:
+        raise HTTPException(status_code=400, detail="question is required")
+    profile = payload.get("profile")  # "full" or "fast"; default from settings
+    if profile is not None and profile not in PROFILES:
+        raise HTTPException(status_code=400, detail=f"Unknown profile: {profile}")
+    return question, profile
 
-    result = run_crew(question)
+@contextmanager
+def _service_errors():
+    try:
+        yield
+    except QueueFull:
+        raise HTTPException(
+            status_code=429,
+            detail="Too many questions in progress, retry shortly",
+            headers={"Retry-After": "1"}
+        )
+    except QueueTimeout:
+        raise HTTPException(
+            status_code=503,
+            detail="Answering service is saturated, retry later",
+            headers={"Retry-After": "5"}
+        )
 
-    if "NO_CONFIDENT_ANSWER" in str(result):
+def _answer(answer, confidence, cached):
+    if confidence != "high":
         return {
             "answer": "No confident answer available.",
-            "confidence": "low"
+            "confidence": "low",
+            "cached": cached
         }
 
     return {
-        "answer": str(result),
-        "confidence": "high"
+        "answer": answer,
+        "confidence": "high",
+        "cached": cached
     }
+
+@app.get("/qa/status")
+def qa_status():
+    return qa_service.status()
+
+@app.get("/metrics", response_class=PlainTextResponse)
+def qa_metrics():
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
@@ -0,0 +1,153 @@
+"""
+Offline batch answering of a question bank.
+
+    python batch.py questions.txt answers.jsonl --concurrency 4 --rpm 60
+
+Questions come one per line, or as JSONL objects with "question" and an
+optional "id". Crews run concurrently (--concurrency) while every LLM call
+goes through one shared requests-per-minute limit (--rpm). A question
+failing on a provider rate limit is retried with exponential backoff.
+
+Each answer is appended to the output JSONL as soon as it is ready. Run
+the same command again after a crash or Ctrl-C and questions already
+answered in the output are skipped; failed ones are tried again.
+"""
+
+import argparse
+import json
+import os
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+from config.settings import settings
+from qa_service import normalize_question
+
+RATE_LIMIT_ERRORS = ("ResourceExhausted", "TooManyRequests", "RateLimitError")
+
+
+def load_questions(path):
+    """[(id, question)] from a text file (one per line) or JSONL"""
+    questions = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            if line.startswith("{"):
+                entry = json.loads(line)
+                question = entry["question"]
+                questions.append((str(entry.get("id") or normalize_question(question)), question))
+            else:
+                questions.append((normalize_question(line), line))
+    return questions
+
+
+def answered_ids(path):
+    """Ids already answered in an output file (a torn last line is ignored)"""
+    done = set()
+    if not os.path.exists(path):
+        return done
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue
+            if "answer" in entry:
+                done.add(entry["id"])
+    return done
+
+
+def is_rate_limited(error):
+    """True for 429-style provider errors, which are worth retrying later"""
+    return type(error).__name__ in RATE_LIMIT_ERRORS or "429" in str(error)
+
+
+def answer_question(question, profile=None, runner=None, retries=5, backoff=2.0, sleep=time.sleep):
+    """Run one question, retrying rate-limited runs; returns (result, attempts)"""
+    if runner is None:
+        from crew import run_crew as runner
+    for attempt in range(retries + 1):
+        try:
+            return runner(question, profile), attempt + 1
+        except Exception as e:
+            if attempt == retries or not is_rate_limited(e):
+                raise
+            # Exponential backoff with jitter, so workers do not retry in lockstep
+            sleep(min(60.0, backoff * 2 ** attempt) * random.uniform(0.5, 1.0))
+
+
+def run_batch(questions, output, profile=None, concurrency=4, retries=5, backoff=2.0,
+              runner=None, sleep=time.sleep):
+    """Answer (id, question) pairs into the output JSONL, skipping answered ids.
+
+    Returns counts of answered, failed and skipped questions.
+    """
+    done = answered_ids(output)
+    todo = []
+    for qid, question in questions:
+        if qid not in done:
+            done.add(qid)  # the same question twice in the bank runs once
+            todo.append((qid, question))
+    summary = {"answered": 0, "failed": 0, "skipped": len(questions) - len(todo)}
+    lock = threading.Lock()
+
+    def work(qid, question):
+        start = time.perf_counter()
+        entry = {"id": qid, "question": question, "profile": profile or settings.qa_profile}
+        try:
+            result, entry["attempts"] = answer_question(question, profile, runner,
+                                                        retries, backoff, sleep)
+            entry["answer"] = str(result)
+            entry["confidence"] = getattr(result, "confidence", None)
+        except Exception as e:
+            entry["error"] = f"{type(e).__name__}: {e}"
+        entry["seconds"] = round(time.perf_counter() - start, 3)
+        with lock:
+            f.write(json.dumps(entry, ensure_ascii=False) + "\n")
+            f.flush()
+            summary["failed" if "error" in entry else "answered"] += 1
+
+    with open(output, "a", encoding="utf-8") as f:
+        with ThreadPoolExecutor(concurrency, thread_name_prefix="batch") as pool:
+            futures = [pool.submit(work, qid, question) for qid, question in todo]
+            try:
+                for future in as_completed(futures):
+                    future.result()
+            except KeyboardInterrupt:
+                # Finished answers are already on disk; rerun to resume
+                pool.shutdown(wait=True, cancel_futures=True)
+                raise
+    return summary
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("questions", help="Text file (one question per line) or JSONL")
+    parser.add_argument("output", help="JSONL file answers are appended to")
+    parser.add_argument("--profile", choices=["full", "fast"], help="Crew profile (default: settings)")
+    parser.add_argument("--concurrency", type=int, default=settings.qa_max_concurrency,
+                        help="Crews running at once")
+    parser.add_argument("--rpm", type=int, default=settings.llm_rpm,
+                        help="LLM requests per minute across all crews (0 = no limit)")
+    parser.add_argument("--retries", type=int, default=5,
+                        help="Retries of a question hitting a rate limit (default: 5)")
+    parser.add_argument("--backoff", type=float, default=2.0,
+                        help="First retry delay in seconds, doubled each retry (default: 2)")
+    args = parser.parse_args()
+
+    settings.llm_rpm = args.rpm
+    questions = load_questions(args.questions)
+    start = time.perf_counter()
+    summary = run_batch(questions, args.output, args.profile, args.concurrency,
+                        args.retries, args.backoff)
+    elapsed = time.perf_counter() - start
+    print(f"{summary['answered']} answered, {summary['failed']} failed, "
+          f"{summary['skipped']} already done in {elapsed:.1f}s -> {args.output}")
+
+
+if __name__ == "__main__":
+    main()
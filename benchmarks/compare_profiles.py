@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""
+Latency / quality comparison of the crew profiles ("full" vs "fast").
+
+Runs every question through each profile and reports per profile:
+  - latency mean / p50 / p95, LLM calls and tokens per question
+  - share of NO_CONFIDENT_ANSWER outcomes
+  - agreement with the first profile's accept/reject decision
+  - answer similarity to the first profile's answer (bag-of-words cosine)
+
+Runs offline by default against the stub LLM (--stub-delay simulates the
+per-call latency). With --llm record it runs against Gemini and saves the
+replies, and --llm replay reruns them offline with the recorded latency:
+
+    QA_LLM_RECORDINGS=recordings.jsonl python benchmarks/compare_profiles.py --llm record
+    QA_LLM_RECORDINGS=recordings.jsonl python benchmarks/compare_profiles.py --llm replay
+"""
+
+import argparse
+import json
+import math
+import os
+import sys
+import time
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+QUESTIONS = [
+    "What is Binary search tree?",
+    "What is a stack and how does it differ from a queue?",
+    "Explain Ohm's law.",
+    "What is the time complexity of merge sort?",
+    "What does the TCP three-way handshake do?",
+    "What is normalization in databases?",
+]
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    return ordered[min(len(ordered) - 1, int(math.ceil(pct / 100 * len(ordered))) - 1)]
+
+
+def similarity(a, b):
+    from agents.llm import stub_embed
+    va, vb = stub_embed(a), stub_embed(b)
+    dot = sum(x * y for x, y in zip(va, vb))
+    norm = math.sqrt(sum(x * x for x in va)) * math.sqrt(sum(y * y for y in vb))
+    return dot / norm if norm else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--questions", help="File with one question per line")
+    parser.add_argument("--profiles", nargs="+", default=["full", "fast"])
+    parser.add_argument("--llm", choices=["stub", "record", "replay", "gemini"], default="stub")
+    parser.add_argument("--stub-delay", type=float, default=0.3,
+                        help="Seconds per stub LLM call (default: 0.3)")
+    parser.add_argument("--output", help="Write per-question results as JSON")
+    args = parser.parse_args()
+
+    # Settings read the environment on import
+    os.environ["QA_LLM"] = args.llm
+    os.environ["QA_STUB_DELAY"] = str(args.stub_delay)
+    os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+    from crew import run_crew
+
+    questions = QUESTIONS
+    if args.questions:
+        with open(args.questions) as f:
+            questions = [line.strip() for line in f if line.strip()]
+
+    runs = {}
+    for profile in args.profiles:
+        runs[profile] = []
+        for question in questions:
+            start = time.perf_counter()
+            result = run_crew(question, profile)
+            runs[profile].append({
+                "question": question,
+                "latency": time.perf_counter() - start,
+                "confidence": result.confidence,
+                "llm_calls": result.trace["llm_calls"],
+                "tokens": result.trace["prompt_tokens"] + result.trace["completion_tokens"],
+                "answer": result.answer,
+            })
+
+    reference = runs[args.profiles[0]]
+    print(f"{len(questions)} questions, LLM: {args.llm}\n")
+    print(f"{'profile':>8} {'mean s':>8} {'p50 s':>8} {'p95 s':>8} {'calls':>6} "
+          f"{'tokens':>7} {'low conf':>9} {'agree':>6} {'similar':>8}")
+    for profile, results in runs.items():
+        latencies = [r["latency"] for r in results]
+        agree = sum(r["confidence"] == ref["confidence"] for r, ref in zip(results, reference))
+        both = [(r, ref) for r, ref in zip(results, reference) if r["answer"] and ref["answer"]]
+        similar = sum(similarity(r["answer"], ref["answer"]) for r, ref in both) / max(1, len(both))
+        low = sum(r["confidence"] == "low" for r in results)
+        print(f"{profile:>8} {sum(latencies) / len(latencies):>8.2f} {percentile(latencies, 50):>8.2f} "
+              f"{percentile(latencies, 95):>8.2f} {sum(r['llm_calls'] for r in results) / len(results):>6.1f} "
+              f"{sum(r['tokens'] for r in results) / len(results):>7.0f} {low / len(results):>9.0%} {agree / len(results):>6.0%} {similar:>8.2f}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump({"llm": args.llm, "runs": runs}, f, indent=2)
+        print(f"\nResults written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,28 @@
+"""
+Configuration for the QA crew and API (override with environment variables)
+"""
+
+import os
+
+
+class Settings:
+    llm_provider = os.getenv("QA_LLM", "gemini")  # "gemini", "stub", "record" or "replay"
+    llm_recordings = os.getenv("QA_LLM_RECORDINGS", "llm_recordings.jsonl")  # record/replay file
+    llm_model = os.getenv("QA_LLM_MODEL", "gemini-2.5-flash")
+    llm_temperature = float(os.getenv("QA_LLM_TEMPERATURE", "0.1"))
+    llm_rpm = int(os.getenv("QA_LLM_RPM", "0"))  # LLM requests per minute, all crews; 0 = no limit
+    qa_profile = os.getenv("QA_PROFILE", "full")  # "full" (4 LLM calls) or "fast" (2 calls)
+    stub_llm_delay = float(os.getenv("QA_STUB_DELAY", "0"))  # seconds per stub LLM call
+    qa_max_concurrency = int(os.getenv("QA_MAX_CONCURRENCY", "4"))  # crews running at once
+    qa_max_queue = int(os.getenv("QA_MAX_QUEUE", "16"))  # questions waiting; beyond -> 429
+    qa_queue_timeout = float(os.getenv("QA_QUEUE_TIMEOUT", "30"))  # seconds waiting; beyond -> 503
+    qa_cache_size = int(os.getenv("QA_CACHE_SIZE", "1024"))  # answers kept; 0 disables the cache
+    qa_cache_ttl = float(os.getenv("QA_CACHE_TTL", "86400"))  # seconds a confident answer is reused
+    qa_cache_low_confidence_ttl = float(os.getenv("QA_CACHE_LOW_CONFIDENCE_TTL", "300"))
+    qa_cache_low_confidence_size = int(os.getenv("QA_CACHE_LOW_CONFIDENCE_SIZE", "128"))  # kept apart
+    qa_semantic_cache = os.getenv("QA_SEMANTIC_CACHE", "0") == "1"  # also match paraphrased questions
+    qa_semantic_threshold = float(os.getenv("QA_SEMANTIC_THRESHOLD", "0.92"))  # cosine similarity
+    qa_verbose = os.getenv("QA_VERBOSE", "0") == "1"  # crewai console logging of every step
+    embedding_model = os.getenv("QA_EMBEDDING_MODEL", "models/embedding-001")
+
+settings = Settings()
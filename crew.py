@@ -1,11 +1,105 @@
+import json
+
+import metrics
 from crewai import Crew, Task
-from agents.researcher import research_agent
-from agents.validator import validation_agent
-from agents.formatter import formatting_agent
-from agents.guard import guard_agent
+from agents.researcher import make_research_agent
+from agents.validator import make_validation_agent
+from agents.formatter import make_formatting_agent
+from agents.guard import make_guard_agent
+from agents.reviewer import make_review_agent
+from config.settings import settings
+
+NO_CONFIDENT_ANSWER = "NO_CONFIDENT_ANSWER"
+STAGES = ("research", "validation", "guard", "formatting")
+FAST_STAGES = ("research", "review")
+PROFILES = ("full", "fast")
+
+
+class CrewCancelled(Exception):
+    """Raised by an on_event callback to stop the rest of a crew run"""
+
+
+class CrewResult:
+    """Outcome of a crew run.
+
+    str() gives the formatted answer, or NO_CONFIDENT_ANSWER when the guard
+    rejected it, so callers that string-match the result keep working.
+    """
+
+    def __init__(self, answer, confidence, stages):
+        self.answer = answer
+        self.confidence = confidence  # "high" or "low"
+        self.stages = stages  # names of the stages that ran
+        self.trace = None  # stage timings and LLM usage, see metrics.trace()
+
+    def __str__(self):
+        return self.answer if self.confidence == "high" else NO_CONFIDENT_ANSWER
+
+    def __repr__(self):
+        return f"CrewResult(confidence={self.confidence!r}, stages={self.stages!r})"
+
 
+def _run_stage(stage, agent, task):
+    """Run one task as its own single-agent crew, returns its output text"""
+    crew = Crew(agents=[agent], tasks=[task], verbose=settings.qa_verbose)
+    with metrics.span(stage, agent.role):
+        return str(crew.kickoff())
 
-def run_crew(question: str):
+
+def run_crew(question: str, profile: str = None, on_event=None):
+    """Answer a question with the "full" or "fast" profile (default: settings).
+
+    `on_event(event, data)` is called with ("stage", name) as each stage
+    finishes and, in the full profile, ("token", text) as the formatter
+    generates the answer. It may raise CrewCancelled to stop the run: from
+    a stage event the remaining stages are skipped; from a token event the
+    token is dropped and the run stops when the formatting stage ends.
+    """
+    profile = profile or settings.qa_profile
+    on_event = on_event or _ignore_event
+    if profile not in PROFILES:
+        raise ValueError(f"Unknown profile: {profile}")
+    run = _run_fast if profile == "fast" else _run_full
+    with metrics.trace(profile=profile) as trace:
+        result = run(question, on_event)
+        trace["confidence"] = result.confidence
+    result.trace = trace
+    metrics.CREW_SECONDS.observe(trace["seconds"], profile=profile, confidence=result.confidence)
+    return result
+
+
+def _ignore_event(event, data):
+    pass
+
+
+def _token_forwarder(on_event):
+    # Tokens are delivered from inside crewai, which would take
+    # CrewCancelled for a failed LLM call and retry it; cancellation is
+    # left to the stage event that follows
+    def forward(text):
+        try:
+            on_event("token", text)
+        except CrewCancelled:
+            pass
+    return forward
+
+
+def _run_full(question, on_event):
+    """Research, validate, guard, then format - stopping early on rejection.
+
+    Each stage is its own crew run, with the earlier tasks it needs passed
+    as context. If the guard answers NO_CONFIDENT_ANSWER the formatter is
+    never called and a low-confidence CrewResult is returned.
+    """
+    # Fresh agents per run: crewai keeps the current task on the agent,
+    # so concurrent runs (see qa_service.py) must not share them
+    research_agent = make_research_agent()
+    validation_agent = make_validation_agent()
+    guard_agent = make_guard_agent()
+    if on_event is _ignore_event:
+        formatting_agent = make_formatting_agent()
+    else:
+        formatting_agent = make_formatting_agent(_token_forwarder(on_event))
 
     research_task = Task(
         description=f"""
@@ -29,7 +123,8 @@ def run_crew(question: str):
         A validated and corrected version of the answer,
         or a statement that the answer is weak or incorrect.
         """,
-        agent=validation_agent
+        agent=validation_agent,
+        context=[research_task]
     )
 
     guard_task = Task(
@@ -45,7 +140,8 @@ def run_crew(question: str):
         Either NO_CONFIDENT_ANSWER
         or a confirmation that the answer is acceptable.
         """,
-        agent=guard_agent
+        agent=guard_agent,
+        context=[validation_task]
     )
 
     formatting_task = Task(
@@ -56,23 +152,85 @@ def run_crew(question: str):
         expected_output="""
         A clean, well-structured final answer suitable for students.
         """,
-        agent=formatting_agent
+        agent=formatting_agent,
+        context=[validation_task]
+    )
+
+    _run_stage("research", research_agent, research_task)
+    on_event("stage", "research")
+    _run_stage("validation", validation_agent, validation_task)
+    on_event("stage", "validation")
+    verdict = _run_stage("guard", guard_agent, guard_task)
+    on_event("stage", "guard")
+    rejected = NO_CONFIDENT_ANSWER in verdict
+    metrics.GUARD_OUTCOMES.inc(stage="guard", outcome="rejected" if rejected else "accepted")
+    if rejected:
+        return CrewResult(None, "low", list(STAGES[:3]))
+
+    answer = _run_stage("formatting", formatting_agent, formatting_task)
+    on_event("stage", "formatting")
+    return CrewResult(answer, "high", list(STAGES))
+
+
+def _run_fast(question, on_event):
+    """Two LLM calls instead of four.
+
+    The researcher writes the student-ready answer directly (formatting
+    folded in), and one reviewer call does validation and guarding,
+    replying with a JSON verdict. The answer is not streamed as tokens,
+    since it is only reviewed after it has been written.
+    """
+    research_agent = make_research_agent()
+    review_agent = make_review_agent()
+
+    research_task = Task(
+        description=f"""
+        Research and write a clear academic answer for the question:
+        "{question}"
+
+        Do not guess. Use correct academic reasoning.
+        Write it as a concise, student-friendly, exam-ready explanation.
+        """,
+        expected_output="""
+        A clean, well-structured final answer suitable for students.
+        """,
+        agent=research_agent
     )
 
-    crew = Crew(
-        agents=[
-            research_agent,
-            validation_agent,
-            guard_agent,
-            formatting_agent
-        ],
-        tasks=[
-            research_task,
-            validation_task,
-            guard_task,
-            formatting_task
-        ],
-        verbose=True
+    review_task = Task(
+        description="""
+        Check the answer for correctness, completeness and logical
+        soundness, and decide whether it is reliable enough to be
+        shown to students.
+
+        Respond ONLY with a JSON object:
+        {"verdict": "ACCEPT" or "NO_CONFIDENT_ANSWER", "issues": [...]}
+        """,
+        expected_output="""
+        {"verdict": "ACCEPT", "issues": []}
+        or {"verdict": "NO_CONFIDENT_ANSWER", "issues": ["..."]}
+        """,
+        agent=review_agent,
+        context=[research_task]
     )
 
-    return crew.kickoff()
+    answer = _run_stage("research", research_agent, research_task)
+    on_event("stage", "research")
+    verdict = _review_verdict(_run_stage("review", review_agent, review_task))
+    on_event("stage", "review")
+    rejected = verdict == NO_CONFIDENT_ANSWER
+    metrics.GUARD_OUTCOMES.inc(stage="review", outcome="rejected" if rejected else "accepted")
+    if rejected:
+        return CrewResult(None, "low", list(FAST_STAGES))
+    return CrewResult(answer, "high", list(FAST_STAGES))
+
+
+def _review_verdict(output):
+    """"ACCEPT" or NO_CONFIDENT_ANSWER from the reviewer's JSON reply"""
+    try:
+        review = json.loads(output[output.index("{"):output.rindex("}") + 1])
+        verdict = str(review.get("verdict", "")).upper()
+    except (ValueError, AttributeError):
+        # Not a JSON object: fall back to the guard's plain-text convention
+        verdict = output
+    return NO_CONFIDENT_ANSWER if NO_CONFIDENT_ANSWER in verdict else "ACCEPT"
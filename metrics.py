@@ -0,0 +1,174 @@
+"""
+Prometheus-style metrics and per-run traces for the QA service.
+
+Metrics are plain counters and histograms rendered in the Prometheus text
+format on /metrics. A trace records, for one crew run, the wall time of
+each stage and the LLM calls and tokens it used; finished traces are
+logged as JSON on the "qa.trace" logger.
+"""
+
+import json
+import logging
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+logger = logging.getLogger("qa.trace")
+
+SECONDS_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 20, 30, 60, 120)
+TOKEN_BUCKETS = (16, 32, 64, 128, 256, 512, 1024, 2048, 4096, 8192, 16384)
+
+
+def _labels(names, values):
+    if not names:
+        return ""
+    escaped = (str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+               for value in values)
+    return "{" + ",".join(f'{name}="{value}"' for name, value in zip(names, escaped)) + "}"
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels):
+        return self._values.get(tuple(str(labels[name]) for name in self.labels), 0)
+
+    def samples(self):
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                yield f"{self.name}{_labels(self.labels, key)} {value:g}"
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(self, name, help, labels=(), buckets=SECONDS_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        self._series = {}  # label values -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value, **labels):
+        key = tuple(str(labels[name]) for name in self.labels)
+        with self._lock:
+            series = self._series.setdefault(key, [0] * (len(self.buckets) + 2))
+            bucket = bisect_left(self.buckets, value)
+            if bucket < len(self.buckets):
+                series[bucket] += 1
+            series[-2] += value
+            series[-1] += 1
+
+    def count(self, **labels):
+        series = self._series.get(tuple(str(labels[name]) for name in self.labels))
+        return series[-1] if series else 0
+
+    def samples(self):
+        names = self.labels + ("le",)
+        with self._lock:
+            for key, series in sorted(self._series.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, series):
+                    cumulative += n
+                    yield f"{self.name}_bucket{_labels(names, key + (f'{bound:g}',))} {cumulative}"
+                yield f"{self.name}_bucket{_labels(names, key + ('+Inf',))} {series[-1]}"
+                yield f"{self.name}_sum{_labels(self.labels, key)} {series[-2]:g}"
+                yield f"{self.name}_count{_labels(self.labels, key)} {series[-1]}"
+
+
+REQUEST_SECONDS = Histogram("qa_request_seconds", "Time to answer a /qa request",
+                            ("endpoint", "confidence", "cached"))
+CREW_SECONDS = Histogram("qa_crew_seconds", "Wall time of a crew run", ("profile", "confidence"))
+STAGE_SECONDS = Histogram("qa_stage_seconds", "Wall time of a crew stage (task)",
+                          ("stage", "agent"))
+LLM_SECONDS = Histogram("qa_llm_seconds", "Latency of one LLM call", ("role",))
+PROMPT_TOKENS = Histogram("qa_llm_prompt_tokens", "Prompt tokens per LLM call", ("role",),
+                          TOKEN_BUCKETS)
+COMPLETION_TOKENS = Histogram("qa_llm_completion_tokens", "Completion tokens per LLM call",
+                              ("role",), TOKEN_BUCKETS)
+CACHE_LOOKUPS = Counter("qa_cache_lookups_total", "Answer cache lookups by outcome", ("outcome",))
+GUARD_OUTCOMES = Counter("qa_guard_outcomes_total", "Guard / reviewer decisions",
+                         ("stage", "outcome"))
+
+REGISTRY = (REQUEST_SECONDS, CREW_SECONDS, STAGE_SECONDS, LLM_SECONDS, PROMPT_TOKENS,
+            COMPLETION_TOKENS, CACHE_LOOKUPS, GUARD_OUTCOMES)
+
+
+def render():
+    """All metrics in the Prometheus text exposition format"""
+    lines = []
+    for metric in REGISTRY:
+        lines.append(f"# HELP {metric.name} {metric.help}")
+        lines.append(f"# TYPE {metric.name} {metric.kind}")
+        lines.extend(metric.samples())
+    return "\n".join(lines) + "\n"
+
+
+# The trace and stage of the crew run in progress. Context variables, not
+# thread locals: crewai makes an agent's LLM calls on threads of its own,
+# which start from a copy of the calling context
+_trace = ContextVar("trace", default=None)
+_span = ContextVar("span", default=None)
+
+
+@contextmanager
+def trace(**fields):
+    """Trace a crew run; yields the trace dict, logged when the run ends"""
+    record = {**fields, "stages": [], "llm_calls": 0, "prompt_tokens": 0,
+              "completion_tokens": 0}
+    token = _trace.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["error"] = type(e).__name__
+        raise
+    finally:
+        _trace.reset(token)
+        record["seconds"] = round(time.perf_counter() - start, 3)
+        logger.info(json.dumps(record))
+
+
+@contextmanager
+def span(stage, agent):
+    """Time one crew stage; LLM calls made meanwhile are attributed to it"""
+    record = {"stage": stage, "agent": agent, "llm_calls": 0, "prompt_tokens": 0,
+              "completion_tokens": 0}
+    current = _trace.get()
+    if current is not None:
+        current["stages"].append(record)
+    token = _span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    finally:
+        _span.reset(token)
+        seconds = time.perf_counter() - start
+        record["seconds"] = round(seconds, 3)
+        STAGE_SECONDS.observe(seconds, stage=stage, agent=agent)
+
+
+def record_llm_call(role, seconds, prompt_tokens, completion_tokens):
+    LLM_SECONDS.observe(seconds, role=role)
+    PROMPT_TOKENS.observe(prompt_tokens, role=role)
+    COMPLETION_TOKENS.observe(completion_tokens, role=role)
+    for record in (_trace.get(), _span.get()):
+        if record is not None:
+            record["llm_calls"] += 1
+            record["prompt_tokens"] += prompt_tokens
+            record["completion_tokens"] += completion_tokens
@@ -0,0 +1,234 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+
+import metrics
+from answer_cache import AnswerCache
+from config.settings import settings
+from crew import PROFILES, CrewCancelled, run_crew
+
+
+class QueueFull(Exception):
+    """Every crew slot is busy and the wait queue is at capacity"""
+
+
+class QueueTimeout(Exception):
+    """A question waited longer than the queue timeout for a crew slot"""
+
+
+def normalize_question(question: str):
+    """Key for coalescing: case, spacing and trailing punctuation ignored"""
+    return " ".join(question.lower().split()).rstrip("?!. ")
+
+
+class _EventRelay:
+    """Carries crew events from the worker thread to an asyncio queue.
+
+    Once closed, events raise CrewCancelled in the crew, which stops the
+    run at the next stage boundary (see run_crew).
+    """
+
+    def __init__(self, loop):
+        self.loop = loop
+        self.queue = asyncio.Queue()
+        self.closed = threading.Event()
+
+    def __call__(self, event, data):
+        if self.closed.is_set():
+            raise CrewCancelled("stream closed")
+        self.loop.call_soon_threadsafe(self.queue.put_nowait, (event, data))
+
+
+class QAService:
+    """Runs crews off the event loop with bounded concurrency.
+
+    At most `max_concurrency` crews run at once, each on a worker thread
+    (crewai is synchronous). Up to `max_queue` more questions may wait for
+    a slot; beyond that ask() raises QueueFull, and a question that waits
+    longer than `queue_timeout` seconds raises QueueTimeout.
+
+    Concurrent asks for the same normalized question share one crew run.
+    The run is shielded, so a caller that disconnects does not cancel it
+    for the others. Finished answers go into `cache` (an AnswerCache, by
+    default configured from settings), which is consulted first.
+
+    Answers are (answer, confidence) pairs taken from the CrewResult the
+    runner returns: confidence is "high", or "low" with answer None when
+    the crew found no confident answer.
+
+    stream() answers one question with progress events under the same
+    limits, for /qa/stream.
+    """
+
+    def __init__(self, runner=None, max_concurrency=None, max_queue=None, queue_timeout=None,
+                 cache=None):
+        self.runner = runner or run_crew
+        self.max_concurrency = max_concurrency or settings.qa_max_concurrency
+        self.max_queue = settings.qa_max_queue if max_queue is None else max_queue
+        self.queue_timeout = queue_timeout or settings.qa_queue_timeout
+        self._executor = ThreadPoolExecutor(self.max_concurrency, thread_name_prefix="crew")
+        self._slots = asyncio.Semaphore(self.max_concurrency)
+        self._inflight = {}
+        self.admitted = 0  # distinct runs running or waiting for a slot
+        self.running = 0
+        self.stats = {"runs": 0, "coalesced": 0, "rejected": 0, "timed_out": 0,
+                      "cancelled": 0}
+        self.cache = default_cache() if cache is None else cache
+
+    async def ask(self, question: str, profile: str = None):
+        """Answer a question with a crew profile, returns (answer, confidence, cached).
+
+        Served from the cache when possible, otherwise joins an identical
+        in-flight run or starts a new one. Profiles are cached and
+        coalesced separately.
+        """
+        profile, text, key = self._key(question, profile)
+        embedding = None
+        if self.cache:
+            outcome, embedding = await self._lookup(key, text, profile)
+            if outcome is not None:
+                return (*outcome, True)
+        task = self._inflight.get(key)
+        if task is not None:
+            self.stats["coalesced"] += 1
+        else:
+            self._admit()
+            task = asyncio.ensure_future(self._run(question, profile, key, embedding))
+            self._inflight[key] = task
+            task.add_done_callback(partial(self._finished, key))
+        return (*await asyncio.shield(task), False)
+
+    async def stream(self, question: str, profile: str = None):
+        """Answer a question as a stream of (event, data) pairs.
+
+        Yields ("started", profile) once a crew slot is free, ("stage",
+        name) as each stage finishes, ("token", text) as the formatter
+        writes the answer, and finally ("answer", (answer, confidence,
+        cached)). A cached answer is yielded at once. Streams are not coalesced, each gets its own
+        run; closing the generator (the client went away) stops that run
+        at its next stage.
+        """
+        profile, text, key = self._key(question, profile)
+        embedding = None
+        if self.cache:
+            outcome, embedding = await self._lookup(key, text, profile)
+            if outcome is not None:
+                yield "answer", (*outcome, True)
+                return
+        self._admit()
+        relay = _EventRelay(asyncio.get_running_loop())
+        task = asyncio.ensure_future(self._run(question, profile, key, embedding, relay))
+        task.add_done_callback(self._stream_finished)
+        try:
+            while True:
+                getter = asyncio.ensure_future(relay.queue.get())
+                await asyncio.wait({getter, task}, return_when=asyncio.FIRST_COMPLETED)
+                if not getter.done():
+                    getter.cancel()
+                    break
+                yield getter.result()
+            # The task finished, but events it queued just before may remain
+            while not relay.queue.empty():
+                yield relay.queue.get_nowait()
+            yield "answer", (*task.result(), False)
+        finally:
+            relay.closed.set()
+
+    def _key(self, question, profile):
+        profile = profile or settings.qa_profile
+        if profile not in PROFILES:
+            raise ValueError(f"Unknown profile: {profile}")
+        text = normalize_question(question)
+        return profile, text, f"{profile}:{text}"
+
+    def _admit(self):
+        # Counted here, not when the run starts, so a burst of arrivals
+        # cannot all slip past the limit
+        if self.admitted >= self.max_concurrency + self.max_queue:
+            self.stats["rejected"] += 1
+            raise QueueFull(f"{self.waiting} questions already waiting")
+        self.admitted += 1
+
+    async def _lookup(self, key, text, profile):
+        """Cached (answer, confidence) or None, plus the question's embedding
+        if the cache is semantic"""
+        outcome = self.cache.get(key)
+        if outcome is not None:
+            self._count_lookup("exact")
+            return outcome, None
+        embedding = None
+        if self.cache.semantic and key not in self._inflight:
+            loop = asyncio.get_running_loop()
+            embedding = await loop.run_in_executor(None, self.cache.embed, text)
+            outcome = self.cache.get_similar(embedding, scope=profile)
+            if outcome is not None:
+                self._count_lookup("semantic")
+                return outcome, embedding
+        self._count_lookup("miss")
+        return None, embedding
+
+    def _count_lookup(self, outcome):
+        self.cache.count(outcome)
+        metrics.CACHE_LOOKUPS.inc(outcome=outcome)
+
+    def _finished(self, key, task):
+        self._inflight.pop(key, None)
+        self.admitted -= 1
+        if not task.cancelled():
+            task.exception()  # retrieved even when every caller has gone away
+
+    def _stream_finished(self, task):
+        self.admitted -= 1
+        if not task.cancelled() and isinstance(task.exception(), CrewCancelled):
+            self.stats["cancelled"] += 1
+
+    @property
+    def waiting(self):
+        return self.admitted - self.running
+
+    async def _run(self, question, profile, key, embedding, on_event=None):
+        try:
+            await asyncio.wait_for(self._slots.acquire(), self.queue_timeout)
+        except asyncio.TimeoutError:
+            self.stats["timed_out"] += 1
+            raise QueueTimeout(f"no crew slot within {self.queue_timeout:g}s")
+
+        self.running += 1
+        try:
+            runner = partial(self.runner, question, profile)
+            if on_event is not None:
+                on_event("started", profile)  # raises if the stream closed while queued
+                runner = partial(runner, on_event=on_event)
+            self.stats["runs"] += 1
+            loop = asyncio.get_running_loop()
+            result = await loop.run_in_executor(self._executor, runner)
+        finally:
+            self.running -= 1
+            self._slots.release()
+        outcome = (result.answer, result.confidence)
+        if self.cache:
+            self.cache.put(key, outcome, result.confidence != "high", embedding, scope=profile)
+        return outcome
+
+    def status(self):
+        status = {"running": self.running, "waiting": self.waiting,
+                  "max_concurrency": self.max_concurrency, "max_queue": self.max_queue,
+                  **self.stats}
+        if self.cache:
+            status["cache"] = self.cache.stats()
+        return status
+
+
+def default_cache():
+    """AnswerCache from settings, or False when disabled (qa_cache_size = 0)"""
+    if settings.qa_cache_size <= 0:
+        return False
+    embedder = None
+    if settings.qa_semantic_cache:
+        from agents.llm import get_embedder
+        embedder = get_embedder()
+    return AnswerCache(settings.qa_cache_size, settings.qa_cache_ttl,
+                       settings.qa_cache_low_confidence_ttl, embedder,
+                       settings.qa_semantic_threshold,
+                       max_low_confidence_entries=settings.qa_cache_low_confidence_size)
@@ -1,5 +1,8 @@
+import os
+
 from dotenv import load_dotenv
 load_dotenv()
+os.environ.setdefault("QA_VERBOSE", "1")  # show every agent step on the console
 
 from crew import run_crew
 
@@ -18,7 +21,7 @@ def test_question(question: str):
     print("\n🧠 RAW RESULT:")
     print(result)
 
-    if "NO_CONFIDENT_ANSWER" in str(result):
+    if result.confidence == "low":
         print("\n📊 FINAL DECISION: LOW CONFIDENCE")
     else:
         print("\n📊 FINAL DECISION: HIGH CONFIDENCE")
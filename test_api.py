@@ -0,0 +1,269 @@
+import asyncio
+import gc
+import json
+import os
+import time
+from typing import Optional
+
+# Offline: every agent gets the stub LLM (agents/llm.py)
+os.environ.setdefault("QA_LLM", "stub")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+import httpx
+import pytest
+
+import api
+import metrics
+from agents.llm import STUB_CALLS, STUB_REPLIES, RoleLLM, stub_embed
+from answer_cache import AnswerCache
+from crew import NO_CONFIDENT_ANSWER
+from config.settings import settings
+from qa_service import QAService
+
+
+def client():
+    return httpx.AsyncClient(transport=httpx.ASGITransport(app=api.app),
+                             base_url="http://test", timeout=60)
+
+
+async def post_many(questions):
+    async with client() as c:
+        return await asyncio.gather(*(c.post("/qa", json={"question": q}) for q in questions))
+
+
+def test_single_question():
+    responses = asyncio.run(post_many(["What is a binary search tree?"]))
+    body = responses[0].json()
+    assert responses[0].status_code == 200 and body["confidence"] == "high", \
+        f"/qa answers with the stub LLM: {body}"
+
+
+def test_profiles():
+    async def ask(payload):
+        async with client() as c:
+            return await c.post("/qa", json=payload)
+    fast = asyncio.run(ask({"question": "What is a queue?", "profile": "fast"}))
+    bad = asyncio.run(ask({"question": "What is a queue?", "profile": "slow"}))
+    assert fast.status_code == 200 and fast.json()["confidence"] == "high", \
+        "/qa accepts profile=fast"
+    assert bad.status_code == 400, f"unknown profile is rejected: {bad.json()}"
+
+
+def test_crew_errors_are_not_client_errors(monkeypatch):
+    def broken(question, profile=None, on_event=None):
+        raise ValueError("agent construction failed")
+    monkeypatch.setattr(api, "qa_service", QAService(runner=broken, cache=False))
+
+    async def ask():
+        transport = httpx.ASGITransport(app=api.app, raise_app_exceptions=False)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as c:
+            return await c.post("/qa", json={"question": "What is a graph?"})
+    response = asyncio.run(ask())
+    assert response.status_code == 500, f"a failing crew run is a server error: {response.status_code}"
+
+
+def test_abandoned_run_error_is_retrieved():
+    def broken(question, profile=None, on_event=None):
+        time.sleep(0.1)
+        raise ValueError("crew failed")
+    service = QAService(runner=broken, cache=False)
+    unretrieved = []
+
+    async def abandon():
+        loop = asyncio.get_running_loop()
+        loop.set_exception_handler(lambda loop, context: unretrieved.append(context))
+        caller = asyncio.ensure_future(service.ask("What is a graph?"))
+        await asyncio.sleep(0.02)
+        caller.cancel()  # the client disconnected; the shielded run goes on
+        while service.admitted:
+            await asyncio.sleep(0.02)
+        gc.collect()
+    asyncio.run(abandon())
+    assert not unretrieved, f"no 'exception was never retrieved' for the abandoned run: {unretrieved}"
+
+
+def test_coalescing(monkeypatch):
+    monkeypatch.setattr(settings, "stub_llm_delay", 0.2)
+    monkeypatch.setattr(api, "qa_service", QAService())
+    before = STUB_CALLS["researcher"]
+    questions = ["What is a heap?", "what is a HEAP", "  What is a heap ?"] * 2
+    responses = asyncio.run(post_many(questions))
+    runs = STUB_CALLS["researcher"] - before
+    assert all(r.status_code == 200 for r in responses), "all duplicate requests answered"
+    assert runs == 1, f"6 duplicate questions share 1 crew run (got {runs})"
+
+
+def test_backpressure(monkeypatch):
+    monkeypatch.setattr(settings, "stub_llm_delay", 0.2)
+    monkeypatch.setattr(api, "qa_service", QAService(max_concurrency=1, max_queue=1))
+    responses = asyncio.run(post_many([f"Question {i}?" for i in range(4)]))
+    codes = sorted(r.status_code for r in responses)
+    assert codes == [200, 200, 429, 429], f"1 running + 1 queued, rest get 429: {codes}"
+    assert responses[-1].headers.get("retry-after") == "1", "429 carries Retry-After"
+
+
+def test_queue_timeout(monkeypatch):
+    monkeypatch.setattr(settings, "stub_llm_delay", 0.3)
+    monkeypatch.setattr(api, "qa_service",
+                        QAService(max_concurrency=1, max_queue=8, queue_timeout=0.5))
+    responses = asyncio.run(post_many([f"Slow question {i}?" for i in range(3)]))
+    codes = sorted(r.status_code for r in responses)
+    assert 503 in codes and 200 in codes, f"questions waiting past the timeout get 503: {codes}"
+
+
+def test_answer_cache(monkeypatch):
+    monkeypatch.setattr(api, "qa_service", QAService())
+    before = STUB_CALLS["researcher"]
+    first = asyncio.run(post_many(["What is a stack?"]))[0].json()
+    second = asyncio.run(post_many(["what is a STACK"]))[0].json()
+    runs = STUB_CALLS["researcher"] - before
+    assert not first["cached"] and second["cached"] and runs == 1, \
+        f"repeated question served from cache ({runs} crew run)"
+    assert second["answer"] == first["answer"], "cached answer matches the original"
+
+    async def status():
+        async with client() as c:
+            return (await c.get("/qa/status")).json()
+    stats = asyncio.run(status())["cache"]
+    assert stats["hit_rate"] == 0.5, f"hit rate exposed on /qa/status: {stats}"
+
+
+def test_low_confidence(monkeypatch):
+    monkeypatch.setattr(api, "qa_service", QAService())
+    monkeypatch.setitem(STUB_REPLIES, "guard", NO_CONFIDENT_ANSWER)
+    first = asyncio.run(post_many(["What is the airspeed of a swallow?"]))[0].json()
+    second = asyncio.run(post_many(["What is the airspeed of a swallow?"]))[0].json()
+    assert first["confidence"] == "low" and first["answer"] == "No confident answer available.", \
+        f"guard rejection is a low-confidence answer: {first}"
+    assert second["cached"] and second["confidence"] == "low", \
+        f"confidence survives the cache: {second}"
+    assert api.qa_service.cache.stats()["low_confidence"] == 1, "cached with the short TTL"
+
+
+def test_cache_ttls():
+    now = [0.0]
+    cache = AnswerCache(max_entries=2, ttl=100, low_confidence_ttl=10, clock=lambda: now[0])
+    cache.put("good", "answer")
+    cache.put("weak", "NO_CONFIDENT_ANSWER", low_confidence=True)
+    now[0] = 50
+    assert cache.get("good") == "answer" and cache.get("weak") is None, \
+        "NO_CONFIDENT_ANSWER expires sooner than confident answers"
+    cache.put("a", "1")
+    cache.put("b", "2")
+    assert cache.get("good") is None and cache.stats()["size"] == 2, \
+        "least recently used entries are evicted at max_entries"
+
+
+def test_low_confidence_entries_are_kept_apart():
+    cache = AnswerCache(max_entries=4, max_low_confidence_entries=2)
+    for i in range(4):
+        cache.put(f"good {i}", f"answer {i}")
+    for i in range(10):
+        cache.put(f"weak {i}", NO_CONFIDENT_ANSWER, low_confidence=True)
+    stats = cache.stats()
+    assert all(cache.get(f"good {i}") == f"answer {i}" for i in range(4)), \
+        "low-confidence outcomes do not evict confident answers"
+    assert (stats["size"], stats["low_confidence"]) == (6, 2), \
+        f"low-confidence outcomes have their own, smaller LRU: {stats}"
+    cache.put("weak 9", "answer")
+    assert cache.stats()["low_confidence"] == 1 and cache.get("weak 9") == "answer", \
+        "a confident answer replaces the low-confidence entry for its key"
+
+
+def test_semantic_cache(monkeypatch):
+    cache = AnswerCache(embedder=stub_embed, similarity_threshold=0.85)
+    monkeypatch.setattr(api, "qa_service", QAService(cache=cache))
+    before = STUB_CALLS["researcher"]
+    asyncio.run(post_many(["What is a binary search tree?"]))
+    paraphrase = asyncio.run(post_many(["what is binary search tree"]))[0].json()
+    unrelated = asyncio.run(post_many(["Explain TCP congestion control"]))[0].json()
+    runs = STUB_CALLS["researcher"] - before
+    assert paraphrase["cached"] and not unrelated["cached"] and runs == 2, \
+        f"similar question hits the semantic cache, unrelated one misses ({runs} runs)"
+
+
+def test_stream(monkeypatch):
+    monkeypatch.setattr(api, "qa_service", QAService())
+
+    async def stream():
+        async with client() as c:
+            response = await c.post("/qa/stream", json={"question": "What is a trie?"})
+            return response.headers["content-type"], response.text
+    content_type, text = asyncio.run(stream())
+    events = [(block.split("\n")[0][len("event: "):],
+               json.loads(block.split("\n")[1][len("data: "):]))
+              for block in text.strip().split("\n\n")]
+    names = [name for name, _ in events]
+    stages = [data["stage"] for name, data in events if name == "stage"]
+    tokens = "".join(data["text"] for name, data in events if name == "token")
+    assert content_type.startswith("text/event-stream"), "/qa/stream answers with SSE"
+    assert names[0] == "started" and names[-1] == "answer" and names.count("token") > 1, \
+        f"started, stages, streamed tokens, then the answer: {names[:5]}..."
+    assert stages == ["research", "validation", "guard", "formatting"], f"stage events: {stages}"
+    assert tokens == STUB_REPLIES["formatter"] == events[-1][1]["answer"], \
+        "formatter tokens add up to the final answer"
+
+
+def test_stream_cancel(monkeypatch):
+    monkeypatch.setattr(settings, "stub_llm_delay", 0.2)
+    service = QAService(cache=False)
+    before = dict(STUB_CALLS)
+
+    async def leave_after_research():
+        events = service.stream("What is a red-black tree?")
+        async for event, data in events:
+            if event == "stage":
+                break
+        await events.aclose()
+        while service.admitted:  # the crew notices at its next stage
+            await asyncio.sleep(0.05)
+    asyncio.run(leave_after_research())
+    called = {role: STUB_CALLS[role] - before.get(role, 0) for role in STUB_REPLIES}
+    assert called["guard"] == 0 and called["formatter"] == 0, \
+        f"closing the stream stops the remaining stages: {called}"
+    assert service.stats["cancelled"] == 1, "cancelled run counted"
+
+
+def test_metrics(monkeypatch):
+    monkeypatch.setattr(api, "qa_service", QAService())
+    asyncio.run(post_many(["What is a linked list?", "What is a linked list?"]))
+
+    async def scrape():
+        async with client() as c:
+            return (await c.get("/metrics")).text
+    text = asyncio.run(scrape())
+    samples = dict(line.rsplit(" ", 1) for line in text.splitlines() if not line.startswith("#"))
+    assert 'qa_stage_seconds_count{stage="formatting",agent="Answer Formatter"}' in samples, \
+        "per-stage latency histogram on /metrics"
+    assert (float(samples['qa_llm_completion_tokens_count{role="researcher"}']) >= 1
+            and float(samples['qa_llm_prompt_tokens_sum{role="researcher"}']) > 0), \
+        "LLM calls and token counts per role"
+    assert (float(samples['qa_cache_lookups_total{outcome="exact"}']) >= 1
+            and float(samples['qa_guard_outcomes_total{stage="guard",outcome="accepted"}']) >= 1), \
+        "cache and guard outcomes counted"
+    assert samples.get('qa_request_seconds_bucket{endpoint="/qa",confidence="high",'
+                       'cached="true",le="+Inf"}') is not None, \
+        "request latency labelled by endpoint, confidence and cache"
+
+
+class CannedLLM(RoleLLM):
+    reply: str
+    reported: Optional[tuple] = None
+
+    def _complete(self, messages, streamer):
+        return self.reply, self.reported
+
+
+def test_reported_token_usage():
+    prompt = [{"role": "user", "content": "p" * 80}]
+    with metrics.trace() as trace:
+        CannedLLM(model="canned", role="researcher", reply="short", reported=(1234, 56)).call(prompt)
+    assert (trace["prompt_tokens"], trace["completion_tokens"]) == (1234, 56), \
+        f"provider usage is used when reported: {trace}"
+    with metrics.trace() as trace:
+        CannedLLM(model="canned", role="researcher", reply="x" * 40).call(prompt)
+    assert (trace["llm_calls"], trace["prompt_tokens"], trace["completion_tokens"]) == (1, 20, 10), \
+        f"~4 characters per token otherwise: {trace}"
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__]))
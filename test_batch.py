@@ -0,0 +1,110 @@
+import os
+import tempfile
+import time
+
+# Offline: every agent gets the stub LLM (agents/llm.py)
+os.environ.setdefault("QA_LLM", "stub")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from agents.llm import STUB_CALLS, RateLimiter, StubLLM
+from batch import answered_ids, load_questions, run_batch
+from config.settings import settings
+
+
+class ResourceExhausted(Exception):
+    """Stands in for google.api_core's 429 error"""
+
+
+def write_questions(directory, questions):
+    path = os.path.join(directory, "questions.txt")
+    with open(path, "w") as f:
+        f.write("\n".join(questions) + "\n")
+    return load_questions(path)
+
+
+def test_batch_with_crews():
+    with tempfile.TemporaryDirectory() as tmp:
+        questions = write_questions(tmp, [f"What is data structure number {i}?" for i in range(8)])
+        output = os.path.join(tmp, "answers.jsonl")
+        before = STUB_CALLS["researcher"]
+        summary = run_batch(questions, output, concurrency=4)
+        assert summary == {"answered": 8, "failed": 0, "skipped": 0}, \
+            f"whole bank answered: {summary}"
+        assert STUB_CALLS["researcher"] - before == 8 and len(answered_ids(output)) == 8, \
+            "one crew run and one JSONL line per question"
+
+
+def test_resume():
+    with tempfile.TemporaryDirectory() as tmp:
+        questions = write_questions(tmp, ["What is a stack?", "What is a queue?", "What is a heap?"])
+        output = os.path.join(tmp, "answers.jsonl")
+
+        def flaky(question, profile):
+            if "queue" in question:
+                raise RuntimeError("crew crashed")
+            return "answer to " + question
+        first = run_batch(questions, output, runner=flaky)
+        with open(output, "a") as f:
+            f.write('{"id": "torn')  # a crash mid-write
+
+        asked = []
+        second = run_batch(questions, output, runner=lambda q, p: asked.append(q) or "ok")
+        assert first["answered"] == 2 and first["failed"] == 1, f"failure recorded: {first}"
+        assert asked == ["What is a queue?"] and second["skipped"] == 2, \
+            f"rerun only retries the unanswered question: {asked}"
+
+
+def test_rate_limit_retry():
+    with tempfile.TemporaryDirectory() as tmp:
+        questions = write_questions(tmp, ["What is a trie?"])
+        calls, pauses = [], []
+
+        def limited(question, profile):
+            calls.append(question)
+            if len(calls) < 3:
+                raise ResourceExhausted("429 Resource has been exhausted")
+            return "a trie is a prefix tree"
+        summary = run_batch(questions, os.path.join(tmp, "answers.jsonl"), runner=limited,
+                            backoff=1.0, sleep=pauses.append)
+        assert summary["answered"] == 1 and len(calls) == 3, \
+            "rate-limited question retried until it succeeds"
+        assert len(pauses) == 2 and pauses[1] > pauses[0] * 0.9 and pauses[0] <= 1.0, \
+            f"exponential backoff between retries: {[round(p, 2) for p in pauses]}"
+
+
+def test_rate_limiter():
+    now, pauses = [0.0], []
+    limiter = RateLimiter(120, clock=lambda: now[0], sleep=pauses.append)
+    for _ in range(3):
+        limiter.acquire()
+    assert pauses == [0.5, 1.0], f"120 rpm spaces calls 0.5s apart: {pauses}"
+
+
+def test_rpm_limits_crew_llm_calls():
+    calls = []
+    complete = StubLLM._complete
+
+    def timed(self, messages, streamer):
+        calls.append(time.monotonic())
+        return complete(self, messages, streamer)
+    rpm = settings.llm_rpm
+    StubLLM._complete = timed
+    settings.llm_rpm = 600  # one call per 0.1s
+    try:
+        with tempfile.TemporaryDirectory() as tmp:
+            questions = write_questions(tmp, [f"What is sorting algorithm {i}?" for i in range(4)])
+            summary = run_batch(questions, os.path.join(tmp, "answers.jsonl"), concurrency=4)
+    finally:
+        StubLLM._complete = complete
+        settings.llm_rpm = rpm
+    busiest = max(sum(t <= other < t + 0.5 for other in calls) for t in calls)
+    assert summary["answered"] == 4 and len(calls) == 16, f"4 stages per question: {len(calls)}"
+    assert busiest <= 6, f"600 rpm allows ~5 LLM calls per 0.5s across crews: {busiest}"
+
+
+if __name__ == "__main__":
+    test_batch_with_crews()
+    test_resume()
+    test_rate_limit_retry()
+    test_rate_limiter()
+    test_rpm_limits_crew_llm_calls()
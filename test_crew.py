@@ -0,0 +1,62 @@
+import os
+
+# Offline: every agent gets the stub LLM (agents/llm.py)
+os.environ.setdefault("QA_LLM", "stub")
+os.environ.setdefault("OTEL_SDK_DISABLED", "true")
+
+from agents.llm import STUB_CALLS, STUB_REPLIES
+from crew import NO_CONFIDENT_ANSWER, STAGES, run_crew
+
+
+def test_accepted_answer_is_formatted():
+    STUB_CALLS.clear()
+    result = run_crew("What is a binary search tree?")
+    assert result.confidence == "high" and str(result) == STUB_REPLIES["formatter"], \
+        f"accepted answer comes from the formatter: {result!r}"
+    assert STUB_CALLS["formatter"] == 1, "formatter called once"
+    stages = [(stage["stage"], stage["llm_calls"]) for stage in result.trace["stages"]]
+    assert stages == [(name, 1) for name in STAGES], f"trace has one LLM call per stage: {stages}"
+
+
+def test_guard_rejection_skips_formatter():
+    STUB_CALLS.clear()
+    accepted = STUB_REPLIES["guard"]
+    STUB_REPLIES["guard"] = NO_CONFIDENT_ANSWER
+    try:
+        result = run_crew("What is the airspeed of an unladen swallow?")
+    finally:
+        STUB_REPLIES["guard"] = accepted
+    assert result.confidence == "low" and result.answer is None, \
+        f"guard rejection returns a low-confidence result: {result!r}"
+    assert str(result) == NO_CONFIDENT_ANSWER, "str(result) is NO_CONFIDENT_ANSWER"
+    assert result.stages == ["research", "validation", "guard"], "stopped after the guard"
+    assert STUB_CALLS["guard"] == 1 and STUB_CALLS["formatter"] == 0, \
+        f"formatter never called: {dict(STUB_CALLS)}"
+    stages = [(stage["stage"], stage["llm_calls"]) for stage in result.trace["stages"]]
+    assert stages == [(name, 1) for name in STAGES[:3]] and sum(STUB_CALLS.values()) == 3, \
+        f"no formatting crew is kicked off: {stages}"
+
+
+def test_fast_profile():
+    STUB_CALLS.clear()
+    result = run_crew("What is a binary search tree?", profile="fast")
+    assert result.confidence == "high" and result.stages == ["research", "review"], \
+        f"fast profile answers in two stages: {result!r}"
+    assert sum(STUB_CALLS.values()) == 2, f"fast profile makes 2 LLM calls: {dict(STUB_CALLS)}"
+
+    rejected = STUB_REPLIES["reviewer"]
+    STUB_REPLIES["reviewer"] = '{"verdict": "NO_CONFIDENT_ANSWER", "issues": ["vague"]}'
+    STUB_CALLS.clear()
+    try:
+        result = run_crew("What is a binary search tree?", profile="fast")
+    finally:
+        STUB_REPLIES["reviewer"] = rejected
+    assert result.confidence == "low", "reviewer JSON verdict can reject the answer"
+    assert result.stages == ["research", "review"] and sum(STUB_CALLS.values()) == 2, \
+        f"a rejected fast run still makes 2 LLM calls: {dict(STUB_CALLS)}"
+
+
+if __name__ == "__main__":
+    test_accepted_answer_is_formatted()
+    test_guard_rejection_skips_formatter()
+    test_fast_profile()
@@ -0,0 +1,79 @@
+#!/usr/bin/env python3
+"""
+Recall@k vs QPS for the IVF index against the exact VectorStore.
+
+Uses synthetic CLIP-like data: 512-d unit vectors drawn around a few
+hundred topic directions, with queries perturbed from held-out points.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from storage.vector_store import VectorStore
+from storage.ivf_index import IVFIndex
+
+
+def clip_like(rng, n, dim, topics, spread=0.6):
+    """Clustered unit vectors, roughly how page embeddings group by topic"""
+    centers = rng.standard_normal((topics, dim)).astype(np.float32)
+    centers /= np.linalg.norm(centers, axis=1, keepdims=True)
+    labels = rng.integers(0, topics, size=n)
+    noise = rng.standard_normal((n, dim)).astype(np.float32) * (spread / np.sqrt(dim))
+    data = centers[labels] + noise
+    return data / np.linalg.norm(data, axis=1, keepdims=True)
+
+
+def run(search, queries, top_k):
+    start = time.perf_counter()
+    results = [[doc_id for doc_id, _ in search(q, top_k)] for q in queries]
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def recall(approx, exact):
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approx, exact))
+    return hits / sum(len(e) for e in exact)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--topics", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", "--top-k", type=int, default=10)
+    parser.add_argument("--nlist", type=int, default=None)
+    parser.add_argument("--nprobe", type=int, nargs="+", default=[1, 2, 4, 8, 16, 32, 64])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = clip_like(rng, args.size + args.queries, args.dim, args.topics)
+    base, held_out = data[:args.size], data[args.size:]
+    queries = held_out + rng.standard_normal(held_out.shape).astype(np.float32) * 0.02
+
+    store = VectorStore()
+    store.add_many(base, [{"page": i} for i in range(args.size)])
+
+    index = IVFIndex(store, nlist=args.nlist)
+    start = time.perf_counter()
+    index.train()
+    print(f"Corpus: {args.size} x {args.dim}, nlist={index.centroids.shape[0]}, "
+          f"train {time.perf_counter() - start:.1f}s")
+
+    exact, exact_qps = run(store.search, queries, args.top_k)
+    print(f"\n{'mode':>12} {'recall@' + str(args.top_k):>10} {'QPS':>10} {'speedup':>8}")
+    print(f"{'exact':>12} {1.0:>10.3f} {exact_qps:>10.1f} {1.0:>7.1f}x")
+    for nprobe in args.nprobe:
+        approx, qps = run(lambda q, k: index.search(q, k, nprobe=nprobe), queries, args.top_k)
+        print(f"{'ivf/' + str(nprobe):>12} {recall(approx, exact):>10.3f} {qps:>10.1f} "
+              f"{qps / exact_qps:>7.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+#!/usr/bin/env python3
+"""
+Memory, recall@k and QPS of the compressed codecs against exact float32.
+
+Uses the same synthetic CLIP-like corpus as bench_ann.py. Each codec is
+measured without re-ranking and with the top --rerank candidates re-scored
+from the float32 rows.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from storage.vector_store import VectorStore
+from storage.compressed_index import CompressedIndex
+from bench_ann import clip_like, recall
+
+
+def run(search_many, queries, top_k):
+    start = time.perf_counter()
+    results = [[doc_id for doc_id, _ in r] for r in search_many(queries, top_k)]
+    return results, len(queries) / (time.perf_counter() - start)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=100000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--topics", type=int, default=300)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("-k", "--top-k", type=int, default=10)
+    parser.add_argument("--pq-m", type=int, nargs="+", default=[16, 32, 64])
+    parser.add_argument("--rerank", type=int, default=100)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = clip_like(rng, args.size + args.queries, args.dim, args.topics)
+    base, held_out = data[:args.size], data[args.size:]
+    queries = held_out + rng.standard_normal(held_out.shape).astype(np.float32) * 0.02
+
+    store = VectorStore()
+    store.add_many(base, [{"page": i} for i in range(args.size)])
+    full_bytes = store.embeddings.nbytes
+
+    exact, exact_qps = run(store.search_many, queries, args.top_k)
+    print(f"Corpus: {args.size} x {args.dim}, float32 rows {full_bytes / 2**20:.1f} MiB\n")
+    print(f"{'codec':>10} {'MiB':>8} {'smaller':>8} {'train s':>8} {'rerank':>7} "
+          f"{'recall@' + str(args.top_k):>10} {'QPS':>8}")
+    print(f"{'float32':>10} {full_bytes / 2**20:>8.1f} {1.0:>7.1f}x {'-':>8} {'-':>7} "
+          f"{1.0:>10.3f} {exact_qps:>8.1f}")
+
+    configs = [("float16", {}), ("int8", {})]
+    configs += [(f"pq/{m}", {"pq_m": m}) for m in args.pq_m]
+    for label, options in configs:
+        index = CompressedIndex(store, codec=label.split("/")[0], **options)
+        start = time.perf_counter()
+        index.train()
+        train_time = time.perf_counter() - start
+        memory = index.memory_bytes()
+        for rerank in (0, args.rerank):
+            approx, qps = run(lambda q, k: index.search_many(q, k, rerank=rerank),
+                              queries, args.top_k)
+            print(f"{label:>10} {memory / 2**20:>8.1f} {full_bytes / memory:>7.1f}x "
+                  f"{train_time:>8.1f} {rerank:>7} {recall(approx, exact):>10.3f} {qps:>8.1f}")
+
+
+if __name__ == "__main__":
+    main()
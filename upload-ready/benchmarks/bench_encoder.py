@@ -0,0 +1,70 @@
+#!/usr/bin/env python3
+"""
+Benchmark ClipEncoder single-item vs batched encoding.
+
+Reports images/sec and texts/sec for both paths and the largest absolute
+difference between batched and single-item embeddings.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config.settings import settings
+from encoders.clip_encoder import ClipEncoder
+
+
+def page_like_images(n, size=(1240, 1754), seed=0):
+    """Mostly-white pages with a few dark blocks, like scanned notes"""
+    rng = np.random.default_rng(seed)
+    images = []
+    for _ in range(n):
+        pixels = np.full((size[1], size[0], 3), 245, dtype=np.uint8)
+        for _ in range(20):
+            x, y = rng.integers(0, size[0] - 200), rng.integers(0, size[1] - 40)
+            pixels[y:y + 40, x:x + 200] = rng.integers(0, 80)
+        images.append(Image.fromarray(pixels))
+    return images
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.clip_model_name,
+                        help="Model name or local directory")
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--batch-size", type=int, default=settings.encode_batch_size)
+    args = parser.parse_args()
+
+    encoder = ClipEncoder(model_name=args.model, batch_size=args.batch_size)
+    images = page_like_images(args.images)
+    texts = [f"lecture notes on topic {i}" for i in range(args.images)]
+
+    single_img, t_single_img = timed(lambda: np.stack([encoder.encode_image(i) for i in images]))
+    batch_img, t_batch_img = timed(lambda: encoder.encode_images(images))
+    single_txt, t_single_txt = timed(lambda: np.stack([encoder.encode_text(t) for t in texts]))
+    batch_txt, t_batch_txt = timed(lambda: encoder.encode_texts(texts))
+
+    n = args.images
+    print(f"{'path':>16} {'single/s':>10} {'batched/s':>10} {'speedup':>8} {'max |diff|':>11}")
+    print(f"{'images':>16} {n / t_single_img:>10.1f} {n / t_batch_img:>10.1f} "
+          f"{t_single_img / t_batch_img:>7.1f}x {np.abs(single_img - batch_img).max():>11.2e}")
+    print(f"{'texts':>16} {n / t_single_txt:>10.1f} {n / t_batch_txt:>10.1f} "
+          f"{t_single_txt / t_batch_txt:>7.1f}x {np.abs(single_txt - batch_txt).max():>11.2e}")
+
+
+if __name__ == "__main__":
+    main()
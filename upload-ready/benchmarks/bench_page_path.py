@@ -0,0 +1,97 @@
+#!/usr/bin/env python3
+"""
+Per-page cost of getting from PDF page to CLIP input tensor.
+
+before: render at --dpi, PPM bytes -> BytesIO -> PIL -> CLIPProcessor
+after:  render at encoder resolution, pix.samples view -> torch preprocess
+
+Model forward time is the same for both paths and is reported separately.
+"""
+
+import argparse
+import io
+import os
+import sys
+import tempfile
+import time
+
+import fitz
+import numpy as np
+import torch
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from bench_pdf_processor import make_pdf
+from config.settings import settings
+from encoders.clip_encoder import ClipEncoder, _features
+from processors.pdf_processor import _encode_matrix, _pixmap_array
+
+
+def before(doc, encoder, dpi):
+    zoom = dpi / 72
+    matrix = fitz.Matrix(zoom, zoom)
+    tensors = []
+    for page in doc:
+        pix = page.get_pixmap(matrix=matrix)
+        img = Image.open(io.BytesIO(pix.tobytes("ppm")))
+        tensors.append(encoder.processor(images=img, return_tensors="pt")["pixel_values"])
+    return torch.cat(tensors)
+
+
+def after(doc, encoder, encode_size):
+    tensors = []
+    for page in doc:
+        pix = page.get_pixmap(matrix=_encode_matrix(page, encode_size), alpha=False)
+        tensors.append(encoder._preprocess_pixels(_pixmap_array(pix)))
+    return torch.cat(tensors)
+
+
+def per_page_ms(fn, pages, repeats):
+    best = min(_timed(fn) for _ in range(repeats))
+    return best * 1000 / pages
+
+
+def _timed(fn):
+    start = time.perf_counter()
+    fn()
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.clip_model_name,
+                        help="Model name or local directory")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--dpi", type=int, default=settings.pdf_dpi)
+    parser.add_argument("--encode-size", type=int, default=settings.encode_render_size)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    encoder = ClipEncoder(model_name=args.model)
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "bench.pdf")
+        make_pdf(pdf_path, args.pages)
+        with fitz.open(pdf_path) as doc:
+            old = per_page_ms(lambda: before(doc, encoder, args.dpi), args.pages, args.repeats)
+            new = per_page_ms(lambda: after(doc, encoder, args.encode_size), args.pages, args.repeats)
+
+            a, b = before(doc, encoder, args.dpi), after(doc, encoder, args.encode_size)
+            with torch.no_grad():
+                emb_a = _features(encoder.model.get_image_features(pixel_values=a)).numpy()
+                start = time.perf_counter()
+                emb_b = _features(encoder.model.get_image_features(pixel_values=b)).numpy()
+                model_ms = (time.perf_counter() - start) * 1000 / args.pages
+
+    cosine = (emb_a * emb_b).sum(1) / (np.linalg.norm(emb_a, axis=1) * np.linalg.norm(emb_b, axis=1))
+    print(f"{'path':>8} {'ms/page':>9}")
+    print(f"{'before':>8} {old:>9.2f}")
+    print(f"{'after':>8} {new:>9.2f}   ({old / new:.1f}x faster to tensor)")
+    print(f"{'model':>8} {model_ms:>9.2f}   (forward pass, same for both)")
+    print(f"embedding cosine before vs after: min {cosine.min():.4f}, mean {cosine.mean():.4f}")
+
+
+if __name__ == "__main__":
+    main()
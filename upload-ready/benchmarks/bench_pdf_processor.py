@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Benchmark PDFProcessor rasterization throughput against worker count.
+
+Generates a text-heavy PDF so the run is self-contained.
+"""
+
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+import fitz
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from processors.pdf_processor import PDFProcessor
+
+
+def make_pdf(path, pages, seed=0):
+    """Write a PDF of lecture-note-like pages (text lines and boxes)"""
+    doc = fitz.open()
+    for p in range(pages):
+        page = doc.new_page()
+        page.insert_text((72, 60), f"Lecture {seed}.{p}: circuits and signals", fontsize=18)
+        for line in range(40):
+            page.insert_text((72, 100 + line * 16),
+                             f"{p}-{line} Ohm's law relates voltage, current and resistance.",
+                             fontsize=10)
+        page.draw_rect(fitz.Rect(350, 600, 520, 760), color=(0, 0, 0), width=2)
+    doc.save(path)
+    doc.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--pages", type=int, default=60)
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--workers", type=int, nargs="+",
+                        default=sorted({1, 2, os.cpu_count() or 1}))
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "bench.pdf")
+        make_pdf(pdf_path, args.pages)
+
+        print(f"{args.pages} pages at {args.dpi} DPI, {os.cpu_count()} CPUs")
+        print(f"{'workers':>8} {'pages/s':>10} {'scaling':>8}")
+        base = None
+        for workers in args.workers:
+            processor = PDFProcessor(dpi=args.dpi, workers=workers)
+            start = time.perf_counter()
+            order = [page["page_num"] for page in processor.iter_pages(pdf_path)]
+            rate = args.pages / (time.perf_counter() - start)
+            assert order == list(range(args.pages)), "pages out of order"
+            base = base or rate
+            print(f"{workers:>8} {rate:>10.1f} {rate / base:>7.2f}x")
+
+
+if __name__ == "__main__":
+    main()
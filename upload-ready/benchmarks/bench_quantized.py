@@ -0,0 +1,107 @@
+#!/usr/bin/env python3
+"""
+Check the int8 ClipEncoder against fp32.
+
+Encodes the same synthetic pages and text queries with both precisions and
+reports:
+  - cosine agreement between fp32 and int8 embeddings (mean / min)
+  - retrieval overlap@k: top-k pages per query with an int8 index and int8
+    queries, and with an existing fp32 index queried in int8
+  - images/sec and texts/sec for both, and the speedup
+
+Exits with status 1 if the mean cosine or the overlap drop below the given
+thresholds, so it can gate a settings change.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from config.settings import settings
+from encoders.clip_encoder import ClipEncoder
+from storage.vector_store import VectorStore
+from bench_encoder import page_like_images
+
+
+def encode_all(encoder, images, texts):
+    encoder.encode_images(images[:1])  # load (and quantize) outside the timings
+    start = time.perf_counter()
+    image_emb = encoder.encode_images(images)
+    image_time = time.perf_counter() - start
+    start = time.perf_counter()
+    text_emb = encoder.encode_texts(texts)
+    text_time = time.perf_counter() - start
+    return image_emb, image_time, text_emb, text_time
+
+
+def cosine(a, b):
+    a = a / np.linalg.norm(a, axis=1, keepdims=True)
+    b = b / np.linalg.norm(b, axis=1, keepdims=True)
+    return np.sum(a * b, axis=1)
+
+
+def top_k(image_emb, text_emb, k):
+    store = VectorStore()
+    store.add_many(image_emb, [{}] * len(image_emb))
+    return [[doc_id for doc_id, _ in results] for results in store.search_many(text_emb, top_k=k)]
+
+
+def overlap(approx, exact):
+    hits = sum(len(set(a) & set(e)) for a, e in zip(approx, exact))
+    return hits / sum(len(e) for e in exact)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default=settings.clip_model_name,
+                        help="Model name or local directory")
+    parser.add_argument("--images", type=int, default=64)
+    parser.add_argument("--queries", type=int, default=32)
+    parser.add_argument("-k", type=int, default=5)
+    parser.add_argument("--batch-size", type=int, default=settings.encode_batch_size)
+    parser.add_argument("--min-cosine", type=float, default=0.99)
+    parser.add_argument("--min-overlap", type=float, default=0.8)
+    args = parser.parse_args()
+
+    images = page_like_images(args.images, size=(620, 877))
+    texts = [f"lecture notes on topic {i}" for i in range(args.queries)]
+
+    runs = {}
+    for precision in ("fp32", "int8"):
+        encoder = ClipEncoder(model_name=args.model, batch_size=args.batch_size,
+                              precision=precision)
+        runs[precision] = encode_all(encoder, images, texts)
+    fp32_img, fp32_img_t, fp32_txt, fp32_txt_t = runs["fp32"]
+    int8_img, int8_img_t, int8_txt, int8_txt_t = runs["int8"]
+
+    image_cos = cosine(fp32_img, int8_img)
+    text_cos = cosine(fp32_txt, int8_txt)
+    exact = top_k(fp32_img, fp32_txt, args.k)
+    int8_overlap = overlap(top_k(int8_img, int8_txt, args.k), exact)
+    mixed_overlap = overlap(top_k(fp32_img, int8_txt, args.k), exact)
+
+    n, q = args.images, args.queries
+    print(f"{'':>8} {'fp32/s':>8} {'int8/s':>8} {'speedup':>8} {'cos mean':>9} {'cos min':>8}")
+    print(f"{'images':>8} {n / fp32_img_t:>8.1f} {n / int8_img_t:>8.1f} "
+          f"{fp32_img_t / int8_img_t:>7.2f}x {image_cos.mean():>9.4f} {image_cos.min():>8.4f}")
+    print(f"{'texts':>8} {q / fp32_txt_t:>8.1f} {q / int8_txt_t:>8.1f} "
+          f"{fp32_txt_t / int8_txt_t:>7.2f}x {text_cos.mean():>9.4f} {text_cos.min():>8.4f}")
+    print(f"\noverlap@{args.k} with fp32 results: int8 index {int8_overlap:.3f}, "
+          f"fp32 index + int8 queries {mixed_overlap:.3f}")
+
+    ok = (min(image_cos.mean(), text_cos.mean()) >= args.min_cosine
+          and min(int8_overlap, mixed_overlap) >= args.min_overlap)
+    print("✅ int8 within thresholds" if ok else "❌ int8 below thresholds")
+    sys.exit(0 if ok else 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+"""
+Sharded vs single persistent index: open time, QPS and source-scoped queries.
+
+Builds the same synthetic corpus (bench_ann.clip_like, spread over
+--sources sources) as one PersistentVectorStore and as a
+ShardedVectorStore with one shard per source, then reports:
+  - time to open each index
+  - batched exact-search QPS, with the shards scored on 1..N threads
+  - QPS and shards loaded for queries filtered to a single source
+Both indexes must return identical results.
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(__file__))
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from storage.metadata_index import MetadataIndex
+from storage.persistent_store import PersistentVectorStore
+from storage.sharded_store import ShardedVectorStore
+from bench_ann import clip_like
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def ids(results):
+    return [[doc_id for doc_id, _ in r] for r in results]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--topics", type=int, default=300)
+    parser.add_argument("--sources", type=int, default=16)
+    parser.add_argument("--queries", type=int, default=64)
+    parser.add_argument("-k", "--top-k", type=int, default=10)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4, 8])
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    data = clip_like(rng, args.size + args.queries, args.dim, args.topics)
+    base, queries = data[:args.size], data[args.size:]
+    metadatas = [{"source": f"course-{i % args.sources}.pdf", "page": i // args.sources}
+                 for i in range(args.size)]
+
+    tmp = tempfile.mkdtemp(prefix="bench_sharded_")
+    try:
+        single_path, sharded_path = os.path.join(tmp, "single"), os.path.join(tmp, "sharded")
+        batch = 4096
+        single = PersistentVectorStore(single_path)
+        sharded = ShardedVectorStore(sharded_path, shard_by="source")
+        for start in range(0, args.size, batch):
+            single.add_many(base[start:start + batch], metadatas[start:start + batch])
+            sharded.add_many(base[start:start + batch], metadatas[start:start + batch])
+        del single, sharded
+
+        single, single_open = timed(lambda: PersistentVectorStore(single_path))
+        sharded, sharded_open = timed(lambda: ShardedVectorStore(sharded_path))
+        print(f"Corpus: {args.size} x {args.dim} in {args.sources} sources "
+              f"({len(sharded.keys)} shards)\n")
+        print(f"open: single {single_open * 1000:.0f} ms, sharded {sharded_open * 1000:.0f} ms "
+              f"(shard data loads on first search)\n")
+
+        expected, elapsed = timed(lambda: single.search_many(queries, args.top_k))
+        print(f"{'index':>16} {'QPS':>8} {'same':>5}")
+        print(f"{'single':>16} {len(queries) / elapsed:>8.1f} {'-':>5}")
+        for workers in args.workers:
+            sharded.workers = workers
+            sharded._pool = None
+            sharded.search_many(queries[:1], args.top_k)  # load shards, start threads
+            results, elapsed = timed(lambda: sharded.search_many(queries, args.top_k))
+            print(f"{f'sharded/{workers} thr':>16} {len(queries) / elapsed:>8.1f} "
+                  f"{str(ids(results) == ids(expected)):>5}")
+
+        scope = {"source": "course-0.pdf"}
+        candidates = MetadataIndex(single).candidates(scope)
+        expected, elapsed = timed(lambda: single.search_many(queries, args.top_k,
+                                                             candidates=candidates))
+        print(f"\nScoped to one source:")
+        print(f"{'single':>16} {len(queries) / elapsed:>8.1f} {'-':>5}")
+        fresh = ShardedVectorStore(sharded_path)
+        results, elapsed = timed(lambda: fresh.search_many(queries, args.top_k, filter=scope))
+        print(f"{'sharded (cold)':>16} {len(queries) / elapsed:>8.1f} "
+              f"{str(ids(results) == ids(expected)):>5}   "
+              f"{len(fresh.loaded_shards())}/{len(fresh.keys)} shards loaded")
+    finally:
+        shutil.rmtree(tmp, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
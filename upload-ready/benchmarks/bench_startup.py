@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""
+Startup-time regression guard for cli.py.
+
+Runs `cli.py --help` and `cli.py process` (without --index) in fresh
+interpreters, reports wall time and fails if either exceeds its budget or
+pulls in torch/transformers.
+"""
+
+import argparse
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+CLI = os.path.join(HERE, '..', 'cli.py')
+HEAVY = ("torch", "transformers")
+
+sys.path.insert(0, HERE)
+
+from bench_pdf_processor import make_pdf
+
+# Runs the CLI in-process, then reports which heavy modules it imported
+PROBE = """
+import runpy, sys
+sys.argv = {argv!r}
+try:
+    runpy.run_path({cli!r}, run_name="__main__")
+except SystemExit:
+    pass
+print("HEAVY_MODULES=" + ",".join(m for m in {heavy!r} if m in sys.modules))
+"""
+
+
+def run_cli(argv):
+    code = PROBE.format(argv=[CLI] + argv, cli=CLI, heavy=HEAVY)
+    start = time.perf_counter()
+    out = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)
+    elapsed = time.perf_counter() - start
+    heavy = out.stdout.rsplit("HEAVY_MODULES=", 1)[-1].strip()
+    return elapsed, [m for m in heavy.split(",") if m]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--max-help", type=float, default=1.0, help="Budget in seconds")
+    parser.add_argument("--max-process", type=float, default=1.0,
+                        help="Budget in seconds for a 2-page process run without --index")
+    args = parser.parse_args()
+
+    failures = []
+    with tempfile.TemporaryDirectory() as tmp:
+        pdf_path = os.path.join(tmp, "tiny.pdf")
+        make_pdf(pdf_path, 2)
+        scenarios = [
+            ("--help", ["--help"], args.max_help),
+            ("process", ["process", pdf_path, "--output", os.path.join(tmp, "out")], args.max_process),
+        ]
+        print(f"{'command':>10} {'best s':>8} {'budget s':>9} {'heavy imports':>14}")
+        for name, argv, budget in scenarios:
+            runs = [run_cli(argv) for _ in range(args.repeats)]
+            best = min(elapsed for elapsed, _ in runs)
+            heavy = sorted({m for _, mods in runs for m in mods})
+            print(f"{name:>10} {best:>8.3f} {budget:>9.2f} {','.join(heavy) or '-':>14}")
+            if best > budget:
+                failures.append(f"{name} took {best:.3f}s (budget {budget:.2f}s)")
+            if heavy:
+                failures.append(f"{name} imported {', '.join(heavy)}")
+
+    for failure in failures:
+        print(f"❌ {failure}")
+    if failures:
+        sys.exit(1)
+    print("✅ Startup within budget")
+
+
+if __name__ == "__main__":
+    main()
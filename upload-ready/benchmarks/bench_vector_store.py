@@ -0,0 +1,102 @@
+#!/usr/bin/env python3
+"""
+Benchmark VectorStore search latency against corpus size.
+
+Compares the matrix-backed store with the old list-of-arrays implementation
+and checks both return the same (doc_id, score) results.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'src'))
+
+from storage.vector_store import VectorStore
+
+
+class ListVectorStore:
+    """Previous implementation: Python list of rows, full sort per query"""
+
+    def __init__(self):
+        self.embeddings = []
+        self.metadata = []
+
+    def add(self, embedding, metadata):
+        self.embeddings.append(embedding.flatten())
+        self.metadata.append(metadata)
+        return len(self.embeddings) - 1
+
+    def search(self, query_embedding, top_k=5):
+        query_flat = query_embedding.flatten()
+        similarities = []
+        for i, emb in enumerate(self.embeddings):
+            norm_query = np.linalg.norm(query_flat)
+            norm_emb = np.linalg.norm(emb)
+            if norm_query > 0 and norm_emb > 0:
+                sim = np.dot(query_flat, emb) / (norm_query * norm_emb)
+            else:
+                sim = 0.0
+            similarities.append((i, sim))
+        similarities.sort(key=lambda x: x[1], reverse=True)
+        return similarities[:top_k]
+
+
+def time_queries(store, queries, top_k):
+    """Return per-query latency in milliseconds"""
+    timings = []
+    for q in queries:
+        start = time.perf_counter()
+        store.search(q, top_k=top_k)
+        timings.append((time.perf_counter() - start) * 1000)
+    return np.array(timings)
+
+
+def same_results(a, b, atol=1e-4):
+    if [i for i, _ in a] == [i for i, _ in b]:
+        return np.allclose([s for _, s in a], [s for _, s in b], atol=atol)
+    # Near-equal scores may swap order under float32; compare score lists
+    return np.allclose(sorted(s for _, s in a), sorted(s for _, s in b), atol=atol)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+",
+                        default=[1000, 10000, 100000, 300000])
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=20)
+    parser.add_argument("-k", "--top-k", type=int, default=5)
+    parser.add_argument("--baseline-max", type=int, default=100000,
+                        help="Skip the slow list baseline above this size")
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    queries = rng.standard_normal((args.queries, args.dim)).astype(np.float32)
+
+    print(f"{'size':>10} {'matrix p50 ms':>14} {'list p50 ms':>12} {'speedup':>8} {'match':>6}")
+    for size in args.sizes:
+        data = rng.standard_normal((size, args.dim)).astype(np.float32)
+
+        store = VectorStore()
+        for i, row in enumerate(data):
+            store.add(row, {"page": i})
+        fast = np.median(time_queries(store, queries, args.top_k))
+
+        if size <= args.baseline_max:
+            baseline = ListVectorStore()
+            for i, row in enumerate(data):
+                baseline.add(row, {"page": i})
+            slow = np.median(time_queries(baseline, queries[:3], args.top_k))
+            match = all(same_results(store.search(q, args.top_k), baseline.search(q, args.top_k))
+                        for q in queries[:3])
+            print(f"{size:>10} {fast:>14.3f} {slow:>12.3f} {slow / fast:>7.1f}x {str(match):>6}")
+        else:
+            print(f"{size:>10} {fast:>14.3f} {'-':>12} {'-':>8} {'-':>6}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+#!/usr/bin/env python3
+"""
+Compare two run_suite.py result files.
+
+Prints every metric present in both runs with its relative change and
+marks regressions: a change in the bad direction larger than --threshold
+(percent). Exits with status 1 if any metric regressed.
+
+    python benchmarks/compare.py base.json new.json --threshold 10
+"""
+
+import argparse
+import json
+import sys
+
+
+def load(path):
+    with open(path) as f:
+        report = json.load(f)
+    return report["meta"], {m["name"]: m for m in report["metrics"]}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("base")
+    parser.add_argument("new")
+    parser.add_argument("--threshold", type=float, default=10.0,
+                        help="Regression threshold in percent (default: 10)")
+    args = parser.parse_args()
+
+    base_meta, base = load(args.base)
+    new_meta, new = load(args.new)
+    print(f"base: {base_meta.get('commit')} {base_meta.get('timestamp')}")
+    print(f"new:  {new_meta.get('commit')} {new_meta.get('timestamp')}\n")
+    print(f"{'metric':<44} {'base':>12} {'new':>12} {'change':>8}")
+
+    regressions = []
+    for name, old in base.items():
+        if name not in new:
+            continue
+        before, after = old["value"], new[name]["value"]
+        change = (after - before) / before * 100 if before else 0.0
+        worse = -change if old["better"] == "higher" else change
+        flag = ""
+        if worse > args.threshold:
+            flag = "  ❌ regression"
+            regressions.append(name)
+        elif worse < -args.threshold:
+            flag = "  ✅ improved"
+        print(f"{name:<44} {before:>12.3f} {after:>12.3f} {change:>+7.1f}%{flag}")
+
+    only = sorted(set(base) ^ set(new))
+    if only:
+        print(f"\nNot in both runs: {', '.join(only)}")
+    if regressions:
+        print(f"\n❌ {len(regressions)} metric(s) regressed more than {args.threshold:g}%")
+        sys.exit(1)
+    print(f"\n✅ No regressions beyond {args.threshold:g}%")
+
+
+if __name__ == "__main__":
+    main()
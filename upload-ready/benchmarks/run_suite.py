@@ -0,0 +1,217 @@
+#!/usr/bin/env python3
+"""
+Offline performance suite for the RAG pipeline, with JSON output.
+
+Covers:
+  pdf         PDFProcessor pages/sec for each worker count
+  encoder     ClipEncoder images/sec and texts/sec (batched)
+  store       VectorStore add rows/sec and search latency p50/p95/p99
+              for several corpus sizes
+  end_to_end  `cli.py process --index` wall time and pages/sec
+
+Everything is generated: PDFs come from bench_pdf_processor.make_pdf and,
+unless --model is given, CLIP is a tiny randomly initialized local model
+(tiny_clip.py), so no network is needed. Inputs are seeded, so two runs
+on the same machine differ only by timing noise. Compare two result files
+with compare.py.
+
+    python benchmarks/run_suite.py --output results/base.json
+    python benchmarks/run_suite.py --output results/new.json
+    python benchmarks/compare.py results/base.json results/new.json
+"""
+
+import argparse
+import json
+import os
+import platform
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+ROOT = os.path.join(HERE, '..')
+sys.path.insert(0, HERE)
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.join(ROOT, 'src'))
+
+from bench_pdf_processor import make_pdf
+from bench_encoder import page_like_images
+from tiny_clip import make_tiny_clip
+
+SECTIONS = ("pdf", "encoder", "store", "end_to_end")
+
+# Runs `cli.py process --index` with the benchmark model instead of settings'
+E2E_PROBE = """
+import runpy, sys
+from config.settings import settings
+settings.clip_model_name = {model!r}
+sys.argv = {argv!r}
+runpy.run_path({cli!r}, run_name="__main__")
+"""
+
+
+class Results:
+    """Flat list of named metrics; `better` says which direction is good"""
+
+    def __init__(self):
+        self.metrics = []
+
+    def add(self, name, value, unit, better="higher"):
+        self.metrics.append({"name": name, "value": round(float(value), 6),
+                             "unit": unit, "better": better})
+        print(f"  {name:<44} {value:>12.3f} {unit}")
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def median_time(fn, repeats):
+    """Median wall time of `repeats` calls, damping scheduler noise"""
+    return float(np.median([timed(fn)[1] for _ in range(repeats)]))
+
+
+def bench_pdf(results, args, tmp):
+    from processors.pdf_processor import PDFProcessor
+
+    pdf_path = os.path.join(tmp, "pdf_bench.pdf")
+    make_pdf(pdf_path, args.pages)
+    for workers in args.workers:
+        processor = PDFProcessor(dpi=args.dpi, workers=workers)
+        elapsed = median_time(lambda: sum(1 for _ in processor.iter_pages(pdf_path)),
+                              args.repeats)
+        results.add(f"pdf.pages_per_s.workers={workers}", args.pages / elapsed, "pages/s")
+
+
+def bench_encoder(results, args, model):
+    from encoders.clip_encoder import ClipEncoder
+
+    encoder = ClipEncoder(model_name=model, batch_size=args.batch_size)
+    images = page_like_images(args.images, size=(620, 877))
+    texts = [f"lecture notes on topic {i}" for i in range(args.images)]
+    _, load_time = timed(lambda: encoder.encode_texts(texts[:1]))
+    results.add("encoder.load_s", load_time, "s", better="lower")
+    elapsed = median_time(lambda: encoder.encode_images(images), args.repeats)
+    results.add("encoder.images_per_s", len(images) / elapsed, "images/s")
+    arrays = [np.asarray(image.resize((224, 317))) for image in images]
+    elapsed = median_time(lambda: encoder.encode_pixels(arrays), args.repeats)
+    results.add("encoder.pixels_per_s", len(arrays) / elapsed, "images/s")
+    elapsed = median_time(lambda: encoder.encode_texts(texts), args.repeats)
+    results.add("encoder.texts_per_s", len(texts) / elapsed, "texts/s")
+
+
+def bench_store(results, args):
+    from storage.vector_store import VectorStore
+    from bench_ann import clip_like
+
+    rng = np.random.default_rng(0)
+    for size in args.sizes:
+        data = clip_like(rng, size + args.queries, args.dim, topics=max(1, size // 300))
+        base, queries = data[:size], data[size:]
+        metadatas = [{"page": i} for i in range(size)]
+
+        def fill():
+            store = VectorStore()
+            for offset in range(0, size, args.batch_size):
+                store.add_many(base[offset:offset + args.batch_size],
+                               metadatas[offset:offset + args.batch_size])
+            return store
+
+        elapsed = median_time(fill, args.repeats)
+        results.add(f"store.add_rows_per_s.n={size}", size / elapsed, "rows/s")
+        store = fill()
+
+        latencies = []
+        for query in np.tile(queries, (args.repeats, 1)):
+            start = time.perf_counter()
+            store.search(query, top_k=10)
+            latencies.append((time.perf_counter() - start) * 1000)
+        for pct in (50, 95, 99):
+            results.add(f"store.search_ms.p{pct}.n={size}", np.percentile(latencies, pct),
+                        "ms", better="lower")
+
+
+def bench_end_to_end(results, args, model, tmp):
+    pdf_path = os.path.join(tmp, "e2e.pdf")
+    make_pdf(pdf_path, args.pages, seed=1)
+    argv = [os.path.join(ROOT, "cli.py"), "process", pdf_path,
+            "--output", os.path.join(tmp, "e2e_pages"), "--index",
+            "--index-path", os.path.join(tmp, "e2e_index"), "--dpi", str(args.dpi)]
+    code = E2E_PROBE.format(model=model, argv=argv, cli=argv[0])
+    _, elapsed = timed(lambda: subprocess.run([sys.executable, "-c", code], cwd=ROOT,
+                                              capture_output=True, text=True, check=True))
+    results.add("end_to_end.process_index_s", elapsed, "s", better="lower")
+    results.add("end_to_end.pages_per_s", args.pages / elapsed, "pages/s")
+
+
+def git_commit():
+    try:
+        out = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT,
+                             capture_output=True, text=True, check=True)
+        return out.stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--output", help="Write results JSON here")
+    parser.add_argument("--sections", nargs="+", choices=SECTIONS, default=list(SECTIONS))
+    parser.add_argument("--model", help="CLIP model name or directory "
+                                        "(default: a tiny random local model)")
+    parser.add_argument("--pages", type=int, default=24)
+    parser.add_argument("--dpi", type=int, default=150)
+    parser.add_argument("--workers", type=int, nargs="+", default=sorted({1, os.cpu_count() or 1}))
+    parser.add_argument("--images", type=int, default=32)
+    parser.add_argument("--batch-size", type=int, default=16)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1000, 10000, 100000])
+    parser.add_argument("--dim", type=int, default=512)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--repeats", type=int, default=3,
+                        help="Runs per throughput measurement; the median is reported")
+    args = parser.parse_args()
+
+    results = Results()
+    with tempfile.TemporaryDirectory() as tmp:
+        model = args.model
+        if model is None and {"encoder", "end_to_end"} & set(args.sections):
+            model = make_tiny_clip(os.path.join(tmp, "tiny-clip"))
+        for section in args.sections:
+            print(f"[{section}]")
+            if section == "pdf":
+                bench_pdf(results, args, tmp)
+            elif section == "encoder":
+                bench_encoder(results, args, model)
+            elif section == "store":
+                bench_store(results, args)
+            else:
+                bench_end_to_end(results, args, model, tmp)
+
+    report = {
+        "meta": {
+            "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "commit": git_commit(),
+            "python": platform.python_version(),
+            "numpy": np.__version__,
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "model": args.model or "tiny-random-clip",
+            "args": vars(args),
+        },
+        "metrics": results.metrics,
+    }
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,74 @@
+#!/usr/bin/env python3
+"""
+Write a small, randomly initialized CLIP model + processor to a directory.
+
+Lets the encoder and end-to-end benchmarks run offline: ClipEncoder loads
+it like any Hugging Face checkpoint (model_name=<directory>). The weights
+are random, so only speed is meaningful, not retrieval quality. The
+tokenizer is byte-level with no merges, which needs no downloaded vocab.
+
+    python benchmarks/tiny_clip.py /tmp/tiny-clip
+"""
+
+import json
+import os
+import sys
+
+
+def byte_vocab():
+    """GPT-2 style printable stand-ins for all 256 byte values"""
+    printable = (list(range(ord("!"), ord("~") + 1)) + list(range(ord("¡"), ord("¬") + 1))
+                 + list(range(ord("®"), ord("ÿ") + 1)))
+    chars = [chr(b) for b in printable]
+    extra = 0
+    for b in range(256):
+        if b not in printable:
+            chars.append(chr(256 + extra))
+            extra += 1
+    return chars
+
+
+def make_tiny_clip(path, hidden_size=64, layers=2, projection_dim=32, seed=0):
+    """Save a tiny random CLIP to `path` (224px input like the real model)"""
+    import torch
+    from transformers import (CLIPConfig, CLIPImageProcessor, CLIPModel, CLIPProcessor,
+                              CLIPTokenizer)
+
+    os.makedirs(path, exist_ok=True)
+    vocab = {}
+    for suffix in ("", "</w>"):
+        for char in byte_vocab():
+            vocab[char + suffix] = len(vocab)
+    for token in ("<|startoftext|>", "<|endoftext|>"):
+        vocab[token] = len(vocab)
+    vocab_path = os.path.join(path, "vocab.json")
+    merges_path = os.path.join(path, "merges.txt")
+    with open(vocab_path, "w") as f:
+        json.dump(vocab, f)
+    with open(merges_path, "w") as f:
+        f.write("#version: 0.2\n")
+
+    tokenizer = CLIPTokenizer(vocab_path, merges_path)
+    processor = CLIPProcessor(image_processor=CLIPImageProcessor(), tokenizer=tokenizer)
+    config = CLIPConfig(
+        text_config=dict(vocab_size=len(vocab), hidden_size=hidden_size,
+                         intermediate_size=hidden_size * 2, num_hidden_layers=layers,
+                         num_attention_heads=2, max_position_embeddings=77,
+                         bos_token_id=vocab["<|startoftext|>"],
+                         eos_token_id=vocab["<|endoftext|>"],
+                         pad_token_id=vocab["<|endoftext|>"]),
+        vision_config=dict(hidden_size=hidden_size, intermediate_size=hidden_size * 2,
+                           num_hidden_layers=layers, num_attention_heads=2,
+                           image_size=224, patch_size=32),
+        projection_dim=projection_dim,
+    )
+    torch.manual_seed(seed)
+    CLIPModel(config).save_pretrained(path)
+    processor.save_pretrained(path)
+    return path
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 2:
+        sys.exit(__doc__)
+    print(f"Tiny CLIP written to {make_tiny_clip(sys.argv[1])}")
@@ -6,48 +6,60 @@ CLI for Multimodal RAG System
 import argparse
 import os
 import sys
-from PIL import Image
-import numpy as np
 
 # Add src to path
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-# Import components
+# Only config is imported up front. Subsystems (torch, transformers, fitz)
+# are imported by the subcommands that use them, so --help and `process`
+# without --index never pay for loading the model stack.
 try:
     from config.settings import settings
-    print("✅ Config loaded")
 except Exception as e:
     print(f"❌ Config error: {e}")
     settings = None
 
-try:
-    from encoders.clip_encoder import ClipEncoder
-    print("✅ CLIP encoder imported")
-except Exception as e:
-    print(f"❌ CLIP import error: {e}")
-
-try:
-    from processors.pdf_processor import PDFProcessor
-    print("✅ PDF processor imported")
-except Exception as e:
-    print(f"❌ PDF processor error: {e}")
-
-try:
-    from storage.vector_store import VectorStore
-    print("✅ Vector store imported")
-except Exception as e:
-    print(f"❌ Vector store error: {e}")
-
-try:
-    from search_engine import SearchEngine
-    print("✅ Search engine imported")
-except Exception as e:
-    print(f"❌ Search engine error: {e}")
-
 def test_system():
     """Test all system components"""
     print("🧪 Testing system components...")
     
+    # Import components
+    if settings:
+        print("✅ Config loaded")
+    
+    try:
+        from encoders.clip_encoder import ClipEncoder
+        print("✅ CLIP encoder imported")
+    except Exception as e:
+        print(f"❌ CLIP import error: {e}")
+    
+    try:
+        from processors.pdf_processor import PDFProcessor
+        print("✅ PDF processor imported")
+    except Exception as e:
+        print(f"❌ PDF processor error: {e}")
+    
+    try:
+        from storage.vector_store import VectorStore
+        print("✅ Vector store imported")
+    except Exception as e:
+        print(f"❌ Vector store error: {e}")
+    
+    try:
+        from search_engine import SearchEngine
+        print("✅ Search engine imported")
+    except Exception as e:
+        print(f"❌ Search engine error: {e}")
+    
+    try:
+        from pipeline import Pipeline, Stage
+        print("✅ Pipeline imported")
+    except Exception as e:
+        print(f"❌ Pipeline error: {e}")
+    
+    from PIL import Image
+    import numpy as np
+    
     try:
         encoder = ClipEncoder()
         print("✅ CLIP encoder created")
@@ -87,46 +99,172 @@ def test_system():
     
     print("\n✅ All tests completed!")
 
+def build_search_engine(index_path, **overrides):
+    """Create a SearchEngine configured from settings"""
+    from search_engine import SearchEngine
+    
+    options = {}
+    if settings:
+        options = {
+            "model_name": settings.clip_model_name,
+            "encode_batch_size": settings.encode_batch_size,
+            "encode_precision": settings.encode_precision,
+            "search_mode": settings.search_mode,
+            "ann_nlist": settings.ann_nlist,
+            "ann_nprobe": settings.ann_nprobe,
+            "compressed_codec": settings.compressed_codec,
+            "compressed_rerank": settings.compressed_rerank,
+            "pq_subvectors": settings.pq_subvectors,
+            "query_cache_size": settings.query_cache_size,
+            "shard_by": settings.shard_by,
+            "shard_max_rows": settings.shard_max_rows,
+            "shard_workers": settings.shard_workers,
+        }
+    options.update(overrides)
+    return SearchEngine(index_path=index_path, **options)
+
 def process_command(args):
     """Process PDF file"""
+    from processors.pdf_processor import PDFProcessor
+    from pipeline import Pipeline, Stage
+    
     print(f"Processing: {args.input}")
     
+    # When indexing, also render a small encoder-resolution copy of each page
+    encode_size = args.encode_size if args.index and args.encode_size > 0 else None
+    output_dir = args.output
+    
+    def page_path(page_num):
+        return os.path.join(output_dir, f"page_{page_num:03d}.jpg")
+    
+    search_engine = None
+    update = None
+    if args.index:
+        from storage.manifest import file_hash, image_hash
+        
+        search_engine = build_search_engine(args.index_path, encode_batch_size=args.batch_size)
+        manifest = search_engine.manifest
+        pruned = search_engine.prune_missing()
+        if pruned:
+            print(f"♻️  Removed {pruned} page(s) of deleted sources")
+        
+        # Skip the whole PDF when it is unchanged, was rendered with the same
+        # options, and the page images this run would write exist. Otherwise
+        # pages are rendered and saved again; unchanged ones skip the encode.
+        source = os.path.abspath(args.input)
+        pdf_hash = file_hash(args.input)
+        options = {"output": os.path.abspath(args.output), "dpi": args.dpi,
+                   "encode_size": encode_size}
+        if manifest.is_current(source, pdf_hash, options):
+            pages = manifest.sources[source]["pages"]
+            if all(os.path.exists(page_path(int(key))) for key in pages):
+                print(f"♻️  Unchanged since last index, skipped {len(pages)} page(s)")
+                return
+        fingerprinter = None
+        if args.dedup:
+            from processors.page_fingerprint import PageFingerprinter
+            fingerprinter = PageFingerprinter(args.dedup_pixel_diff,
+                                              settings.dedup_blank_contrast if settings else 12)
+        update = search_engine.update_source(source, pdf_hash, fingerprinter, options)
+    
     # Create processor with DPI
-    processor = PDFProcessor(dpi=args.dpi)
-    pages = processor.extract_pages(args.input)
+    processor = PDFProcessor(dpi=args.dpi, workers=args.workers, encode_size=encode_size)
+    total_pages = processor.page_count(args.input)
     
-    output_dir = args.output
     os.makedirs(output_dir, exist_ok=True)
     
-    print(f"Extracted {len(pages)} pages")
+    print(f"Extracting {total_pages} pages")
     
-    # Save pages as images
-    for i, page in enumerate(pages):
-        img_path = os.path.join(output_dir, f"page_{i:03d}.jpg")
+    def save_page(page):
+        img_path = page_path(page['page_num'])
         page['image'].save(img_path, "JPEG", quality=95)
         print(f"  Saved: {img_path}")
+        page['metadata'] = {
+            "source": args.input,
+            "page": page['page_num'],
+            "path": img_path
+        }
+        if args.index:
+            # Hash what the encoder sees, so changing --encode-size re-encodes,
+            # and where the page is saved, so its row points at this run's image
+            page['hash'] = image_hash(page['pixels'] if 'pixels' in page else page['image'],
+                                      salt=img_path)
+        if not args.index or 'pixels' in page:
+            # The encoder uses the small render; drop the archival pixels
+            del page['image']
+        return page
+    
+    # Render -> save -> encode+index run concurrently with bounded queues
+    stages = [Stage("save", save_page, workers=args.save_workers)]
     
     if args.index:
-        print("\nIndexing pages...")
-        search_engine = SearchEngine()
-        for i, page in enumerate(pages):
-            metadata = {
-                "source": args.input,
-                "page": i,
-                "path": os.path.join(output_dir, f"page_{i:03d}.jpg")
-            }
-            doc_id = search_engine.index_image(page['image'], metadata)
-            print(f"  Indexed page {i}: ID={doc_id}")
+        def index_batch(batch):
+            items = [(str(page['page_num']), page['hash'],
+                      page['pixels'] if 'pixels' in page else page['image'],
+                      page['metadata']) for page in batch]
+            doc_ids = update.index(items)
+            pages = [page['page_num'] for page in batch]
+            ids = [doc_id for doc_id in doc_ids if doc_id is not None] or [None]
+            print(f"  Indexed pages {min(pages)}-{max(pages)}: IDs={min(ids)}-{max(ids)}")
+            return doc_ids
         
-        print(f"✅ Total pages indexed: {len(pages)}")
+        stages.append(Stage("encode", index_batch, workers=args.encode_workers,
+                            batch_size=args.batch_size))
+    
+    pipeline = Pipeline(processor.iter_pages(args.input), stages, queue_size=args.queue_size,
+                        source_workers=args.workers)
+    results = pipeline.run()
+    
+    print("\nStage throughput:")
+    print(pipeline.report())
+    
+    if search_engine is not None:
+        update.commit()
+        print(update.summary())
+        print(f"✅ Total pages indexed: {len(results)}")
+        print(f"   Index: {args.index_path} ({search_engine.store.count()} pages total)")
+
+def daemon_url():
+    host = settings.daemon_host if settings else "127.0.0.1"
+    port = settings.daemon_port if settings else 8765
+    return f"http://{host}:{port}"
+
+def search_filter(args):
+    """Metadata filter from --source/--pages, or None"""
+    filter = {}
+    if args.source:
+        filter["source"] = args.source
+    if args.pages:
+        first, _, last = args.pages.partition("-")
+        filter["page"] = {"min": int(first), "max": int(last or first)}
+    return filter or None
+
+def search_via_daemon(args):
+    """Search through a running daemon serving the same index, else None"""
+    from daemon import DaemonClient
+    
+    client = DaemonClient(daemon_url())
+    health = client.health()
+    if not health or health.get("index_path") != os.path.abspath(args.index_path):
+        return None
+    print(f"   (via search daemon at {client.url})")
+    return client.search(args.query, top_k=args.top_k, mode=args.mode,
+                         filter=search_filter(args))
 
 def search_command(args):
     """Search indexed documents"""
     print(f"🔍 Searching for: '{args.query}'")
     
     try:
-        search_engine = SearchEngine()
-        results = search_engine.search(args.query, top_k=args.top_k)
+        results = None if args.no_daemon else search_via_daemon(args)
+        if results is None:
+            search_engine = build_search_engine(args.index_path, search_mode=args.mode,
+                                                ann_nprobe=args.nprobe)
+            if search_engine.store.count() == 0:
+                print(f"⚠️ Index at {args.index_path} is empty - run 'process --index' first")
+                return
+            results = search_engine.search(args.query, top_k=args.top_k,
+                                           filter=search_filter(args))
         
         print(f"Found {len(results)} results:")
         for i, result in enumerate(results):
@@ -137,12 +275,35 @@ def search_command(args):
     except Exception as e:
         print(f"❌ Search failed: {e}")
 
+def serve_command(args):
+    """Run the warm-model search daemon"""
+    from daemon import SearchDaemon
+    
+    search_engine = build_search_engine(args.index_path)
+    print("Loading CLIP model...")
+    search_engine.search("warm up", top_k=1)
+    
+    daemon = SearchDaemon(
+        search_engine, host=args.host, port=args.port,
+        batch_window_ms=settings.daemon_batch_window_ms if settings else 5,
+        max_batch=settings.daemon_max_batch if settings else 32,
+    )
+    print(f"🚀 Search daemon on {daemon.url} ({search_engine.store.count()} pages, "
+          f"index {args.index_path})")
+    try:
+        daemon.serve_forever()
+    except KeyboardInterrupt:
+        print("\nStopping daemon")
+    finally:
+        daemon.shutdown()
+
 def main():
     parser = argparse.ArgumentParser(
         description="Multimodal RAG System for PDF notes",
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     subparsers = parser.add_subparsers(dest="command", help="Available commands")
+    default_index = settings.index_path if settings else "data/index"
     
     # Test command
     test_parser = subparsers.add_parser("test", help="Test system components")
@@ -154,14 +315,63 @@ def main():
     process_parser.add_argument("--output", required=True, help="Output directory for images")
     process_parser.add_argument("--dpi", type=int, default=150, help="Image quality (default: 150)")
     process_parser.add_argument("--index", action="store_true", help="Index after processing")
+    process_parser.add_argument("--index-path", default=default_index,
+                                help=f"Index directory (default: {default_index})")
+    default_batch = settings.encode_batch_size if settings else 16
+    process_parser.add_argument("--batch-size", type=int, default=default_batch,
+                                help=f"Pages rendered and indexed per batch (default: {default_batch})")
+    default_encode_size = settings.encode_render_size if settings else 224
+    process_parser.add_argument("--encode-size", type=int, default=default_encode_size,
+                                help="Shorter side in pixels of the page render fed to CLIP, "
+                                     f"independent of --dpi; 0 encodes the --dpi image (default: {default_encode_size})")
+    default_workers = settings.pdf_workers if settings else 1
+    process_parser.add_argument("--workers", type=int, default=default_workers,
+                                help=f"Processes used to render pages (default: {default_workers})")
+    default_save_workers = settings.save_workers if settings else 2
+    process_parser.add_argument("--save-workers", type=int, default=default_save_workers,
+                                help=f"Threads writing JPEGs (default: {default_save_workers})")
+    default_encode_workers = settings.encode_workers if settings else 1
+    process_parser.add_argument("--encode-workers", type=int, default=default_encode_workers,
+                                help=f"Threads encoding and indexing (default: {default_encode_workers})")
+    default_queue = settings.pipeline_queue_size if settings else 32
+    process_parser.add_argument("--queue-size", type=int, default=default_queue,
+                                help=f"Pages buffered between stages (default: {default_queue})")
+    default_dedup = settings.dedup_pages if settings else False
+    process_parser.add_argument("--dedup", action=argparse.BooleanOptionalAction,
+                                default=default_dedup,
+                                help="Skip blank pages and index practically identical pages "
+                                     f"once (default: {'on' if default_dedup else 'off'})")
+    default_pixel_diff = settings.dedup_max_pixel_diff if settings else 16
+    process_parser.add_argument("--dedup-pixel-diff", type=int, default=default_pixel_diff,
+                                help="Max thumbnail pixel difference (0-255) between pages "
+                                     f"indexed once (default: {default_pixel_diff})")
     process_parser.set_defaults(func=process_command)
     
     # Search command
     search_parser = subparsers.add_parser("search", help="Search documents")
     search_parser.add_argument("query", help="Search query")
     search_parser.add_argument("-k", "--top-k", type=int, default=5, help="Number of results (default: 5)")
+    search_parser.add_argument("--index-path", default=default_index,
+                               help=f"Index directory (default: {default_index})")
+    search_parser.add_argument("--mode", choices=["exact", "ivf", "compressed"],
+                               default=settings.search_mode if settings else "exact",
+                               help="exact brute-force, approximate IVF, or compressed codes + re-rank")
+    search_parser.add_argument("--nprobe", type=int, default=settings.ann_nprobe if settings else 8,
+                               help="IVF lists to scan (higher = better recall, slower)")
+    search_parser.add_argument("--source", help="Only search pages of this source PDF")
+    search_parser.add_argument("--pages", help="Only search this page range as shown in results, e.g. 3-10 or 7")
+    search_parser.add_argument("--no-daemon", action="store_true",
+                               help="Search in-process even if a search daemon is running")
     search_parser.set_defaults(func=search_command)
     
+    # Serve command
+    serve_parser = subparsers.add_parser("serve", help="Run the warm-model search daemon")
+    serve_parser.add_argument("--index-path", default=default_index,
+                              help=f"Index directory (default: {default_index})")
+    serve_parser.add_argument("--host", default=settings.daemon_host if settings else "127.0.0.1")
+    serve_parser.add_argument("--port", type=int, default=settings.daemon_port if settings else 8765)
+    serve_parser.set_defaults(func=serve_command)
+    
     # Parse arguments
     args = parser.parse_args()
     
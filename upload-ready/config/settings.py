@@ -5,7 +5,32 @@ Configuration
 class Settings:
     clip_model_name = "openai/clip-vit-base-patch32"
     pdf_dpi = 150
+    pdf_workers = 1  # processes used to render PDF pages
+    encode_render_size = 224  # shorter side (px) of the page render fed to CLIP
+    encode_batch_size = 16  # images/texts per CLIP forward pass
+    encode_precision = "fp32"  # "fp32" or "int8" (quantized CPU inference, slightly less exact)
+    save_workers = 2  # threads writing page JPEGs during ingestion
+    encode_workers = 1  # threads running CLIP encode + index during ingestion
+    pipeline_queue_size = 32  # pages buffered between ingestion stages
     top_k_results = 10
     similarity_threshold = 0.3
+    index_path = "data/index"
+    search_mode = "exact"  # "exact", "ivf" or "compressed" (approximate)
+    ann_nlist = None  # IVF clusters; None picks ~4*sqrt(corpus size)
+    ann_nprobe = 8  # IVF lists scanned per query: higher = better recall, slower
+    compressed_codec = "pq"  # "compressed" mode codes: "float16" (2x), "int8" (4x) or "pq"
+    pq_subvectors = 16  # PQ bytes per row: 512-d float32 -> 16 bytes is 128x smaller
+    compressed_rerank = 50  # re-score this many candidates with float32 rows; 0 = off
+    shard_by = None  # e.g. "source": one shard per PDF, searched in parallel (exact mode only)
+    shard_max_rows = None  # split a shard once it holds this many rows; None = no limit
+    shard_workers = 4  # threads scoring shards in parallel
+    dedup_pages = False  # skip blank pages, link practically identical ones to one row
+    dedup_max_pixel_diff = 16  # 0-255: pages whose thumbnails differ more are distinct
+    dedup_blank_contrast = 12  # 0-255: pages with no ink darker than this are blank
+    query_cache_size = 1024  # text query embeddings kept in the LRU cache
+    daemon_host = "127.0.0.1"  # `cli.py serve` listens here; `search` uses it if running
+    daemon_port = 8765
+    daemon_batch_window_ms = 5  # wait this long to batch concurrent queries
+    daemon_max_batch = 32
 
 settings = Settings()
@@ -5,11 +5,20 @@ from PIL import Image
 
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
-from search_engine import SearchEngine
+from cli import build_search_engine
+from config.settings import settings
+from processors.page_fingerprint import PageFingerprinter
+from storage.manifest import file_hash
 
-def index_existing_images(image_dir, source_name="ec_notes.pdf"):
-    """Index already processed images"""
-    search_engine = SearchEngine()
+def index_existing_images(image_dir, source_name="ec_notes.pdf", index_path=settings.index_path,
+                          batch_size=settings.encode_batch_size):
+    """Index already processed images, re-encoding only new or changed files"""
+    # Same settings as `cli.py process --index`, so both open the index the
+    # same way (e.g. sharded when settings.shard_by is set)
+    search_engine = build_search_engine(index_path, encode_batch_size=batch_size)
+    pruned = search_engine.prune_missing()
+    if pruned:
+        print(f"♻️  Removed {pruned} page(s) of deleted sources")
     
     # Get all image files
     image_files = sorted([f for f in os.listdir(image_dir) 
@@ -17,22 +26,55 @@ def index_existing_images(image_dir, source_name="ec_notes.pdf"):
     
     print(f"Found {len(image_files)} images in {image_dir}")
     
-    for i, img_file in enumerate(image_files):
-        img_path = os.path.join(image_dir, img_file)
+    # The directory is the source; files missing since the last run are removed
+    fingerprinter = None
+    if settings.dedup_pages:
+        fingerprinter = PageFingerprinter(settings.dedup_max_pixel_diff,
+                                          settings.dedup_blank_contrast)
+    update = search_engine.update_source(os.path.abspath(image_dir), fingerprinter=fingerprinter)
+    indexed = 0
+    for start in range(0, len(image_files), batch_size):
+        items = []
+        for i, img_file in enumerate(image_files[start:start + batch_size], start):
+            img_path = os.path.join(image_dir, img_file)
+            try:
+                content_hash = file_hash(img_path)
+                previous = update.previous.get(img_file)
+                if previous and previous["hash"] == content_hash:
+                    img = None  # unchanged: no need to decode it
+                else:
+                    img = Image.open(img_path)
+                    img.load()
+                items.append((img_file, content_hash, img, {
+                    "source": source_name,
+                    "page": i,
+                    "path": img_path,
+                    "filename": img_file
+                }))
+            except Exception as e:
+                print(f"  Failed to index {img_file}: {e}")
+        
+        if not items:
+            continue
         try:
-            img = Image.open(img_path)
-            metadata = {
-                "source": source_name,
-                "page": i,
-                "path": img_path,
-                "filename": img_file
-            }
-            doc_id = search_engine.index_image(img, metadata)
-            print(f"  Indexed {img_file}: ID={doc_id}")
+            doc_ids = update.index(items)
         except Exception as e:
-            print(f"  Failed to index {img_file}: {e}")
+            print(f"  Failed to index batch starting at {image_files[start]}: {e}")
+            continue
+        for (img_file, _, _, _), doc_id in zip(items, doc_ids):
+            page = update.pages[img_file]
+            if page.get("blank"):
+                print(f"  Skipped {img_file}: blank")
+            elif "duplicate_of" in page:
+                print(f"  Linked {img_file}: ID={doc_id} (near-duplicate of {page['duplicate_of']})")
+            else:
+                print(f"  Indexed {img_file}: ID={doc_id}")
+        indexed += len(doc_ids)
     
-    print(f"\n✅ Total indexed: {len(image_files)} images")
+    update.commit()
+    print(update.summary())
+    print(f"\n✅ Total indexed: {indexed} images")
+    print(f"   Index: {index_path} ({search_engine.store.count()} pages total)")
 
 if __name__ == "__main__":
     index_existing_images("data/ec_notes")
@@ -0,0 +1,199 @@
+"""
+Warm-model search daemon.
+
+Keeps one SearchEngine (CLIP weights + index) resident and answers queries
+over a small JSON-over-HTTP API on localhost:
+
+    GET  /health   {"status", "index_path", "pages", "cache"}
+    POST /search   {"query", "top_k", "mode", "filter"} -> {"results": [...]}
+    POST /ingest   {"paths": [...], "metadatas": [...]} -> {"doc_ids": [...]}
+
+Concurrent /search requests are micro-batched: queries arriving within a
+short window are encoded together and scored with one search_many call.
+/ingest takes the index's inter-process write lock (SearchEngine.index_lock),
+so it waits while a `cli.py process` run is updating the same index.
+"""
+
+import json
+import os
+import queue
+import threading
+import urllib.error
+import urllib.request
+from concurrent.futures import Future
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class QueryBatcher:
+    """Collects concurrent queries and runs them through search_many together"""
+
+    def __init__(self, engine, window_ms=5, max_batch=32):
+        self.engine = engine
+        self.window = window_ms / 1000
+        self.max_batch = max_batch
+        self.batches = 0
+        self.queries = 0
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, daemon=True)
+        self._thread.start()
+
+    def submit(self, query, top_k=5, mode=None, filter=None):
+        future = Future()
+        self._queue.put((query, top_k, mode, filter, future))
+        return future
+
+    def _collect(self):
+        """Block for one query, then take whatever arrives within the window"""
+        batch = [self._queue.get()]
+        while len(batch) < self.max_batch:
+            try:
+                batch.append(self._queue.get(timeout=self.window))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            # Queries sharing a mode and filter are scored together
+            groups = {}
+            for item in batch:
+                key = (item[2], json.dumps(item[3], sort_keys=True))
+                groups.setdefault(key, []).append(item)
+            with self.engine.store_lock:
+                self._search(groups)
+            self.batches += 1
+            self.queries += len(batch)
+
+    def _search(self, groups):
+        """Refresh the store and answer each group (under the store lock, so
+        an /ingest append is never seen half-done)"""
+        refresh = getattr(self.engine.store, "refresh", None)
+        if refresh:
+            refresh()
+        for items in groups.values():
+            top_k = max(item[1] for item in items)
+            try:
+                all_results = self.engine.search_many([item[0] for item in items],
+                                                      top_k=top_k, mode=items[0][2],
+                                                      filter=items[0][3])
+            except Exception as e:
+                for item in items:
+                    item[4].set_exception(e)
+                continue
+            for item, results in zip(items, all_results):
+                item[4].set_result(results[:item[1]])
+
+
+class _Handler(BaseHTTPRequestHandler):
+    daemon = None  # set on the subclass built by SearchDaemon
+
+    def log_message(self, format, *args):
+        pass  # keep the console for startup/errors only
+
+    def _reply(self, status, body):
+        data = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _body(self):
+        length = int(self.headers.get("Content-Length", 0))
+        return json.loads(self.rfile.read(length) or b"{}")
+
+    def do_GET(self):
+        if self.path == "/health":
+            self._reply(200, self.daemon.health())
+        else:
+            self._reply(404, {"error": "not found"})
+
+    def do_POST(self):
+        try:
+            payload = self._body()
+            if self.path == "/search":
+                self._reply(200, self.daemon.search(payload))
+            elif self.path == "/ingest":
+                self._reply(200, self.daemon.ingest(payload))
+            else:
+                self._reply(404, {"error": "not found"})
+        except (KeyError, ValueError) as e:
+            self._reply(400, {"error": str(e)})
+        except Exception as e:
+            self._reply(500, {"error": str(e)})
+
+
+class SearchDaemon:
+    def __init__(self, engine, host="127.0.0.1", port=8765, batch_window_ms=5, max_batch=32):
+        self.engine = engine
+        self.batcher = QueryBatcher(engine, batch_window_ms, max_batch)
+        handler = type("Handler", (_Handler,), {"daemon": self})
+        self.server = ThreadingHTTPServer((host, port), handler)
+
+    @property
+    def url(self):
+        host, port = self.server.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def health(self):
+        return {
+            "status": "ok",
+            "index_path": os.path.abspath(self.engine.index_path) if self.engine.index_path else None,
+            "pages": self.engine.store.count(),
+            "cache": self.engine.cache_stats(),
+            "batches": self.batcher.batches,
+            "queries": self.batcher.queries,
+        }
+
+    def search(self, payload):
+        future = self.batcher.submit(payload["query"], int(payload.get("top_k", 5)),
+                                     payload.get("mode"), payload.get("filter"))
+        return {"results": future.result()}
+
+    def ingest(self, payload):
+        from PIL import Image
+
+        paths = payload["paths"]
+        metadatas = payload.get("metadatas") or [{"path": path} for path in paths]
+        if len(metadatas) != len(paths):
+            raise ValueError("paths and metadatas must have the same length")
+        images = []
+        for path in paths:
+            with Image.open(path) as img:
+                images.append(img.convert("RGB"))
+        return {"doc_ids": self.engine.index_images(images, metadatas)}
+
+    def serve_forever(self):
+        self.server.serve_forever()
+
+    def shutdown(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+class DaemonClient:
+    def __init__(self, url="http://127.0.0.1:8765", timeout=30):
+        self.url = url.rstrip("/")
+        self.timeout = timeout
+
+    def _request(self, path, payload=None, timeout=None):
+        data = None if payload is None else json.dumps(payload).encode("utf-8")
+        request = urllib.request.Request(self.url + path, data=data,
+                                         headers={"Content-Type": "application/json"})
+        with urllib.request.urlopen(request, timeout=timeout or self.timeout) as response:
+            return json.loads(response.read())
+
+    def health(self, timeout=0.5):
+        """Daemon status, or None if no daemon is listening"""
+        try:
+            return self._request("/health", timeout=timeout)
+        except (urllib.error.URLError, OSError, ValueError):
+            return None
+
+    def search(self, query, top_k=5, mode=None, filter=None):
+        payload = {"query": query, "top_k": top_k, "mode": mode, "filter": filter}
+        return self._request("/search", payload)["results"]
+
+    def ingest(self, paths, metadatas=None):
+        return self._request("/ingest", {"paths": paths, "metadatas": metadatas})["doc_ids"]
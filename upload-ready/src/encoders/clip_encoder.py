@@ -1,40 +1,183 @@
-import torch
-from transformers import CLIPModel, CLIPProcessor
+import threading
+import warnings
 from PIL import Image
 import numpy as np
 
+# torch and transformers are imported inside the methods that need them:
+# they take seconds to import and are only needed once encoding starts.
+
+def _features(outputs):
+    """get_*_features returns a tensor, or a pooled output on transformers 5"""
+    import torch
+    if torch.is_tensor(outputs):
+        return outputs
+    return outputs.pooler_output
+
+PRECISIONS = ("fp32", "int8")
+
+def quantize_int8(model):
+    """Dynamic int8 quantization of every Linear layer (CPU only).
+
+    Weights are stored as int8 and activations are quantized on the fly,
+    so no calibration data is needed. Embeddings drift slightly from fp32;
+    benchmarks/bench_quantized.py measures by how much.
+    """
+    import torch
+    with warnings.catch_warnings():
+        # Newer torch releases warn that quantized tensor creation is deprecated
+        warnings.simplefilter("ignore", UserWarning)
+        return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear},
+                                                      dtype=torch.qint8)
+
 class ClipEncoder:
-    def __init__(self):
+    def __init__(self, model_name="openai/clip-vit-base-patch32", batch_size=16, precision="fp32"):
+        """The model is loaded on first use, not here.
+
+        precision: "fp32" (full model) or "int8" (dynamically quantized
+        Linear layers, faster on CPU).
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unknown precision: {precision}")
         self.device = "cpu"
-        self.model = CLIPModel.from_pretrained("openai/clip-vit-base-patch32")
-        self.processor = CLIPProcessor.from_pretrained("openai/clip-vit-base-patch32")
-        self.model.eval()
-        self.model.to(self.device)
+        self.batch_size = batch_size
+        self.model_name = model_name
+        self.precision = precision
+        self._model = None
+        self._processor = None
+        self._load_lock = threading.Lock()
 
-    def encode_image(self, image):
-        """Encode image to embedding (returns 1D numpy array)"""
+    def _load(self):
+        with self._load_lock:
+            if self._model is not None:
+                return
+            from transformers import CLIPModel, CLIPProcessor
+            model = CLIPModel.from_pretrained(self.model_name)
+            self._processor = CLIPProcessor.from_pretrained(self.model_name)
+            model.eval()
+            model.to(self.device)
+            if self.precision == "int8":
+                model = quantize_int8(model)
+            self._model = model
+
+    @property
+    def model(self):
+        if self._model is None:
+            self._load()
+        return self._model
+
+    @property
+    def processor(self):
+        if self._model is None:
+            self._load()
+        return self._processor
+
+    @property
+    def is_loaded(self):
+        return self._model is not None
+
+    @staticmethod
+    def _check_image(image):
         if isinstance(image, Image.Image):
             if image.mode != 'RGB':
                 image = image.convert('RGB')
         else:
             raise ValueError("Input must be PIL Image")
-        
-        inputs = self.processor(images=image, return_tensors="pt")
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
-        
-        with torch.no_grad():
-            # Get image features - returns tensor of shape [1, embedding_dim]
-            outputs = self.model.get_image_features(**inputs)
-            # Remove batch dimension and convert to 1D numpy array
-            return outputs[0].cpu().numpy()
+        return image
+
+    def _batches(self, items, batch_size):
+        batch_size = batch_size or self.batch_size
+        for start in range(0, len(items), batch_size):
+            yield items[start:start + batch_size]
+
+    def encode_image(self, image):
+        """Encode image to embedding (returns 1D numpy array)"""
+        return self.encode_images([image], batch_size=1)[0]
+
+    def encode_images(self, images, batch_size=None):
+        """Encode a list of images in batches (returns 2D numpy array [n, dim])
+
+        Items may be PIL images or HxWx3 uint8 arrays (see encode_pixels).
+        """
+        if images and all(isinstance(image, np.ndarray) for image in images):
+            return self.encode_pixels(images, batch_size)
+        import torch
+        images = [self._check_image(image) for image in images]
+        embeddings = []
+        for batch in self._batches(images, batch_size):
+            inputs = self.processor(images=batch, return_tensors="pt")
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+
+            with torch.no_grad():
+                # Get image features - tensor of shape [batch, embedding_dim]
+                outputs = _features(self.model.get_image_features(**inputs))
+                embeddings.append(outputs.cpu().numpy())
+        return self._stack(embeddings)
+
+    def _preprocess_pixels(self, pixels):
+        """CLIP preprocessing in torch for an HxWx3 uint8 array.
+
+        Mirrors CLIPImageProcessor (shortest-edge bicubic resize, center
+        crop, normalize) without going through PIL. Pages rendered near the
+        target size make the resize nearly free.
+        """
+        import torch
+        import torch.nn.functional as F
+        image_processor = self.processor.image_processor
+        short = image_processor.size["shortest_edge"]
+        crop_h, crop_w = image_processor.crop_size["height"], image_processor.crop_size["width"]
+
+        # The float conversion is the only copy (arrays may be read-only views)
+        tensor = torch.from_numpy(pixels[..., :3].astype(np.float32)).permute(2, 0, 1)[None]
+        h, w = tensor.shape[-2:]
+        if min(h, w) != short:
+            scale = short / min(h, w)
+            size = (max(short, round(h * scale)), max(short, round(w * scale)))
+            tensor = F.interpolate(tensor, size=size, mode="bicubic",
+                                   align_corners=False, antialias=True)
+            h, w = size
+        top, left = (h - crop_h) // 2, (w - crop_w) // 2
+        tensor = tensor[..., top:top + crop_h, left:left + crop_w].clamp(0, 255)
+
+        mean = torch.tensor(image_processor.image_mean).view(1, 3, 1, 1)
+        std = torch.tensor(image_processor.image_std).view(1, 3, 1, 1)
+        return (tensor / 255.0 - mean) / std
+
+    def encode_pixels(self, arrays, batch_size=None):
+        """Encode HxWx3 uint8 arrays (e.g. PDFProcessor "pixels") in batches.
+
+        Fast path that skips PIL: arrays go straight to tensors.
+        """
+        import torch
+        embeddings = []
+        for batch in self._batches(list(arrays), batch_size):
+            pixel_values = torch.cat([self._preprocess_pixels(a) for a in batch])
+
+            with torch.no_grad():
+                outputs = _features(self.model.get_image_features(
+                    pixel_values=pixel_values.to(self.device)))
+                embeddings.append(outputs.cpu().numpy())
+        return self._stack(embeddings)
 
     def encode_text(self, text):
         """Encode text to embedding (returns 1D numpy array)"""
-        inputs = self.processor(text=text, return_tensors="pt", padding=True)
-        inputs = {k: v.to(self.device) for k, v in inputs.items()}
-        
-        with torch.no_grad():
-            # Get text features - returns tensor of shape [1, embedding_dim]
-            outputs = self.model.get_text_features(**inputs)
-            # Remove batch dimension and convert to 1D numpy array
-            return outputs[0].cpu().numpy()
+        return self.encode_texts([text], batch_size=1)[0]
+
+    def encode_texts(self, texts, batch_size=None):
+        """Encode a list of texts in batches (returns 2D numpy array [n, dim])"""
+        import torch
+        embeddings = []
+        for batch in self._batches(list(texts), batch_size):
+            inputs = self.processor(text=batch, return_tensors="pt", padding=True)
+            inputs = {k: v.to(self.device) for k, v in inputs.items()}
+
+            with torch.no_grad():
+                # Get text features - tensor of shape [batch, embedding_dim]
+                outputs = _features(self.model.get_text_features(**inputs))
+                embeddings.append(outputs.cpu().numpy())
+        return self._stack(embeddings)
+
+    def _stack(self, embeddings):
+        if not embeddings:
+            dim = self.model.config.projection_dim
+            return np.empty((0, dim), dtype=np.float32)
+        return np.concatenate(embeddings, axis=0)
@@ -0,0 +1,191 @@
+import queue
+import threading
+import time
+
+_DONE = object()
+
+
+class StageStats:
+    def __init__(self, name, workers):
+        self.name = name
+        self.workers = workers
+        self.items = 0
+        self.busy_seconds = 0.0
+        self.started = None
+        self.finished = None
+        self._lock = threading.Lock()
+
+    def record(self, items, seconds):
+        now = time.perf_counter()
+        with self._lock:
+            self.items += items
+            self.busy_seconds += seconds
+            if self.started is None:
+                self.started = now - seconds
+            self.finished = now
+
+    @property
+    def wall_seconds(self):
+        if self.started is None:
+            return 0.0
+        return self.finished - self.started
+
+    @property
+    def throughput(self):
+        """Items per second over the stage's active wall time"""
+        wall = self.wall_seconds
+        return self.items / wall if wall > 0 else 0.0
+
+    def __str__(self):
+        return (f"{self.name:>8}: {self.items:>5} items, {self.workers} worker(s), "
+                f"busy {self.busy_seconds:6.2f}s, {self.throughput:7.1f} items/s")
+
+
+class Stage:
+    """One pipeline step run by `workers` threads.
+
+    fn takes one item and returns the item passed downstream, or with
+    batch_size set takes a list of items and returns a list.
+    """
+
+    def __init__(self, name, fn, workers=1, batch_size=None):
+        self.name = name
+        self.fn = fn
+        self.workers = max(1, workers)
+        self.batch_size = batch_size
+
+
+class Pipeline:
+    """Run a source iterator through stages connected by bounded queues.
+
+    Stages overlap: while one page is being encoded the next ones are being
+    rendered and written. Bounded queues apply backpressure so at most
+    `queue_size` items wait between any two stages. The source is consumed
+    on its own thread and reported as a stage named `source_name`
+    (`source_workers` is only used for reporting, e.g. render processes).
+    """
+
+    def __init__(self, source, stages, queue_size=8, source_name="render", source_workers=1):
+        self.source = source
+        self.stages = stages
+        self.queue_size = queue_size
+        self.stats = [StageStats(source_name, source_workers)]
+        self.stats += [StageStats(stage.name, stage.workers) for stage in stages]
+        self.results = []
+        self._queues = [queue.Queue(maxsize=queue_size) for _ in stages]
+        self._stop = threading.Event()
+        self._errors = []
+        self._lock = threading.Lock()
+        self._remaining = [s.workers for s in stages]
+
+    def _put(self, q, item):
+        """Blocking put that gives up once the pipeline is stopping"""
+        while not self._stop.is_set():
+            try:
+                q.put(item, timeout=0.1)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def _get(self, q):
+        while not self._stop.is_set():
+            try:
+                return q.get(timeout=0.1)
+            except queue.Empty:
+                continue
+        return _DONE
+
+    def _fail(self, error):
+        with self._lock:
+            self._errors.append(error)
+        self._stop.set()
+
+    def _emit(self, index, item):
+        """Hand an item to stage `index`, or collect it after the last stage"""
+        if index < len(self._queues):
+            self._put(self._queues[index], item)
+        else:
+            with self._lock:
+                self.results.append(item)
+
+    def _finish(self, index):
+        """Signal end-of-stream to every worker of stage `index`"""
+        if index < len(self._queues):
+            for _ in range(self.stages[index].workers):
+                self._put(self._queues[index], _DONE)
+
+    def _run_source(self):
+        stats = self.stats[0]
+        try:
+            iterator = iter(self.source)
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                try:
+                    item = next(iterator)
+                except StopIteration:
+                    break
+                stats.record(1, time.perf_counter() - start)
+                self._emit(0, item)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            self._finish(0)
+
+    def _next_batch(self, q, size):
+        """Block until `size` items arrive or the stream ends"""
+        batch = []
+        while len(batch) < size:
+            item = self._get(q)
+            if item is _DONE:
+                return batch, True
+            batch.append(item)
+        return batch, False
+
+    def _run_stage(self, index):
+        stage, stats, q = self.stages[index], self.stats[index + 1], self._queues[index]
+        try:
+            done = False
+            while not done and not self._stop.is_set():
+                if stage.batch_size:
+                    batch, done = self._next_batch(q, stage.batch_size)
+                    if not batch:
+                        break
+                    start = time.perf_counter()
+                    outputs = stage.fn(batch)
+                    stats.record(len(batch), time.perf_counter() - start)
+                    for output in outputs:
+                        self._emit(index + 1, output)
+                else:
+                    item = self._get(q)
+                    if item is _DONE:
+                        break
+                    start = time.perf_counter()
+                    output = stage.fn(item)
+                    stats.record(1, time.perf_counter() - start)
+                    self._emit(index + 1, output)
+        except Exception as e:
+            self._fail(e)
+        finally:
+            with self._lock:
+                self._remaining[index] -= 1
+                last = self._remaining[index] == 0
+            if last:
+                self._finish(index + 1)
+
+    def run(self):
+        """Run to completion; returns the last stage's outputs (unordered)"""
+        threads = [threading.Thread(target=self._run_source, daemon=True)]
+        for index, stage in enumerate(self.stages):
+            threads += [threading.Thread(target=self._run_stage, args=(index,), daemon=True)
+                        for _ in range(stage.workers)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        if self._errors:
+            raise self._errors[0]
+        return self.results
+
+    def report(self):
+        return "\n".join(str(stats) for stats in self.stats)
@@ -1,21 +1,155 @@
+import os
+import tempfile
+
 import fitz
 from PIL import Image
-import io
+import numpy as np
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+
+def _encode_matrix(page, encode_size):
+    """Zoom so the page's shorter side renders at encode_size pixels"""
+    zoom = encode_size / min(page.rect.width, page.rect.height)
+    return fitz.Matrix(zoom, zoom)
+
+def _pixmap_array(pix):
+    """HxWxC uint8 view over the pixmap's samples (no copy).
+
+    The view does not keep the pixmap alive, so callers must hold on to it.
+    """
+    return np.frombuffer(pix.samples_mv, dtype=np.uint8).reshape(pix.h, pix.w, pix.n)
+
+def _render_range(pdf_path, dpi, encode_size, start, stop, buffer_path):
+    """Worker: render pages [start, stop) with its own document handle.
+
+    The raw RGB samples are written to `buffer_path` rather than returned:
+    sending megabytes per page back through the pool's result pipe costs
+    more than rendering them. Returns (page_num, width, height, small) per
+    page, small being (w, h) of the encode-size copy or None; the samples
+    follow each other in the file in that order.
+    """
+    zoom = dpi / 72
+    matrix = fitz.Matrix(zoom, zoom)
+    rendered = []
+    with fitz.open(pdf_path) as doc, open(buffer_path, "wb") as out:
+        for page_num in range(start, stop):
+            page = doc[page_num]
+            pix = page.get_pixmap(matrix=matrix, alpha=False)
+            out.write(pix.samples_mv)
+            small = None
+            if encode_size:
+                enc = page.get_pixmap(matrix=_encode_matrix(page, encode_size), alpha=False)
+                out.write(enc.samples_mv)
+                small = (enc.w, enc.h)
+            rendered.append((page_num, pix.width, pix.height, small))
+    return rendered
+
+def _read_range(rendered, buffer_path):
+    """Parent side of _render_range: the pages it wrote, as iter_pages yields them"""
+    with open(buffer_path, "rb") as f:
+        data = memoryview(f.read())
+    pages, offset = [], 0
+    for page_num, width, height, small in rendered:
+        size = width * height * 3
+        img = Image.frombytes("RGB", (width, height), data[offset:offset + size])
+        offset += size
+        result = {"image": img, "page_num": page_num}
+        if small:
+            w, h = small
+            result["pixels"] = np.frombuffer(data, dtype=np.uint8, count=w * h * 3,
+                                             offset=offset).reshape(h, w, 3)
+            offset += w * h * 3
+        pages.append(result)
+    return pages
 
 class PDFProcessor:
-    def __init__(self, dpi=150):
+    def __init__(self, dpi=150, workers=1, chunk_size=4, encode_size=None):
+        """Render pages at `dpi`; with encode_size, also render a small copy
+        whose shorter side is encode_size pixels for the encoder."""
         self.dpi = dpi
+        self.workers = max(1, workers)
+        self.chunk_size = max(1, chunk_size)
+        self.encode_size = encode_size
     
-    def extract_pages(self, pdf_path):
-        doc = fitz.open(pdf_path)
-        pages = []
-        for page_num in range(len(doc)):
-            page = doc[page_num]
+    def page_count(self, pdf_path):
+        with fitz.open(pdf_path) as doc:
+            return len(doc)
+    
+    def iter_pages(self, pdf_path, batch_size=None):
+        """Yield pages one at a time, or lists of up to batch_size pages.
+
+        Only the current page (or batch) is rasterized, so memory stays flat
+        regardless of page count. With workers > 1 pages are rendered in a
+        process pool but still yielded in page order.
+
+        Each page has "image" (PIL, at dpi) and "page_num". With encode_size
+        set it also has "pixels", an HxWx3 uint8 array at encode resolution
+        that ClipEncoder can consume directly.
+        """
+        if self.workers > 1:
+            pages = self._iter_parallel(pdf_path)
+        else:
+            pages = self._iter_sequential(pdf_path)
+        
+        if batch_size is None:
+            yield from pages
+            return
+        batch = []
+        for page in pages:
+            batch.append(page)
+            if len(batch) == batch_size:
+                yield batch
+                batch = []
+        if batch:
+            yield batch
+    
+    def _iter_sequential(self, pdf_path):
+        with fitz.open(pdf_path) as doc:
             zoom = self.dpi / 72
             matrix = fitz.Matrix(zoom, zoom)
-            pix = page.get_pixmap(matrix=matrix)
-            img_data = pix.tobytes("ppm")
-            img = Image.open(io.BytesIO(img_data))
-            pages.append({"image": img, "page_num": page_num})
-        doc.close()
-        return pages
+            for page_num in range(len(doc)):
+                page = doc[page_num]
+                pix = page.get_pixmap(matrix=matrix, alpha=False)
+                img = Image.frombytes("RGB", (pix.width, pix.height), pix.samples)
+                result = {"image": img, "page_num": page_num}
+                if self.encode_size:
+                    enc = page.get_pixmap(matrix=_encode_matrix(page, self.encode_size),
+                                          alpha=False)
+                    result["pixels"] = _pixmap_array(enc)
+                    result["pixmap"] = enc  # keeps the pixels' buffer alive
+                yield result
+    
+    def _iter_parallel(self, pdf_path):
+        """Render page ranges across a process pool, yielding in page order"""
+        total = self.page_count(pdf_path)
+        ranges = deque((start, min(start + self.chunk_size, total))
+                       for start in range(0, total, self.chunk_size))
+        # Bound the chunks in flight so memory does not grow with page count;
+        # each has its own buffer file until the pages are read back
+        window = self.workers * 2
+        with ProcessPoolExecutor(max_workers=self.workers) as pool, \
+                tempfile.TemporaryDirectory(prefix="pdf-pages-") as tmp:
+            pending = deque()
+            slot = 0
+
+            def submit():
+                nonlocal slot
+                start, stop = ranges.popleft()
+                path = os.path.join(tmp, f"chunk-{slot % window}.rgb")
+                slot += 1
+                pending.append((pool.submit(_render_range, pdf_path, self.dpi,
+                                            self.encode_size, start, stop, path), path))
+
+            while ranges and len(pending) < window:
+                submit()
+            while pending:
+                future, path = pending.popleft()
+                pages = _read_range(future.result(), path)
+                # Its buffer is free again: keep every worker busy while
+                # the caller works through these pages
+                if ranges:
+                    submit()
+                yield from pages
+    
+    def extract_pages(self, pdf_path):
+        return list(self.iter_pages(pdf_path))
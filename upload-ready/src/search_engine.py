@@ -1,24 +1,249 @@
+import os
+import threading
+from contextlib import contextmanager
+
 # Use absolute imports
 from encoders.clip_encoder import ClipEncoder
 from storage.vector_store import VectorStore
+from storage.persistent_store import PersistentVectorStore
+from storage.sharded_store import ShardedVectorStore
+from storage.ivf_index import IVFIndex
+from storage.compressed_index import CompressedIndex
+from storage.metadata_index import MetadataIndex
+from storage.manifest import MANIFEST_FILE, IndexManifest, SourceUpdate
+from storage.file_lock import FileLock
+from query_cache import LRUCache, normalize_query
+
+SEARCH_MODES = ("exact", "ivf", "compressed")
+LOCK_FILE = "write.lock"
 
 class SearchEngine:
-    def __init__(self):
-        self.encoder = ClipEncoder()
-        self.store = VectorStore()
+    def __init__(self, index_path=None, search_mode="exact", ann_nlist=None, ann_nprobe=8,
+                 compressed_codec="pq", compressed_rerank=50, pq_subvectors=16,
+                 model_name="openai/clip-vit-base-patch32", encode_batch_size=16,
+                 encode_precision="fp32", query_cache_size=1024, shard_by=None,
+                 shard_max_rows=None, shard_workers=4):
+        """Create a search engine; with index_path the index is kept on disk.
+
+        With shard_by (e.g. "source") the on-disk index is split into shards
+        (see ShardedVectorStore); an index created sharded is always opened
+        sharded. Sharded indexes support exact search only.
+        """
+        if search_mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {search_mode}")
+        self.encoder = ClipEncoder(model_name=model_name, batch_size=encode_batch_size,
+                                   precision=encode_precision)
+        self.index_path = index_path
+        self.manifest = None
+        self._file_lock = None
+        # Guards the in-memory store: appends and refreshes hold it, and so
+        # does a reader that must not see an append half-applied (the daemon)
+        self.store_lock = threading.Lock()
+        self.sharded = bool(index_path) and (shard_by is not None
+                                             or ShardedVectorStore.exists(index_path))
+        if shard_by is not None and not index_path:
+            raise ValueError("Sharding needs a persistent index (index_path)")
+        if self.sharded:
+            if search_mode != "exact":
+                raise ValueError("Sharded indexes support exact search only")
+            self.store = ShardedVectorStore(index_path, shard_by=shard_by,
+                                            max_rows=shard_max_rows, workers=shard_workers)
+        elif index_path:
+            self.store = PersistentVectorStore(index_path)
+        else:
+            self.store = VectorStore()
+        if index_path:
+            self.manifest = IndexManifest(os.path.join(index_path, MANIFEST_FILE))
+            self._file_lock = FileLock(os.path.join(index_path, LOCK_FILE),
+                                       on_acquire=self._reload)
+            if self.manifest.pending is not None:
+                # Taking the lock recovers it once its writer is gone (_reload)
+                with self.index_lock():
+                    pass
+        self.search_mode = search_mode
+        self.ann_nlist = ann_nlist
+        self.ann_nprobe = ann_nprobe
+        self._ann = None
+        self.compressed_codec = compressed_codec
+        self.compressed_rerank = compressed_rerank
+        self.pq_subvectors = pq_subvectors
+        self._compressed = None
+        self._metadata_index = None
+        self.query_cache = LRUCache(query_cache_size)
+    
+    @property
+    def ann(self):
+        """IVF index over the store, built (or loaded from disk) on first use"""
+        if self._ann is None:
+            self._ann = IVFIndex(self.store, nlist=self.ann_nlist, nprobe=self.ann_nprobe)
+            ann_path = self._ann_path()
+            if ann_path and os.path.exists(ann_path):
+                self._ann.load(ann_path)
+        return self._ann
+    
+    def _ann_path(self):
+        return os.path.join(self.index_path, "ivf.npz") if self.index_path else None
+    
+    def _ann_search(self, query_embedding, top_k, candidates=None):
+        ann = self.ann
+        indexed = ann.assignments.shape[0]
+        results = ann.search(query_embedding, top_k=top_k, candidates=candidates)
+        # Persist the quantizer whenever it was (re)trained or extended
+        ann_path = self._ann_path()
+        if ann_path and ann.is_trained and ann.assignments.shape[0] != indexed:
+            ann.save(ann_path)
+        return results
+    
+    @property
+    def compressed(self):
+        """Compressed-code index over the store, built (or loaded) on first use"""
+        if self._compressed is None:
+            self._compressed = CompressedIndex(self.store, codec=self.compressed_codec,
+                                               rerank=self.compressed_rerank,
+                                               pq_m=self.pq_subvectors)
+            path = self._compressed_path()
+            if path and os.path.exists(path):
+                self._compressed.load(path)
+        return self._compressed
+    
+    def _compressed_path(self):
+        if not self.index_path:
+            return None
+        return os.path.join(self.index_path, f"codes-{self.compressed_codec}.npz")
+    
+    def _compressed_search(self, query_embeddings, top_k, candidates=None):
+        index = self.compressed
+        encoded = index.codes.shape[0] if index.is_trained else 0
+        results = index.search_many(query_embeddings, top_k=top_k, candidates=candidates)
+        path = self._compressed_path()
+        if path and index.is_trained and index.codes.shape[0] != encoded:
+            index.save(path)
+        return results
+    
+    @property
+    def metadata_index(self):
+        """Inverted indexes over row metadata, built on the first filtered search"""
+        if self._metadata_index is None:
+            self._metadata_index = MetadataIndex(self.store)
+        return self._metadata_index
+    
+    @contextmanager
+    def index_lock(self):
+        """Hold the on-disk index's inter-process write lock.
+
+        Writers in other processes (another `cli.py process`, a daemon's
+        /ingest) wait until it is released. Taking it reloads the store and
+        manifest, so appends start after the rows other processes committed.
+        Nests, and is shared by this process's threads. A no-op in memory.
+        Never take it while holding store_lock.
+        """
+        if self._file_lock is None:
+            yield
+            return
+        with self._file_lock:
+            yield
+    
+    def _reload(self):
+        # The index lock was just taken: nobody else is mid-append, and an
+        # update still pending was interrupted (its writer held the lock)
+        with self.store_lock:
+            self.store.refresh(force=True)
+            self.store.discard_uncommitted()
+            self.manifest.reload()
+            self.manifest.recover(self.store)
     
     def index_image(self, image, metadata):
         """Index an image with metadata"""
         embedding = self.encoder.encode_image(image)
-        doc_id = self.store.add(embedding, metadata)
+        with self.index_lock(), self.store_lock:
+            doc_id = self.store.add(embedding, metadata)
         return doc_id
     
-    def search(self, query_text, top_k=5):
-        """Search for images using text query"""
-        query_embedding = self.encoder.encode_text(query_text)
-        results = self.store.search(query_embedding, top_k=top_k)
-        
-        # Format results with metadata
+    def index_images(self, images, metadatas):
+        """Index a batch of images with metadata, returns their IDs"""
+        embeddings = self.encoder.encode_images(images)
+        # Encoding may run on several threads; appends must not interleave
+        with self.index_lock(), self.store_lock:
+            return self.store.add_many(embeddings, metadatas)
+    
+    def prune_missing(self):
+        """Drop manifest sources whose files are gone, with their rows"""
+        with self.index_lock():
+            return self.manifest.prune_missing(self.store)
+    
+    def update_source(self, source, source_hash=None, fingerprinter=None, options=None):
+        """Start an incremental re-index of one source (needs index_path).
+
+        With a PageFingerprinter, blank pages are skipped and near-duplicate
+        pages reuse an existing row instead of being encoded. `options`
+        (JSON-able) are recorded with the source for manifest.is_current.
+        """
+        if self.manifest is None:
+            raise ValueError("Incremental indexing needs a persistent index (index_path)")
+        return SourceUpdate(self, source, source_hash, fingerprinter, options)
+    
+    def encode_queries(self, query_texts):
+        """Text embeddings for queries, encoding only cache misses (in one batch)"""
+        keys = [normalize_query(text) for text in query_texts]
+        embeddings = [self.query_cache.get(key) for key in keys]
+        missing = list(dict.fromkeys(k for k, e in zip(keys, embeddings) if e is None))
+        if missing:
+            encoded = dict(zip(missing, self.encoder.encode_texts(missing)))
+            for key, embedding in encoded.items():
+                self.query_cache.put(key, embedding)
+            embeddings = [e if e is not None else encoded[k] for k, e in zip(keys, embeddings)]
+        return embeddings
+    
+    def cache_stats(self):
+        """Query-embedding cache size and hit/miss counters"""
+        return self.query_cache.stats()
+    
+    def search(self, query_text, top_k=5, mode=None, filter=None):
+        """Search for images using text query (mode: 'exact', 'ivf' or 'compressed')
+
+        filter restricts results by metadata, e.g. {"source": "notes.pdf",
+        "page": {"min": 3, "max": 10}} (see MetadataIndex).
+        """
+        return self.search_many([query_text], top_k=top_k, mode=mode, filter=filter)[0]
+    
+    def search_many(self, query_texts, top_k=5, mode=None, filter=None):
+        """Search several text queries; returns one result list per query.
+
+        Uncached queries are encoded in one batch and, in exact mode, scored
+        against the store with a single matrix-matrix product. With a filter
+        only the matching rows are scored. A sharded store scores its shards
+        in parallel and merges their results.
+        """
+        mode = mode or self.search_mode
+        if mode not in SEARCH_MODES:
+            raise ValueError(f"Unknown search mode: {mode}")
+        if not query_texts:
+            return []
+        if self.sharded:
+            if mode != "exact":
+                raise ValueError("Sharded indexes support exact search only")
+            # Shards are picked and filtered on their own, without loading
+            # the metadata of shards the filter rules out
+            all_results = self.store.search_many(self.encode_queries(query_texts),
+                                                 top_k=top_k, filter=filter)
+            return [self._format(results) for results in all_results]
+        candidates = None
+        if filter:
+            candidates = self.metadata_index.candidates(filter)
+            if candidates.shape[0] == 0:
+                return [[] for _ in query_texts]
+        query_embeddings = self.encode_queries(query_texts)
+        if mode == "ivf":
+            all_results = [self._ann_search(q, top_k, candidates) for q in query_embeddings]
+        elif mode == "compressed":
+            all_results = self._compressed_search(query_embeddings, top_k, candidates)
+        else:
+            all_results = self.store.search_many(query_embeddings, top_k=top_k,
+                                                 candidates=candidates)
+        return [self._format(results) for results in all_results]
+    
+    def _format(self, results):
+        """Format results with metadata"""
         formatted_results = []
         for doc_id, score in results:
             result = {
@@ -0,0 +1,293 @@
+import os
+
+import numpy as np
+
+from storage.vector_store import normalize_rows, top_k_indices
+
+
+def kmeans(data, k, iters=10, seed=0):
+    """Euclidean k-means, returns (k, dim) centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(data.shape[0], size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = nearest_centroid(data, centroids)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=k)
+        nonempty = counts > 0
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums = np.add.reduceat(data[order], starts[nonempty], axis=0)
+        centroids[nonempty] = sums / counts[nonempty, None]
+        empty = ~nonempty
+        if empty.any():
+            # Re-seed empty clusters from random points
+            centroids[empty] = data[rng.choice(data.shape[0], size=int(empty.sum()))]
+    return centroids
+
+
+def nearest_centroid(data, centroids):
+    """Index of the closest centroid (L2) for every row"""
+    # argmin |x - c|^2 == argmax x.c - |c|^2 / 2
+    bias = 0.5 * np.sum(centroids * centroids, axis=1)
+    return np.argmax(data @ centroids.T - bias, axis=1)
+
+
+class Float16Codec:
+    """Half-precision rows: 2x smaller, near-lossless for unit vectors"""
+
+    name = "float16"
+
+    def train(self, sample):
+        pass
+
+    def encode(self, rows):
+        return rows.astype(np.float16)
+
+    def scores(self, codes, queries):
+        return queries @ codes.astype(np.float32).T
+
+    def state(self):
+        return {}
+
+    def load_state(self, state):
+        pass
+
+    def nbytes(self):
+        return 0
+
+
+class Int8Codec:
+    """Scalar int8 quantization with one scale per dimension: 4x smaller.
+
+    The scale maps the largest magnitude seen in the training sample to 127;
+    values beyond it are clipped.
+    """
+
+    name = "int8"
+
+    def __init__(self):
+        self.scale = None
+
+    def train(self, sample):
+        scale = np.abs(sample).max(axis=0) / 127.0
+        scale[scale == 0] = 1.0
+        self.scale = scale.astype(np.float32)
+
+    def encode(self, rows):
+        return np.clip(np.rint(rows / self.scale), -127, 127).astype(np.int8)
+
+    def scores(self, codes, queries):
+        # Fold the scales into the queries instead of decoding every row
+        return (queries * self.scale) @ codes.astype(np.float32).T
+
+    def state(self):
+        return {"scale": self.scale}
+
+    def load_state(self, state):
+        self.scale = state["scale"]
+
+    def nbytes(self):
+        return self.scale.nbytes if self.scale is not None else 0
+
+
+class PQCodec:
+    """Product quantization: `m` one-byte codes per row (dim*4/m x smaller).
+
+    Each row is split into m sub-vectors, and each sub-vector is replaced by
+    the nearest of 256 centroids learned for that slice. Queries are scored
+    with asymmetric distance computation: the query stays in float32, its
+    dot product with every sub-centroid goes into a (m, 256) lookup table,
+    and a row's score is the sum of m table lookups.
+    """
+
+    name = "pq"
+
+    def __init__(self, m=16, ksub=256, iters=10, seed=0):
+        self.m = m
+        self.ksub = ksub
+        self.iters = iters
+        self.seed = seed
+        self.codebooks = None  # (m, ksub, dim // m)
+
+    def train(self, sample):
+        dim = sample.shape[1]
+        if dim % self.m:
+            raise ValueError(f"PQ needs dim ({dim}) divisible by m ({self.m})")
+        ksub = min(self.ksub, sample.shape[0])
+        subs = sample.reshape(sample.shape[0], self.m, -1)
+        self.codebooks = np.stack([kmeans(np.ascontiguousarray(subs[:, s]), ksub,
+                                          self.iters, self.seed + s)
+                                   for s in range(self.m)])
+
+    def encode(self, rows):
+        subs = rows.reshape(rows.shape[0], self.m, -1)
+        codes = np.empty((rows.shape[0], self.m), dtype=np.uint8)
+        for s in range(self.m):
+            codes[:, s] = nearest_centroid(subs[:, s], self.codebooks[s])
+        return codes
+
+    def scores(self, codes, queries):
+        # Lookup tables (queries, m, ksub): query slice . sub-centroid
+        tables = np.einsum("qsd,skd->qsk", queries.reshape(queries.shape[0], self.m, -1),
+                           self.codebooks)
+        columns = np.ascontiguousarray(codes.T)
+        scores = np.zeros((queries.shape[0], codes.shape[0]), dtype=np.float32)
+        for s in range(self.m):
+            scores += np.take(tables[:, s], columns[s], axis=1)
+        return scores
+
+    def state(self):
+        return {"codebooks": self.codebooks}
+
+    def load_state(self, state):
+        self.codebooks = state["codebooks"]
+        self.m = self.codebooks.shape[0]
+
+    def nbytes(self):
+        return self.codebooks.nbytes if self.codebooks is not None else 0
+
+
+CODECS = {"float16": Float16Codec, "int8": Int8Codec, "pq": PQCodec}
+
+
+class CompressedIndex:
+    """Search over compressed copies of a VectorStore's rows.
+
+    Keeps one code per row (float16, int8 with per-dimension scales, or PQ
+    bytes) in RAM and scores queries against the codes. The best
+    `rerank` candidates are then re-scored exactly with the store's float32
+    rows, which for a PersistentVectorStore are read from the memory-mapped
+    file only for those candidates. rerank=0 returns the approximate scores.
+
+    Like IVFIndex it follows the store: sync() encodes appended rows, and
+    the codec is retrained once the store grows by `retrain_factor`.
+    """
+
+    def __init__(self, store, codec="pq", rerank=50, pq_m=16, min_train_size=1024,
+                 retrain_factor=4.0, train_sample=16384, seed=0):
+        if codec not in CODECS:
+            raise ValueError(f"Unknown codec: {codec}")
+        self.store = store
+        self.codec_name = codec
+        self.codec = PQCodec(m=pq_m, seed=seed) if codec == "pq" else CODECS[codec]()
+        self.rerank = rerank
+        self.min_train_size = min_train_size
+        self.retrain_factor = retrain_factor
+        self.train_sample = train_sample
+        self.seed = seed
+        self.codes = None
+        self._trained_size = 0
+
+    @property
+    def is_trained(self):
+        return self.codes is not None
+
+    def memory_bytes(self):
+        """RAM held by codes and codec parameters"""
+        if self.codes is None:
+            return 0
+        return self.codes.nbytes + self.codec.nbytes()
+
+    def train(self):
+        """(Re)train the codec on the current store and encode every row"""
+        data = self.store.embeddings
+        n = data.shape[0]
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(n, self.train_sample)
+        sample = np.asarray(data[np.sort(rng.choice(n, size=sample_size, replace=False))])
+        self.codec.train(sample)
+        self.codes = self._encode(data)
+        self._trained_size = n
+
+    def _encode(self, rows, chunk=65536):
+        return np.concatenate([self.codec.encode(np.asarray(rows[start:start + chunk]))
+                               for start in range(0, rows.shape[0], chunk)])
+
+    def sync(self):
+        """Bring the codes up to date with rows appended to the store"""
+        n = len(self.store)
+        if not self.is_trained:
+            if n >= self.min_train_size:
+                self.train()
+            return
+        if n >= self._trained_size * self.retrain_factor:
+            self.train()
+            return
+        start = self.codes.shape[0]
+        if n > start:
+            self.codes = np.concatenate([self.codes, self._encode(self.store.embeddings[start:n])])
+
+    def search(self, query_embedding, top_k=5, rerank=None, candidates=None):
+        """Approximate search, returns [(doc_id, score)] like VectorStore.search"""
+        query_flat = np.asarray(query_embedding, dtype=np.float32).flatten()
+        return self.search_many(query_flat[None, :], top_k=top_k, rerank=rerank,
+                                candidates=candidates)[0]
+
+    def search_many(self, query_embeddings, top_k=5, rerank=None, chunk_elements=1 << 24,
+                    candidates=None, chunk_rows=8192):
+        """Score several queries against the codes, then re-rank exactly.
+
+        `candidates` (sorted row IDs) restricts scoring to those rows.
+        Codes are decoded `chunk_rows` at a time, so scoring never holds a
+        float32 copy of the whole corpus.
+        """
+        self.sync()
+        if not self.is_trained:
+            # Too small to be worth compressing: exact search is cheap
+            return self.store.search_many(query_embeddings, top_k=top_k, candidates=candidates)
+
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = normalize_rows(queries.reshape(queries.shape[0], -1))
+        rerank = self.rerank if rerank is None else rerank
+        shortlist = max(top_k, rerank)
+
+        codes, ids = self.codes, None
+        mask = self.store.live_mask()
+        if candidates is not None:
+            ids = np.asarray(candidates, dtype=np.int64)
+            if mask is not None:
+                ids = ids[mask[ids]]
+            codes, mask = codes[ids], None
+        if codes.shape[0] == 0:
+            return [[] for _ in range(queries.shape[0])]
+
+        results = []
+        step = max(1, chunk_elements // codes.shape[0])
+        for start in range(0, queries.shape[0], step):
+            block = queries[start:start + step]
+            scores = np.empty((block.shape[0], codes.shape[0]), dtype=np.float32)
+            for row in range(0, codes.shape[0], chunk_rows):
+                scores[:, row:row + chunk_rows] = self.codec.scores(codes[row:row + chunk_rows],
+                                                                    block)
+            if mask is not None:
+                scores[:, ~mask] = -np.inf
+            for query, row in zip(block, scores):
+                best = np.asarray([i for i in top_k_indices(row, shortlist) if row[i] != -np.inf],
+                                  dtype=np.int64)
+                doc_ids = best if ids is None else ids[best]
+                if rerank and best.shape[0]:
+                    order = np.argsort(doc_ids)
+                    doc_ids = doc_ids[order]
+                    exact = self.store.embeddings[doc_ids] @ query
+                    results.append([(int(doc_ids[i]), float(exact[i]))
+                                    for i in top_k_indices(exact, top_k)])
+                else:
+                    results.append([(int(d), float(row[i]))
+                                    for d, i in zip(doc_ids[:top_k], best[:top_k])])
+        return results
+
+    def save(self, path):
+        """Write codes and codec parameters atomically to an .npz file"""
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, codes=self.codes, trained_size=self._trained_size,
+                 **self.codec.state())
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Restore saved codes; rows added since are handled by sync()"""
+        with np.load(path) as data:
+            codes = data["codes"]
+            if codes.shape[0] > len(self.store):
+                raise ValueError(f"{path} covers more rows than the store holds")
+            self.codec.load_state(data)
+            self.codes = codes
+            self._trained_size = int(data["trained_size"])
@@ -0,0 +1,92 @@
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+
+def _lock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+    else:
+        f.seek(0)
+        while True:
+            try:
+                msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+                return
+            except OSError:  # LK_LOCK gives up after ~10s; keep waiting
+                pass
+
+
+def _unlock(f):
+    if fcntl is not None:
+        fcntl.flock(f.fileno(), fcntl.LOCK_UN)
+    else:
+        f.seek(0)
+        msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+class FileLock:
+    """Exclusive inter-process lock on a file, shared by this process's threads.
+
+    Acquires nest and are counted for the whole process, not per thread:
+    the first takes the OS lock (waiting while another process holds it)
+    and the last release drops it. Serializing threads within the process
+    is left to the caller. The OS drops the lock if the process dies.
+
+    `on_acquire` runs whenever the OS lock is taken, before any other
+    thread gets past acquire() (e.g. to reload state other processes
+    changed while the lock was free).
+    """
+
+    def __init__(self, path, on_acquire=None):
+        self.path = path
+        self.on_acquire = on_acquire
+        self._depth = 0
+        self._file = None
+        self._mutex = threading.Lock()
+
+    def acquire(self):
+        """Take the lock; returns True if this call took the OS lock"""
+        with self._mutex:
+            if self._depth == 0:
+                f = open(self.path, "a+b")
+                try:
+                    _lock(f)
+                except BaseException:
+                    f.close()
+                    raise
+                self._file = f
+                if self.on_acquire is not None:
+                    try:
+                        self.on_acquire()
+                    except BaseException:
+                        self._file = None
+                        _unlock(f)
+                        f.close()
+                        raise
+            self._depth += 1
+            return self._depth == 1
+
+    def release(self):
+        with self._mutex:
+            if self._depth == 0:
+                raise RuntimeError(f"{self.path} is not locked")
+            self._depth -= 1
+            if self._depth == 0:
+                _unlock(self._file)
+                self._file.close()
+                self._file = None
+
+    @property
+    def held(self):
+        return self._depth > 0
+
+    def __enter__(self):
+        self.acquire()
+        return self
+
+    def __exit__(self, *exc):
+        self.release()
@@ -0,0 +1,162 @@
+import os
+
+import numpy as np
+
+from storage.vector_store import normalize_rows, top_k_indices
+
+
+def spherical_kmeans(data, k, iters=10, seed=0, chunk=65536):
+    """Cluster normalized rows by cosine similarity, returns (k, dim) centroids"""
+    rng = np.random.default_rng(seed)
+    centroids = data[rng.choice(data.shape[0], size=k, replace=False)].copy()
+    for _ in range(iters):
+        assign = assign_nearest(data, centroids, chunk)
+        order = np.argsort(assign, kind="stable")
+        counts = np.bincount(assign, minlength=k)
+        sums = np.zeros_like(centroids)
+        nonempty = counts > 0
+        starts = np.concatenate([[0], np.cumsum(counts)[:-1]])
+        sums[nonempty] = np.add.reduceat(data[order], starts[nonempty], axis=0)
+        empty = counts == 0
+        if empty.any():
+            # Re-seed empty clusters from random points
+            sums[empty] = data[rng.choice(data.shape[0], size=int(empty.sum()))]
+        centroids = normalize_rows(sums)
+    return centroids
+
+
+def assign_nearest(data, centroids, chunk=65536):
+    """Index of the most similar centroid for every row"""
+    assign = np.empty(data.shape[0], dtype=np.int64)
+    for start in range(0, data.shape[0], chunk):
+        block = np.asarray(data[start:start + chunk])
+        assign[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+    return assign
+
+
+class IVFIndex:
+    """Inverted-file approximate index over a VectorStore.
+
+    Rows are grouped into `nlist` clusters by a spherical k-means coarse
+    quantizer. A query scores the centroids, then only the rows in the
+    `nprobe` closest lists. Raising nprobe trades latency for recall.
+
+    The index keeps row IDs only and reads vectors from the store, so it
+    works on top of a memory-mapped PersistentVectorStore. Rows appended to
+    the store are picked up by sync(); the quantizer is retrained once the
+    store has grown by `retrain_factor` since the last training.
+    """
+
+    def __init__(self, store, nlist=None, nprobe=8, min_train_size=1024,
+                 retrain_factor=4.0, kmeans_iters=10, seed=0):
+        self.store = store
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.retrain_factor = retrain_factor
+        self.kmeans_iters = kmeans_iters
+        self.seed = seed
+        self.centroids = None
+        self.assignments = np.empty(0, dtype=np.int64)
+        self._lists = []
+        self._trained_size = 0
+
+    @property
+    def is_trained(self):
+        return self.centroids is not None
+
+    def _pick_nlist(self, n):
+        if self.nlist:
+            return min(self.nlist, n)
+        return max(1, min(int(4 * np.sqrt(n)), n // 39))
+
+    def train(self):
+        """(Re)build the coarse quantizer from the current store contents"""
+        data = self.store.embeddings
+        n = data.shape[0]
+        k = self._pick_nlist(n)
+        rng = np.random.default_rng(self.seed)
+        sample_size = min(n, k * 40)
+        sample = np.asarray(data[np.sort(rng.choice(n, size=sample_size, replace=False))])
+        self.centroids = spherical_kmeans(sample, k, self.kmeans_iters, self.seed)
+        self.assignments = assign_nearest(data, self.centroids)
+        self._trained_size = n
+        self._rebuild_lists()
+
+    def _rebuild_lists(self):
+        order = np.argsort(self.assignments, kind="stable")
+        bounds = np.searchsorted(self.assignments[order],
+                                 np.arange(self.centroids.shape[0] + 1))
+        self._lists = [order[bounds[i]:bounds[i + 1]]
+                       for i in range(self.centroids.shape[0])]
+
+    def sync(self):
+        """Bring the index up to date with rows appended to the store"""
+        n = len(self.store)
+        if not self.is_trained:
+            if n >= self.min_train_size:
+                self.train()
+            return
+        if n >= self._trained_size * self.retrain_factor:
+            self.train()
+            return
+        start = self.assignments.shape[0]
+        if n <= start:
+            return
+        new_ids = np.arange(start, n)
+        new_assign = assign_nearest(self.store.embeddings[start:n], self.centroids)
+        self.assignments = np.concatenate([self.assignments, new_assign])
+        for list_id in np.unique(new_assign):
+            self._lists[list_id] = np.concatenate(
+                [self._lists[list_id], new_ids[new_assign == list_id]])
+
+    def search(self, query_embedding, top_k=5, nprobe=None, candidates=None):
+        """Approximate search, returns [(doc_id, score)] like VectorStore.search
+
+        `candidates` (sorted row IDs) restricts results to those rows.
+        """
+        self.sync()
+        if not self.is_trained:
+            # Too small to be worth clustering: exact search is cheap
+            query_flat = np.asarray(query_embedding, dtype=np.float32).flatten()
+            return self.store.search_many(query_flat[None, :], top_k=top_k,
+                                          candidates=candidates)[0]
+
+        query_flat = np.asarray(query_embedding, dtype=np.float32).flatten()
+        query = normalize_rows(query_flat[None, :])[0]
+
+        nprobe = min(nprobe or self.nprobe, self.centroids.shape[0])
+        probe = top_k_indices(self.centroids @ query, nprobe)
+        rows = np.concatenate([self._lists[i] for i in probe])
+        mask = self.store.live_mask()
+        if candidates is not None:
+            allowed = np.zeros(len(self.store), dtype=bool)
+            allowed[candidates] = True
+            mask = allowed if mask is None else mask & allowed
+        if mask is not None:
+            rows = rows[mask[rows]]
+        if rows.shape[0] == 0:
+            return []
+        rows.sort()
+
+        scores = self.store.embeddings[rows] @ query
+        best = top_k_indices(scores, top_k)
+        return [(int(rows[i]), float(scores[i])) for i in best]
+
+    def save(self, path):
+        """Write centroids and row assignments atomically to an .npz file"""
+        tmp_path = path + ".tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, assignments=self.assignments,
+                 trained_size=self._trained_size)
+        os.replace(tmp_path, path)
+
+    def load(self, path):
+        """Restore a saved quantizer; rows added since are handled by sync()"""
+        with np.load(path) as data:
+            assignments = data["assignments"]
+            if assignments.shape[0] > len(self.store):
+                raise ValueError(f"{path} covers more rows than the store holds")
+            self.centroids = data["centroids"]
+            self.assignments = assignments
+            self._trained_size = int(data["trained_size"])
+        self._rebuild_lists()
@@ -0,0 +1,264 @@
+import contextlib
+import hashlib
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+MANIFEST_FILE = "manifest.json"
+
+
+def file_hash(path, chunk_size=1 << 20):
+    """sha256 of a file's bytes"""
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def image_hash(image, salt=""):
+    """sha256 of an image's pixels (PIL image or uint8 array), plus `salt`"""
+    pixels = np.ascontiguousarray(np.asarray(image))
+    digest = hashlib.sha256(str(pixels.shape).encode())
+    digest.update(pixels.data)
+    digest.update(salt.encode("utf-8"))
+    return digest.hexdigest()
+
+
+class IndexManifest:
+    """Content-hash manifest stored next to a persistent index.
+
+    For every ingested source (a PDF or an image directory) it records the
+    source hash and, per page, the page content hash and its row in the
+    store. Ingestion uses it to skip unchanged pages and to find the stale
+    rows of modified or deleted sources.
+
+    While a source is being updated the manifest records the store size at
+    the start ("pending"), so rows appended by an interrupted run can be
+    removed the next time the index opens.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.reload()
+
+    def reload(self):
+        """Re-read the manifest, e.g. after another process updated it"""
+        self.sources = {}
+        self.pending = None
+        if os.path.exists(self.path):
+            with open(self.path) as f:
+                data = json.load(f)
+            self.sources = data.get("sources", {})
+            self.pending = data.get("pending")
+
+    def save(self):
+        tmp_path = self.path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"version": 1, "sources": self.sources, "pending": self.pending}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self.path)
+
+    def doc_ids(self):
+        """Every store row referenced by the manifest"""
+        return {page["doc_id"] for source in self.sources.values()
+                for page in source["pages"].values() if page["doc_id"] is not None}
+
+    def recover(self, store):
+        """Remove rows left behind by an interrupted update"""
+        if self.pending is None:
+            return 0
+        referenced = self.doc_ids()
+        orphans = [i for i in range(self.pending["rows"], len(store))
+                   if i not in referenced and i not in store.deleted]
+        if orphans:
+            store.remove(orphans)
+        self.pending = None
+        self.save()
+        return len(orphans)
+
+    def is_current(self, source, source_hash, options=None):
+        """Was this source indexed with this hash (and the same options)?"""
+        entry = self.sources.get(source)
+        return (entry is not None and source_hash is not None and entry["hash"] == source_hash
+                and entry.get("options") == options)
+
+    def prune_missing(self, store):
+        """Drop sources whose file or directory no longer exists"""
+        missing = [s for s in self.sources if not os.path.exists(s)]
+        stale = {page["doc_id"] for s in missing for page in self.sources[s]["pages"].values()
+                 if page["doc_id"] is not None}
+        for source in missing:
+            del self.sources[source]
+        if stale:
+            store.remove(sorted(stale))
+        if missing:
+            self.save()
+        return len(stale)
+
+
+class SourceUpdate:
+    """Incrementally re-index one source's pages.
+
+    Call index() with batches of (key, content_hash, image, metadata);
+    pages whose hash is unchanged keep their existing row, the rest are
+    encoded. commit() removes rows of replaced or vanished pages and saves
+    the manifest. Safe to call index() from several threads.
+
+    With a `fingerprinter` (processors.page_fingerprint.PageFingerprinter)
+    changed pages are checked before encoding: blank pages get no row, and
+    a near-duplicate of a page with a row of its own is linked to that row
+    ("duplicate_of" in the manifest) instead of being encoded again.
+    Fingerprints are kept in memory, so only pages passed to this update
+    with an image (not None) can be linked to.
+
+    The index lock (SearchEngine.index_lock) is held from the start of the
+    update until commit(), so no other process appends in between.
+    """
+
+    def __init__(self, engine, source, source_hash, fingerprinter=None, options=None):
+        self._locked = contextlib.ExitStack()
+        self._locked.enter_context(engine.index_lock())
+        self.engine = engine
+        self.manifest = engine.manifest
+        self.source = source
+        self.source_hash = source_hash
+        self.options = options
+        self.fingerprinter = fingerprinter
+        self.previous = self.manifest.sources.get(source, {}).get("pages", {})
+        self.pages = {}
+        self.fingerprints = {}  # key -> fingerprint of pages with a row of their own
+        self.skipped = 0
+        self.encoded = 0
+        self.linked = 0
+        self.blank = 0
+        self.removed = 0
+        self.encode_seconds = 0.0
+        self._lock = threading.Lock()
+        self.manifest.pending = {"source": source, "rows": len(engine.store)}
+        self.manifest.save()
+
+    def index(self, items):
+        """Index changed pages from a batch, returns doc IDs in input order
+        (None for blank pages)"""
+        doc_ids = [None] * len(items)
+        todo, kept = [], []
+        with self._lock:
+            for position, (key, content_hash, image, metadata) in enumerate(items):
+                old = self.previous.get(key)
+                if old and old["hash"] == content_hash:
+                    self.pages[key] = old
+                    doc_ids[position] = old["doc_id"]
+                    if image is not None and old["doc_id"] is not None and "duplicate_of" not in old:
+                        kept.append(position)
+                    self.skipped += 1
+                else:
+                    todo.append(position)
+        prints, links = {}, {}
+        if self.fingerprinter is not None:
+            prints = {p: self.fingerprinter.fingerprint(items[p][2]) for p in kept + todo}
+            with self._lock:
+                # Unchanged pages are link targets for this run's changed ones
+                self.fingerprints.update((items[p][0], prints[p]) for p in kept)
+            if todo:
+                todo, links = self._deduplicate(items, todo, prints, doc_ids)
+        if todo:
+            self.engine.encoder.model  # load the model first: it is not encode time
+            start = time.perf_counter()
+            new_ids = self.engine.index_images([items[p][2] for p in todo],
+                                               [items[p][3] for p in todo])
+            seconds = time.perf_counter() - start
+            with self._lock:
+                self.encode_seconds += seconds
+                for position, doc_id in zip(todo, new_ids):
+                    key, content_hash = items[position][:2]
+                    self.pages[key] = {"hash": content_hash, "doc_id": doc_id}
+                    if position in prints:
+                        self.fingerprints[key] = prints[position]
+                    doc_ids[position] = doc_id
+                    self.encoded += 1
+        if links:
+            with self._lock:
+                for position, target in links.items():
+                    key, content_hash = items[position][:2]
+                    self.pages[key] = {"hash": content_hash, "doc_id": doc_ids[target],
+                                       "duplicate_of": items[target][0]}
+                    doc_ids[position] = doc_ids[target]
+        return doc_ids
+
+    def _deduplicate(self, items, todo, prints, doc_ids):
+        """Settle blank and near-duplicate pages among `todo`.
+
+        Returns the positions still to encode, and links from positions
+        that duplicate another page of this batch to that page's position.
+        """
+        encode, links, batch = [], {}, {}
+        with self._lock:
+            for position in todo:
+                key, content_hash = items[position][:2]
+                value = prints[position]
+                if self.fingerprinter.is_blank(value):
+                    self.pages[key] = {"hash": content_hash, "doc_id": None, "blank": True}
+                    self.blank += 1
+                    continue
+                target = self.fingerprinter.match(value, self.fingerprints)
+                if target is not None:
+                    doc_ids[position] = self.pages[target]["doc_id"]
+                    self.pages[key] = {"hash": content_hash, "doc_id": doc_ids[position],
+                                       "duplicate_of": target}
+                    self.linked += 1
+                    continue
+                target = self.fingerprinter.match(value, batch)
+                if target is not None:
+                    links[position] = target
+                    self.linked += 1
+                    continue
+                batch[position] = value
+                encode.append(position)
+        return encode, links
+
+    def commit(self):
+        with self._locked:
+            self._commit()
+
+    def _commit(self):
+        # A link whose page was re-encoded or dropped in this run follows it
+        # to its current row, and is checked again on the next run
+        for key, page in list(self.pages.items()):
+            if "duplicate_of" not in page:
+                continue
+            target = self.pages.get(page["duplicate_of"])
+            doc_id = target["doc_id"] if target else None
+            if doc_id != page["doc_id"]:
+                self.pages[key] = {**page, "hash": None, "doc_id": doc_id}
+        current = {page["doc_id"] for page in self.pages.values()}
+        stale = {page["doc_id"] for page in self.previous.values()
+                 if page["doc_id"] is not None and page["doc_id"] not in current}
+        if stale:
+            self.engine.store.remove(sorted(stale))
+        self.removed = len(stale)
+        entry = {"hash": self.source_hash, "pages": self.pages}
+        if self.options is not None:
+            entry["options"] = self.options
+        self.manifest.sources[self.source] = entry
+        self.manifest.pending = None
+        self.manifest.save()
+
+    def saved_seconds(self):
+        """Encode time the skipped blank and duplicate pages would have cost,
+        at this run's average per encoded page"""
+        if not self.encoded:
+            return 0.0
+        return self.encode_seconds / self.encoded * (self.linked + self.blank)
+
+    def summary(self):
+        summary = f"♻️  {self.skipped} unchanged page(s) skipped, {self.encoded} encoded, "
+        if self.fingerprinter is not None:
+            summary += f"{self.linked} near-duplicate(s) linked, {self.blank} blank skipped"
+            saved = self.saved_seconds()
+            summary += f" (~{saved:.1f}s encoding saved), " if saved else ", "
+        return summary + f"{self.removed} stale removed"
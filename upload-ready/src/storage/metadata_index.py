@@ -0,0 +1,84 @@
+import os
+
+import numpy as np
+
+DEFAULT_FIELDS = ("source", "page", "filename")
+
+
+def field_value(metadata, field):
+    """Value of a metadata field; "filename" falls back to basename(path)"""
+    if field in metadata:
+        return metadata[field]
+    if field == "filename" and "path" in metadata:
+        return os.path.basename(metadata["path"])
+    return None
+
+
+def _in_range(value, low, high):
+    try:
+        return (value is not None and (low is None or value >= low)
+                and (high is None or value <= high))
+    except TypeError:
+        return False  # e.g. a string page label against numeric bounds
+
+
+class MetadataIndex:
+    """Per-field inverted indexes over a VectorStore's metadata.
+
+    Maps each value of an indexed field to the rows that carry it, so a
+    filter turns into a sorted array of candidate row IDs before any
+    scoring happens. `fields` are indexed up front; any other field is
+    indexed the first time a filter uses it. Rows appended to the store are
+    picked up by sync().
+
+    A filter is a dict of field -> condition, all of which must match:
+        "a.pdf"                  equal to the value
+        ["a.pdf", "b.pdf"]       any of the values
+        {"min": 3, "max": 10}    inclusive range (either bound optional)
+    """
+
+    def __init__(self, store, fields=DEFAULT_FIELDS):
+        self.store = store
+        self.postings = {field: {} for field in fields}
+        self._synced = {field: 0 for field in fields}
+
+    def sync(self, fields=None):
+        """Index rows appended to the store since the last sync"""
+        n = len(self.store)
+        for field in fields or list(self.postings):
+            postings = self.postings.setdefault(field, {})
+            start = self._synced.get(field, 0)
+            for doc_id in range(start, n):
+                value = field_value(self.store.metadata[doc_id], field)
+                try:
+                    postings.setdefault(value, []).append(doc_id)
+                except TypeError:
+                    pass  # unhashable values (lists, dicts) are not indexed
+            self._synced[field] = n
+
+    def _rows(self, field, condition):
+        postings = self.postings[field]
+        if isinstance(condition, dict):
+            low, high = condition.get("min"), condition.get("max")
+            keys = [value for value in postings if _in_range(value, low, high)]
+        elif isinstance(condition, (list, tuple, set)):
+            keys = condition
+        else:
+            keys = [condition]
+        rows = [np.asarray(postings[key], dtype=np.int64) for key in keys if key in postings]
+        if not rows:
+            return np.empty(0, dtype=np.int64)
+        return np.unique(np.concatenate(rows))
+
+    def candidates(self, filter):
+        """Sorted row IDs matching every condition in `filter`"""
+        if not filter:
+            raise ValueError("filter must name at least one field")
+        self.sync(list(filter))
+        result = None
+        for field, condition in filter.items():
+            rows = self._rows(field, condition)
+            result = rows if result is None else np.intersect1d(result, rows, assume_unique=True)
+            if result.shape[0] == 0:
+                break
+        return result
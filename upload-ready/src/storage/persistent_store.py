@@ -0,0 +1,186 @@
+import json
+import os
+
+import numpy as np
+
+from storage.vector_store import VectorStore
+
+EMBEDDINGS_FILE = "embeddings.f32"
+METADATA_FILE = "metadata.jsonl"
+HEADER_FILE = "index.json"
+FORMAT_VERSION = 1
+
+
+def _fsync_write(path, offset, data):
+    """Write bytes at offset and make sure they reach the disk"""
+    mode = "r+b" if os.path.exists(path) else "w+b"
+    with open(path, mode) as f:
+        f.seek(offset)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+
+def _truncate(path, size):
+    """Drop anything past `size` bytes (left behind by an interrupted append)"""
+    if os.path.exists(path) and os.path.getsize(path) > size:
+        with open(path, "r+b") as f:
+            f.truncate(size)
+
+
+def _discard_uncommitted(path):
+    """Truncate an index directory's data files to its header's sizes.
+
+    Returns the header, or None if nothing was committed yet.
+    """
+    header_path = os.path.join(path, HEADER_FILE)
+    if not os.path.exists(header_path):
+        return None
+    with open(header_path) as f:
+        header = json.load(f)
+    _truncate(os.path.join(path, EMBEDDINGS_FILE), header["count"] * (header["dim"] or 0) * 4)
+    _truncate(os.path.join(path, METADATA_FILE), header["metadata_bytes"])
+    return header
+
+
+class PersistentVectorStore(VectorStore):
+    """VectorStore backed by an on-disk index directory.
+
+    Layout:
+        embeddings.f32  raw normalized float32 rows, memory-mapped read-only
+        metadata.jsonl  one JSON object per row
+        index.json      header with dim, committed row count, byte sizes and
+                        removed row IDs
+
+    Appends write the data files first and then atomically replace the
+    header, so a crash mid-append leaves the previous index intact. Bytes
+    past the committed sizes are never read; the next append overwrites
+    them and discard_uncommitted() drops them. Writers in several
+    processes must take turns and refresh() before writing
+    (SearchEngine.index_lock does both).
+    """
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+        self._metadata_bytes = 0
+        self._header_mtime = None
+        os.makedirs(path, exist_ok=True)
+        self._load()
+
+    def _file(self, name):
+        return os.path.join(self.path, name)
+
+    def _read_header(self):
+        header_path = self._file(HEADER_FILE)
+        if not os.path.exists(header_path):
+            return None
+        self._header_mtime = os.stat(header_path).st_mtime_ns
+        with open(header_path) as f:
+            header = json.load(f)
+        if header.get("version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported index version in {header_path}")
+        return header
+
+    def _load(self):
+        header = self._read_header()
+        if header is not None:
+            self.dim = header["dim"]
+            self._size = header["count"]
+            self._metadata_bytes = header["metadata_bytes"]
+            self.deleted = set(header.get("deleted", []))
+
+        # Only the committed bytes: another process may be mid-append
+        self.metadata = []
+        if self._size:
+            with open(self._file(METADATA_FILE), "rb") as f:
+                data = f.read(self._metadata_bytes)
+            self.metadata = [json.loads(line) for line in data.splitlines()]
+        self._map()
+
+    def refresh(self, force=False):
+        """Pick up rows committed by another process since this one opened.
+
+        For long-running readers (e.g. the search daemon) and for writers
+        that just took the index lock. The header is only re-read when
+        its mtime changed, unless `force` (mtimes are too coarse to tell
+        commits milliseconds apart). Returns True if anything changed.
+        """
+        header_path = self._file(HEADER_FILE)
+        if not os.path.exists(header_path):
+            return False
+        if not force and os.stat(header_path).st_mtime_ns == self._header_mtime:
+            return False
+        header = self._read_header()
+        if header["count"] > self._size:
+            with open(self._file(METADATA_FILE), "rb") as f:
+                f.seek(self._metadata_bytes)
+                data = f.read(header["metadata_bytes"] - self._metadata_bytes)
+            self.metadata.extend(json.loads(line) for line in data.splitlines())
+        self.dim = header["dim"]
+        self._size = header["count"]
+        self._metadata_bytes = header["metadata_bytes"]
+        self.deleted = set(header.get("deleted", []))
+        self._map()
+        return True
+
+    def discard_uncommitted(self):
+        """Truncate the data files to the committed rows.
+
+        Drops what an interrupted append left behind. Only while holding
+        the index's write lock: otherwise those bytes may belong to an
+        append in progress.
+        """
+        _discard_uncommitted(self.path)
+
+    def _map(self):
+        """Memory-map the committed rows (pages are read on demand)"""
+        if self._size == 0:
+            self._matrix = None
+            return
+        self._matrix = np.memmap(self._file(EMBEDDINGS_FILE), dtype=np.float32,
+                                 mode="r", shape=(self._size, self.dim))
+
+    def _commit(self, count, metadata_bytes):
+        header = {
+            "version": FORMAT_VERSION,
+            "dim": self.dim,
+            "count": count,
+            "metadata_bytes": metadata_bytes,
+            "deleted": sorted(self.deleted),
+        }
+        tmp_path = self._file(HEADER_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(header, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._file(HEADER_FILE))
+        self._header_mtime = os.stat(self._file(HEADER_FILE)).st_mtime_ns
+
+    def add_many(self, embeddings, metadatas):
+        """Append a batch to disk and commit it, returns their IDs"""
+        if len(embeddings) != len(metadatas):
+            raise ValueError("embeddings and metadatas must have the same length")
+        if len(embeddings) == 0:
+            return []
+
+        rows = self._prepare(embeddings)
+        lines = "".join(json.dumps(m) + "\n" for m in metadatas).encode("utf-8")
+
+        _fsync_write(self._file(EMBEDDINGS_FILE), self._size * self.dim * 4, rows.tobytes())
+        _fsync_write(self._file(METADATA_FILE), self._metadata_bytes, lines)
+
+        start = self._size
+        count = start + rows.shape[0]
+        self._commit(count, self._metadata_bytes + len(lines))
+
+        self._size = count
+        self._metadata_bytes += len(lines)
+        self.metadata.extend(metadatas)
+        self._map()
+        return list(range(start, count))
+
+    def remove(self, doc_ids):
+        """Mark rows as removed and commit the change to the header"""
+        super().remove(doc_ids)
+        self._commit(self._size, self._metadata_bytes)
@@ -0,0 +1,364 @@
+import heapq
+import json
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from storage.metadata_index import MetadataIndex, _in_range, field_value
+from storage.persistent_store import (HEADER_FILE, PersistentVectorStore, _discard_uncommitted,
+                                      _fsync_write, _truncate)
+
+SHARDS_FILE = "shards.json"
+SHARDS_DIR = "shards"
+IDS_FILE = "ids.i64"
+FORMAT_VERSION = 1
+
+
+class _ShardedMetadata:
+    """store.metadata[doc_id] for a sharded store, opening shards as needed"""
+
+    def __init__(self, store):
+        self.store = store
+
+    def __len__(self):
+        return len(self.store)
+
+    def __getitem__(self, doc_id):
+        shard, local = self.store.locate(doc_id)
+        if shard is None:
+            return {}  # lost in an interrupted append; the row is deleted
+        return self.store.shard(shard).metadata[local]
+
+    def __iter__(self):
+        return (self[doc_id] for doc_id in range(len(self.store)))
+
+
+class ShardedVectorStore:
+    """Store split into independently persisted shards, one per key value.
+
+    Rows are routed by a metadata field (`shard_by`, e.g. "source", so each
+    PDF gets its own shards) and a shard is split once it holds `max_rows`.
+    Each shard is a PersistentVectorStore directory under shards/, plus an
+    ids.i64 file with the global ID of each of its rows. IDs are handed out
+    in append order across shards, so they look like the row positions of a
+    single store to the manifest and search results.
+
+    Opening reads only shards.json, the shard headers and ID files; a
+    shard's metadata and embeddings are loaded the first time a search or
+    lookup touches it. search_many() scores the shards on `workers` threads
+    (numpy releases the GIL in the matrix product) and merges their top-k.
+    A filter on the shard field skips non-matching shards entirely.
+
+    Layout:
+        shards.json           shard_by, max_rows and the key of every shard
+        shards/NNNN/          one PersistentVectorStore per shard + ids.i64
+    """
+
+    def __init__(self, path, shard_by=None, max_rows=None, workers=4):
+        """Open or create a sharded index; shard_by defaults to the existing
+        index's field, or "source" for a new one"""
+        self.path = path
+        self.shard_by = shard_by
+        self.max_rows = max_rows
+        self.workers = max(1, workers)
+        self.keys = []  # shard number -> key value
+        self.dim = None
+        self.deleted = set()
+        self._ids = []  # shard number -> global IDs of its rows
+        self._shard_deleted = {}  # shard number -> global IDs removed from it
+        self._header_mtimes = []
+        self._shard_of = np.empty(0, dtype=np.int32)  # global ID -> shard (-1: none)
+        self._local_of = np.empty(0, dtype=np.int64)  # global ID -> row in its shard
+        self._size = 0
+        self._shards = {}  # opened shards
+        self._indexes = {}  # per-shard MetadataIndex, for filters
+        self._open_lock = threading.Lock()
+        self._pool = None
+        os.makedirs(os.path.join(path, SHARDS_DIR), exist_ok=True)
+        self._load()
+
+    @staticmethod
+    def exists(path):
+        return os.path.exists(os.path.join(path, SHARDS_FILE))
+
+    def _shard_path(self, shard):
+        return os.path.join(self.path, SHARDS_DIR, f"{shard:04d}")
+
+    def _load(self):
+        shards_path = os.path.join(self.path, SHARDS_FILE)
+        if os.path.exists(shards_path):
+            with open(shards_path) as f:
+                header = json.load(f)
+            if header.get("version") != FORMAT_VERSION:
+                raise ValueError(f"Unsupported shard table version in {shards_path}")
+            self.shard_by = self.shard_by or header["shard_by"]
+            if header["shard_by"] != self.shard_by:
+                raise ValueError(f"Index at {self.path} is sharded by {header['shard_by']!r}, "
+                                 f"not {self.shard_by!r}")
+            self.max_rows = header.get("max_rows", self.max_rows)
+            self.keys = header["shards"]
+        elif os.path.exists(os.path.join(self.path, HEADER_FILE)):
+            raise ValueError(f"Index at {self.path} is not sharded")
+        else:
+            self.shard_by = self.shard_by or "source"
+            self._save_table()
+        self._ids = [np.empty(0, dtype=np.int64) for _ in self.keys]
+        self._header_mtimes = [None] * len(self.keys)
+        for shard in range(len(self.keys)):
+            self._scan(shard)
+        self._rebuild()
+
+    def _save_table(self):
+        table = {"version": FORMAT_VERSION, "shard_by": self.shard_by,
+                 "max_rows": self.max_rows, "shards": self.keys}
+        tmp_path = os.path.join(self.path, SHARDS_FILE + ".tmp")
+        with open(tmp_path, "w") as f:
+            json.dump(table, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, os.path.join(self.path, SHARDS_FILE))
+
+    def _scan(self, shard, force=False):
+        """Read a shard's committed row count, removed rows and global IDs.
+
+        Returns True if its header changed since the last scan (always with
+        `force`).
+        """
+        shard_path = self._shard_path(shard)
+        header_path = os.path.join(shard_path, HEADER_FILE)
+        if not os.path.exists(header_path):
+            return False
+        mtime = os.stat(header_path).st_mtime_ns
+        if not force and mtime == self._header_mtimes[shard]:
+            return False
+        self._header_mtimes[shard] = mtime
+        with open(header_path) as f:
+            header = json.load(f)
+        ids = np.fromfile(os.path.join(shard_path, IDS_FILE), dtype=np.int64,
+                          count=header["count"])
+        self._ids[shard] = ids
+        self.dim = self.dim or header["dim"]
+        self._shard_deleted[shard] = {int(ids[i]) for i in header.get("deleted", [])}
+        return True
+
+    def discard_uncommitted(self):
+        """Truncate every shard to its committed rows, under the index's
+        write lock (see PersistentVectorStore.discard_uncommitted)"""
+        for shard in range(len(self.keys)):
+            header = _discard_uncommitted(self._shard_path(shard))
+            if header is not None:
+                _truncate(os.path.join(self._shard_path(shard), IDS_FILE), header["count"] * 8)
+
+    def _rebuild(self):
+        """Global ID -> (shard, row) maps from the shards' ID lists"""
+        size = max((int(ids[-1]) + 1 for ids in self._ids if ids.shape[0]), default=0)
+        shard_of = np.full(size, -1, dtype=np.int32)
+        local_of = np.zeros(size, dtype=np.int64)
+        for shard, ids in enumerate(self._ids):
+            shard_of[ids] = shard
+            local_of[ids] = np.arange(ids.shape[0])
+        self._shard_of, self._local_of, self._size = shard_of, local_of, size
+        # IDs of rows lost to an interrupted append count as removed
+        deleted = set(np.flatnonzero(shard_of < 0).tolist())
+        for removed in self._shard_deleted.values():
+            deleted |= removed
+        self.deleted = deleted
+
+    def refresh(self, force=False):
+        """Pick up shards and rows committed by another process (see
+        PersistentVectorStore.refresh). Returns True if anything changed."""
+        changed = False
+        shards_path = os.path.join(self.path, SHARDS_FILE)
+        with open(shards_path) as f:
+            keys = json.load(f)["shards"]
+        if len(keys) > len(self.keys):
+            extra = len(keys) - len(self.keys)
+            self.keys = keys
+            self._ids.extend(np.empty(0, dtype=np.int64) for _ in range(extra))
+            self._header_mtimes.extend([None] * extra)
+        for shard in range(len(self.keys)):
+            if self._scan(shard, force=force):
+                changed = True
+                if shard in self._shards:
+                    self._shards[shard].refresh(force)
+        if changed:
+            self._rebuild()
+        return changed
+
+    def __len__(self):
+        """Number of global IDs ever handed out"""
+        return self._size
+
+    def count(self):
+        """Number of live (not removed) rows"""
+        return self._size - len(self.deleted)
+
+    def live_mask(self):
+        if not self.deleted:
+            return None
+        mask = np.ones(self._size, dtype=bool)
+        mask[np.fromiter(self.deleted, dtype=np.int64)] = False
+        return mask
+
+    @property
+    def metadata(self):
+        return _ShardedMetadata(self)
+
+    def locate(self, doc_id):
+        """(shard, row in shard) of a global ID; shard is None for lost rows"""
+        shard = int(self._shard_of[doc_id])
+        return (None, None) if shard < 0 else (shard, int(self._local_of[doc_id]))
+
+    def shard(self, shard):
+        """The shard's PersistentVectorStore, opened on first use"""
+        store = self._shards.get(shard)
+        if store is None:
+            with self._open_lock:
+                store = self._shards.get(shard)
+                if store is None:
+                    store = PersistentVectorStore(self._shard_path(shard))
+                    self._shards[shard] = store
+        return store
+
+    def loaded_shards(self):
+        """Numbers of the shards opened so far"""
+        return sorted(self._shards)
+
+    def _key(self, metadata):
+        value = field_value(metadata, self.shard_by)
+        return value if isinstance(value, (str, int, float, bool)) or value is None else str(value)
+
+    def _target(self, key, rows):
+        """Shard for `rows` more rows with this key, creating one if needed"""
+        for shard in range(len(self.keys) - 1, -1, -1):
+            if self.keys[shard] == key:
+                if self.max_rows is None or self._ids[shard].shape[0] + rows <= self.max_rows:
+                    return shard
+                break
+        self.keys.append(key)
+        self._ids.append(np.empty(0, dtype=np.int64))
+        self._header_mtimes.append(None)
+        self._save_table()
+        return len(self.keys) - 1
+
+    def add(self, embedding, metadata):
+        embedding_flat = np.asarray(embedding, dtype=np.float32).flatten()
+        return self.add_many([embedding_flat], [metadata])[0]
+
+    def add_many(self, embeddings, metadatas):
+        """Append a batch, routing each row to its key's shard; returns global IDs.
+
+        One writer at a time is assumed, refreshed beforehand
+        (SearchEngine.index_lock and its store_lock).
+        """
+        if len(embeddings) != len(metadatas):
+            raise ValueError("embeddings and metadatas must have the same length")
+        if len(embeddings) == 0:
+            return []
+        rows = np.asarray(embeddings, dtype=np.float32)
+        rows = rows.reshape(rows.shape[0], -1)
+        groups = {}
+        for position, metadata in enumerate(metadatas):
+            groups.setdefault(self._key(metadata), []).append(position)
+
+        doc_ids = list(range(self._size, self._size + len(metadatas)))
+        for key, positions in groups.items():
+            while positions:
+                chunk = positions if self.max_rows is None else positions[:self.max_rows]
+                positions = positions[len(chunk):]
+                shard = self._target(key, len(chunk))
+                store = self.shard(shard)
+                ids = np.asarray([doc_ids[p] for p in chunk], dtype=np.int64)
+                # IDs first: the shard header commit makes both visible
+                _fsync_write(os.path.join(self._shard_path(shard), IDS_FILE),
+                             len(store) * 8, ids.tobytes())
+                store.add_many(rows[chunk], [metadatas[p] for p in chunk])
+                self._ids[shard] = np.concatenate([self._ids[shard], ids])
+                self._header_mtimes[shard] = store._header_mtime
+                self.dim = store.dim
+        self._rebuild()
+        return doc_ids
+
+    def remove(self, doc_ids):
+        """Mark rows as removed, committing each affected shard's header"""
+        doc_ids = [int(i) for i in doc_ids]
+        if any(i < 0 or i >= self._size for i in doc_ids):
+            raise IndexError("doc_id out of range")
+        by_shard = {}
+        for doc_id in doc_ids:
+            shard, local = self.locate(doc_id)
+            if shard is not None:
+                by_shard.setdefault(shard, []).append(local)
+        for shard, local_ids in by_shard.items():
+            store = self.shard(shard)
+            store.remove(local_ids)
+            self._header_mtimes[shard] = store._header_mtime
+            self._shard_deleted[shard] = {int(self._ids[shard][i]) for i in store.deleted}
+        self.deleted.update(doc_ids)
+
+    def shards_for(self, filter=None):
+        """Shards that may hold rows matching `filter`, and the rest of the
+        filter still to apply inside them"""
+        shards = list(range(len(self.keys)))
+        if not filter or self.shard_by not in filter:
+            return shards, filter
+        condition = filter[self.shard_by]
+        if isinstance(condition, dict):
+            low, high = condition.get("min"), condition.get("max")
+            shards = [s for s in shards if _in_range(self.keys[s], low, high)]
+        elif isinstance(condition, (list, tuple, set)):
+            shards = [s for s in shards if self.keys[s] in condition]
+        else:
+            shards = [s for s in shards if self.keys[s] == condition]
+        rest = {field: c for field, c in filter.items() if field != self.shard_by}
+        return shards, rest or None
+
+    def _shard_candidates(self, shard, filter):
+        index = self._indexes.get(shard)
+        if index is None:
+            index = self._indexes.setdefault(shard, MetadataIndex(self.shard(shard)))
+        return index.candidates(filter)
+
+    def search(self, query_embedding, top_k=5):
+        query_flat = np.asarray(query_embedding, dtype=np.float32).flatten()
+        return self.search_many(query_flat[None, :], top_k=top_k)[0]
+
+    def search_many(self, query_embeddings, top_k=5, candidates=None, filter=None):
+        """Score the shards in parallel and merge their top-k per query.
+
+        `candidates` are sorted global IDs (only their shards are scored);
+        `filter` is a MetadataIndex filter, resolved shard by shard.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = queries.reshape(queries.shape[0], -1)
+        shards, filter = self.shards_for(filter)
+        local = {}
+        if candidates is not None:
+            candidates = np.asarray(candidates, dtype=np.int64)
+            owners = self._shard_of[candidates]
+            shards = [s for s in shards if np.any(owners == s)]
+            local = {s: np.sort(self._local_of[candidates[owners == s]]) for s in shards}
+
+        def score(shard):
+            rows = local.get(shard)
+            if filter:
+                matching = self._shard_candidates(shard, filter)
+                rows = matching if rows is None else np.intersect1d(rows, matching)
+            if rows is not None and rows.shape[0] == 0:
+                return [[] for _ in range(queries.shape[0])]
+            results = self.shard(shard).search_many(queries, top_k=top_k, candidates=rows)
+            ids = self._ids[shard]
+            return [[(int(ids[i]), score) for i, score in r] for r in results]
+
+        if len(shards) > 1 and self.workers > 1:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(self.workers, thread_name_prefix="shard")
+            per_shard = list(self._pool.map(score, shards))
+        else:
+            per_shard = [score(shard) for shard in shards]
+        # Best scores first, ties to the lower ID as in a single store
+        return [heapq.nsmallest(top_k, (hit for results in per_shard for hit in results[q]),
+                                key=lambda hit: (-hit[1], hit[0]))
+                for q in range(queries.shape[0])]
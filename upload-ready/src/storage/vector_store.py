@@ -1,43 +1,159 @@
 import numpy as np
 
+
+def normalize_rows(matrix):
+    """L2-normalize each row of a 2D float32 array (zero rows stay zero)"""
+    norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+    norms[norms == 0] = 1.0
+    return matrix / norms
+
+
+def top_k_indices(scores, top_k):
+    """Indices of the top_k highest scores, best first.
+
+    Uses argpartition so only the selected candidates are sorted. Ties are
+    broken by lower index, matching a stable descending sort.
+    """
+    n = scores.shape[0]
+    k = min(top_k, n)
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    if k < n:
+        candidates = np.argpartition(-scores, k - 1)[:k]
+    else:
+        candidates = np.arange(n)
+    order = np.lexsort((candidates, -scores[candidates]))
+    return candidates[order]
+
+
 class VectorStore:
-    def __init__(self):
-        self.embeddings = []
+    def __init__(self, dim=None, initial_capacity=1024):
+        self.dim = dim
         self.metadata = []
-    
+        self._initial_capacity = max(1, initial_capacity)
+        self._matrix = None  # (capacity, dim) float32, rows L2-normalized
+        self._size = 0
+        self.deleted = set()  # removed row IDs; rows keep their position
+
+    def __len__(self):
+        """Number of rows ever added (IDs are row positions)"""
+        return self._size
+
+    def count(self):
+        """Number of live (not removed) rows"""
+        return self._size - len(self.deleted)
+
+    def live_mask(self):
+        """Boolean mask of live rows, or None when nothing was removed"""
+        if not self.deleted:
+            return None
+        mask = np.ones(self._size, dtype=bool)
+        mask[np.fromiter(self.deleted, dtype=np.int64)] = False
+        return mask
+
+    def remove(self, doc_ids):
+        """Mark rows as removed so search no longer returns them"""
+        doc_ids = [int(i) for i in doc_ids]
+        if any(i < 0 or i >= self._size for i in doc_ids):
+            raise IndexError("doc_id out of range")
+        self.deleted.update(doc_ids)
+
+    @property
+    def embeddings(self):
+        """Normalized embedding matrix of shape (n, dim) - a view, not a copy"""
+        if self._matrix is None:
+            return np.empty((0, self.dim or 0), dtype=np.float32)
+        return self._matrix[:self._size]
+
+    def _reserve(self, extra):
+        """Grow the backing matrix so it can hold `extra` more rows"""
+        needed = self._size + extra
+        if self._matrix is None:
+            capacity = max(self._initial_capacity, needed)
+            self._matrix = np.empty((capacity, self.dim), dtype=np.float32)
+        elif needed > self._matrix.shape[0]:
+            capacity = max(needed, 2 * self._matrix.shape[0])
+            grown = np.empty((capacity, self.dim), dtype=np.float32)
+            grown[:self._size] = self._matrix[:self._size]
+            self._matrix = grown
+
+    def _prepare(self, embeddings):
+        """Stack embeddings into a normalized (n, dim) float32 matrix"""
+        rows = np.asarray(embeddings, dtype=np.float32)
+        rows = rows.reshape(rows.shape[0], -1)
+        if self.dim is None:
+            self.dim = rows.shape[1]
+        elif rows.shape[1] != self.dim:
+            raise ValueError(
+                f"Embedding has {rows.shape[1]} dims, store expects {self.dim}"
+            )
+        return normalize_rows(rows)
+
     def add(self, embedding, metadata):
         """Add embedding with metadata to store"""
         # Flatten any shape to 1D
-        embedding_flat = embedding.flatten()
-        self.embeddings.append(embedding_flat)
-        self.metadata.append(metadata)
-        return len(self.embeddings) - 1
-    
+        embedding_flat = np.asarray(embedding, dtype=np.float32).flatten()
+        return self.add_many([embedding_flat], [metadata])[0]
+
+    def add_many(self, embeddings, metadatas):
+        """Add a batch of embeddings with metadata, returns their IDs"""
+        if len(embeddings) != len(metadatas):
+            raise ValueError("embeddings and metadatas must have the same length")
+        if len(embeddings) == 0:
+            return []
+
+        rows = self._prepare(embeddings)
+        self._reserve(rows.shape[0])
+        start = self._size
+        self._matrix[start:start + rows.shape[0]] = rows
+        self.metadata.extend(metadatas)
+        self._size += rows.shape[0]
+        return list(range(start, self._size))
+
     def add_document(self, embedding, metadata):
         """Alias for add method"""
         return self.add(embedding, metadata)
-    
+
     def search(self, query_embedding, top_k=5):
-        """Search for similar embeddings"""
-        if not self.embeddings:
-            return []
-        
+        """Search for similar embeddings (cosine similarity)"""
         # Flatten query embedding
-        query_flat = query_embedding.flatten()
-        
-        similarities = []
-        for i, emb in enumerate(self.embeddings):
-            # Calculate cosine similarity
-            norm_query = np.linalg.norm(query_flat)
-            norm_emb = np.linalg.norm(emb)
-            
-            if norm_query > 0 and norm_emb > 0:
-                sim = np.dot(query_flat, emb) / (norm_query * norm_emb)
-            else:
-                sim = 0.0
-                
-            similarities.append((i, sim))
-        
-        # Sort by similarity (highest first)
-        similarities.sort(key=lambda x: x[1], reverse=True)
-        return similarities[:top_k]
+        query_flat = np.asarray(query_embedding, dtype=np.float32).flatten()
+        return self.search_many(query_flat[None, :], top_k=top_k)[0]
+
+    def search_many(self, query_embeddings, top_k=5, chunk_elements=1 << 25, candidates=None):
+        """Search several queries with one matrix-matrix product.
+
+        Returns one [(doc_id, score)] list per query. Queries are scored in
+        chunks so the score matrix stays under chunk_elements floats. With
+        `candidates` (sorted row IDs, e.g. from a MetadataIndex filter) only
+        those rows are scored.
+        """
+        queries = np.asarray(query_embeddings, dtype=np.float32)
+        queries = queries.reshape(queries.shape[0], -1)
+        if self._size == 0:
+            return [[] for _ in range(queries.shape[0])]
+
+        # Normalize queries once; rows are already normalized
+        queries = normalize_rows(queries)
+        ids, matrix, removed = None, self.embeddings, None
+        if candidates is not None:
+            ids = np.asarray(candidates, dtype=np.int64)
+            if self.deleted:
+                ids = ids[self.live_mask()[ids]]
+            if ids.shape[0] == 0:
+                return [[] for _ in range(queries.shape[0])]
+            matrix = self.embeddings[ids]
+        elif self.deleted:
+            removed = np.fromiter(self.deleted, dtype=np.int64)
+
+        results = []
+        step = max(1, chunk_elements // matrix.shape[0])
+        for start in range(0, queries.shape[0], step):
+            scores = queries[start:start + step] @ matrix.T
+            if removed is not None:
+                scores[:, removed] = -np.inf
+            for row in scores:
+                best = [i for i in top_k_indices(row, top_k) if row[i] != -np.inf]
+                doc_ids = best if ids is None else ids[best]
+                results.append([(int(d), float(row[i])) for d, i in zip(doc_ids, best)])
+        return results
@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""Writers in two processes (here: two engines on one index) must not
+overwrite each other's rows. Run with pytest."""
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from search_engine import SearchEngine
+from storage.persistent_store import PersistentVectorStore
+
+
+def open_engine(path, **kwargs):
+    engine = SearchEngine(index_path=path, **kwargs)
+    # "Images" are already embeddings, so CLIP is never loaded
+    engine.encoder = SimpleNamespace(model=None, encode_images=lambda images: np.asarray(images))
+    return engine
+
+
+def vectors(n, seed):
+    return np.random.default_rng(seed).standard_normal((n, 8)).astype(np.float32)
+
+
+@pytest.mark.parametrize("shard_by", [None, "source"])
+def test_appends_from_two_engines_keep_both(tmp_path, shard_by):
+    path = str(tmp_path / "index")
+    cli = open_engine(path, shard_by=shard_by)
+    daemon = open_engine(path, shard_by=shard_by)  # opened before the CLI writes
+
+    cli_ids = cli.index_images(vectors(4, 0), [{"source": "a.pdf", "page": i} for i in range(4)])
+    daemon_ids = daemon.index_images(vectors(2, 1), [{"source": "b.png", "page": i} for i in range(2)])
+
+    assert cli_ids == [0, 1, 2, 3]
+    assert daemon_ids == [4, 5]
+    reopened = open_engine(path)
+    assert len(reopened.store) == 6
+    assert [m["source"] for m in reopened.store.metadata] == ["a.pdf"] * 4 + ["b.png"] * 2
+
+
+def test_append_waits_for_update(tmp_path):
+    path = str(tmp_path / "index")
+    cli = open_engine(path)
+    daemon = open_engine(path)
+    update = cli.update_source("a.pdf", "hash")
+
+    done = {}
+    writer = threading.Thread(target=lambda: done.update(ids=daemon.index_images(
+        vectors(2, 1), [{"source": "b.png"}] * 2)), daemon=True)
+    writer.start()
+    time.sleep(0.2)
+    assert writer.is_alive()  # blocked on the index lock
+
+    update.index([(f"page-{i}", f"h{i}", vector, {"source": "a.pdf", "page": i})
+                  for i, vector in enumerate(vectors(3, 0))])
+    update.commit()
+    writer.join(5)
+    assert done["ids"] == [3, 4]
+
+    reopened = open_engine(path)
+    assert reopened.store.count() == 5
+    assert reopened.manifest.pending is None
+
+
+@pytest.mark.parametrize("shard_by", [None, "source"])
+def test_opening_leaves_an_append_in_progress_alone(tmp_path, monkeypatch, shard_by):
+    path = str(tmp_path / "index")
+    cli = open_engine(path, shard_by=shard_by)
+    cli.index_images(vectors(2, 0), [{"source": "a.pdf"}] * 2)
+    opened = []
+    commit = PersistentVectorStore._commit
+
+    def open_before_commit(store, count, metadata_bytes):
+        # Another process opens the index between the append and its commit
+        opened.append(open_engine(path, shard_by=shard_by))
+        commit(store, count, metadata_bytes)
+    monkeypatch.setattr(PersistentVectorStore, "_commit", open_before_commit)
+    added = vectors(3, 1)
+    assert cli.index_images(added, [{"source": "a.pdf"}] * 3) == [2, 3, 4]
+    monkeypatch.undo()
+
+    assert opened[0].store.count() == 2  # saw only what was committed
+    reopened = open_engine(path, shard_by=shard_by)
+    assert reopened.store.count() == 5
+    assert [doc_id for doc_id, _ in reopened.store.search(added[2], top_k=1)] == [4]
+
+
+def _crash_mid_update(path):
+    cli = open_engine(path)
+    update = cli.update_source("a.pdf", "hash")
+    update.index([("page-0", "h0", vectors(1, 0)[0], {"source": "a.pdf"})])
+    os._exit(1)  # dies before commit(); the OS drops the lock
+
+
+def test_interrupted_update_keeps_other_writers_rows(tmp_path):
+    path = str(tmp_path / "index")
+    child = multiprocessing.get_context("spawn").Process(target=_crash_mid_update, args=(path,))
+    child.start()
+    child.join(60)
+    assert child.exitcode == 1
+
+    daemon = open_engine(path)  # recovers the interrupted update
+    assert daemon.store.count() == 0
+    assert daemon.manifest.pending is None
+    assert daemon.index_images(vectors(1, 1), [{"source": "b.png"}]) == [1]
+    assert open_engine(path).store.count() == 1
+
+
+def test_open_engine_recovers_before_appending(tmp_path):
+    path = str(tmp_path / "index")
+    daemon = open_engine(path)  # already running when the CLI crashes
+    child = multiprocessing.get_context("spawn").Process(target=_crash_mid_update, args=(path,))
+    child.start()
+    child.join(60)
+    assert child.exitcode == 1
+
+    assert daemon.index_images(vectors(1, 1), [{"source": "b.png"}]) == [1]
+    assert daemon.manifest.pending is None and daemon.store.deleted == {0}
+    reopened = open_engine(path)
+    assert reopened.store.count() == 1
+    assert [m["source"] for m in reopened.store.metadata] == ["a.pdf", "b.png"]
+    assert reopened.store.deleted == {0}  # the crashed update's row, not the daemon's
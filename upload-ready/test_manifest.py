@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+"""Incremental indexing through the content-hash manifest. Run with pytest."""
+import os
+import sys
+from types import SimpleNamespace
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from search_engine import SearchEngine
+from storage.manifest import file_hash
+
+
+def open_engine(path):
+    engine = SearchEngine(index_path=path)
+    # "Images" are already embeddings, so CLIP is never loaded
+    engine.encoder = SimpleNamespace(model=None, encode_images=lambda images: np.asarray(images))
+    return engine
+
+
+def pages(hashes, source="notes.pdf", seed=0):
+    """index() items for pages 0..n-1 with the given content hashes"""
+    vectors = np.random.default_rng(seed).standard_normal((len(hashes), 8)).astype(np.float32)
+    return [(str(i), h, vectors[i], {"source": source, "page": i + 1})
+            for i, h in enumerate(hashes)]
+
+
+def ingest(engine, items, source="notes.pdf", source_hash="v1", options=None):
+    update = engine.update_source(source, source_hash, options=options)
+    doc_ids = update.index(items)
+    update.commit()
+    return update, doc_ids
+
+
+def test_unchanged_pages_are_skipped(tmp_path):
+    engine = open_engine(str(tmp_path / "index"))
+    _, first = ingest(engine, pages(["a", "b", "c"]))
+
+    update, second = ingest(engine, pages(["a", "b", "c"], seed=1), source_hash="v2")
+
+    assert second == first
+    assert (update.skipped, update.encoded, update.removed) == (3, 0, 0)
+    assert engine.store.count() == 3
+
+
+def test_changed_page_is_replaced(tmp_path):
+    engine = open_engine(str(tmp_path / "index"))
+    _, first = ingest(engine, pages(["a", "b", "c"]))
+
+    update, second = ingest(engine, pages(["a", "B", "c"]), source_hash="v2")
+
+    assert (update.skipped, update.encoded, update.removed) == (2, 1, 1)
+    assert second[0] == first[0] and second[2] == first[2]
+    assert second[1] == 3 and first[1] in engine.store.deleted
+    reopened = open_engine(engine.index_path)
+    assert reopened.store.count() == 3
+    assert reopened.manifest.sources["notes.pdf"]["pages"]["1"] == {"hash": "B", "doc_id": 3}
+
+
+def test_vanished_page_is_removed(tmp_path):
+    engine = open_engine(str(tmp_path / "index"))
+    _, first = ingest(engine, pages(["a", "b", "c"]))
+
+    update, _ = ingest(engine, pages(["a", "b"]), source_hash="v2")
+
+    assert update.removed == 1
+    assert engine.store.deleted == {first[2]}
+    assert set(engine.manifest.sources["notes.pdf"]["pages"]) == {"0", "1"}
+
+
+def test_deleted_source_is_pruned(tmp_path):
+    engine = open_engine(str(tmp_path / "index"))
+    kept, gone = tmp_path / "kept.pdf", tmp_path / "gone.pdf"
+    kept.write_bytes(b"kept")
+    gone.write_bytes(b"gone")
+    ingest(engine, pages(["a", "b"], str(kept)), str(kept), file_hash(kept))
+    _, gone_ids = ingest(engine, pages(["c"], str(gone)), str(gone), file_hash(gone))
+
+    gone.unlink()
+
+    assert engine.prune_missing() == 1
+    assert engine.store.deleted == set(gone_ids)
+    assert list(open_engine(engine.index_path).manifest.sources) == [str(kept)]
+
+
+def test_recovers_interrupted_update(tmp_path):
+    path = str(tmp_path / "index")
+    engine = open_engine(path)
+    _, first = ingest(engine, pages(["a", "b"]))
+    # What a run killed between appending and commit() leaves on disk
+    engine.manifest.pending = {"source": "notes.pdf", "rows": 2}
+    engine.manifest.save()
+    engine.store.add_many(np.ones((2, 8), dtype=np.float32), [{"source": "notes.pdf"}] * 2)
+
+    reopened = open_engine(path)
+
+    assert reopened.manifest.pending is None
+    assert reopened.store.deleted == {2, 3}
+    assert sorted(doc_id for doc_id, _ in reopened.store.search(np.ones(8), top_k=5)) == first
+    # The interrupted run's source keeps its previous pages
+    update, doc_ids = ingest(reopened, pages(["a", "b"]))
+    assert doc_ids == first and update.encoded == 0
+
+
+def test_is_current_compares_options(tmp_path):
+    engine = open_engine(str(tmp_path / "index"))
+    options = {"output": "/out/a", "dpi": 150, "encode_size": 224}
+    ingest(engine, pages(["a"]), options=options)
+
+    assert engine.manifest.is_current("notes.pdf", "v1", options)
+    assert not engine.manifest.is_current("notes.pdf", "v1", {**options, "dpi": 300})
+    assert not engine.manifest.is_current("notes.pdf", "v1", {**options, "output": "/out/b"})
+    assert not engine.manifest.is_current("notes.pdf", "v2", options)
+
+
+def run_cli(monkeypatch, *argv):
+    """Run cli.py with the stub encoder; returns the engine it used"""
+    import cli
+
+    engines = []
+
+    def build_search_engine(index_path, **overrides):
+        engines.append(open_engine(index_path))
+        return engines[-1]
+
+    monkeypatch.setattr(cli, "build_search_engine", build_search_engine)
+    monkeypatch.setattr(sys, "argv", ["cli.py", *argv])
+    cli.main()
+    return engines[-1]
+
+
+def make_pdf(path, n):
+    import fitz
+
+    doc = fitz.open()
+    for i in range(n):
+        doc.new_page(width=200, height=200).insert_text((20, 40 + 20 * i), f"Page {i + 1}")
+    doc.save(path)
+    doc.close()
+
+
+def test_cli_rerenders_unchanged_pdf_for_new_output(tmp_path, monkeypatch):
+    pdf, index = str(tmp_path / "notes.pdf"), str(tmp_path / "index")
+    make_pdf(pdf, 2)
+    common = ["--index", "--index-path", index, "--encode-size", "32"]
+    run_cli(monkeypatch, "process", pdf, "--output", str(tmp_path / "a"), *common)
+
+    # Same options and images on disk: nothing to do
+    engine = run_cli(monkeypatch, "process", pdf, "--output", str(tmp_path / "a"), *common)
+    assert engine.store.count() == 2
+
+    # Another output directory gets its images, and the rows point at them
+    engine = run_cli(monkeypatch, "process", pdf, "--output", str(tmp_path / "b"), *common)
+    assert sorted(os.listdir(tmp_path / "b")) == ["page_000.jpg", "page_001.jpg"]
+    live = [m for i, m in enumerate(engine.store.metadata) if i not in engine.store.deleted]
+    assert sorted(m["path"] for m in live) == [str(tmp_path / "b" / f"page_00{i}.jpg")
+                                              for i in (0, 1)]
+
+    # A new --dpi re-renders the images but keeps the rows
+    before = os.path.getsize(tmp_path / "b" / "page_000.jpg")
+    engine = run_cli(monkeypatch, "process", pdf, "--output", str(tmp_path / "b"),
+                     "--dpi", "300", *common)
+    assert os.path.getsize(tmp_path / "b" / "page_000.jpg") > before
+    assert engine.store.count() == 2 and len(engine.store) == 4
@@ -0,0 +1,133 @@
+#!/usr/bin/env python3
+"""Blank and near-duplicate page detection. Run with pytest."""
+import io
+import os
+import sys
+from types import SimpleNamespace
+
+import fitz
+import numpy as np
+import pytest
+from PIL import Image
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from processors.page_fingerprint import PageFingerprinter, dhash, hamming
+from search_engine import SearchEngine
+
+
+def dense_page(doc, p):
+    """A page of lecture notes; pages differ only in their line numbers"""
+    page = doc.new_page()
+    page.insert_text((72, 60), f"Lecture 0.{p}: circuits and signals", fontsize=18)
+    for line in range(40):
+        page.insert_text((72, 100 + line * 16),
+                         f"{p}-{line} Ohm's law relates voltage, current and resistance.",
+                         fontsize=10)
+    page.draw_rect(fitz.Rect(350, 600, 520, 760), color=(0, 0, 0), width=2)
+
+
+def render(doc, size=None, dpi=150):
+    images = []
+    for page in doc:
+        if size:
+            scale = size / max(page.rect.width, page.rect.height)
+            pix = page.get_pixmap(matrix=fitz.Matrix(scale, scale))
+        else:
+            pix = page.get_pixmap(dpi=dpi)
+        images.append(Image.frombytes("RGB", (pix.width, pix.height), pix.samples))
+    return images
+
+
+def jpeg(image, quality):
+    buffer = io.BytesIO()
+    image.save(buffer, "JPEG", quality=quality)
+    return Image.open(io.BytesIO(buffer.getvalue())).convert("RGB")
+
+
+@pytest.fixture(scope="module")
+def dense_doc():
+    doc = fitz.open()
+    for p in range(5):
+        dense_page(doc, p)
+    yield doc
+    doc.close()
+
+
+@pytest.mark.parametrize("size", [224, None])
+def test_dense_text_pages_are_distinct(dense_doc, size):
+    fingerprinter = PageFingerprinter()
+    prints = [fingerprinter.fingerprint(image) for image in render(dense_doc, size)]
+    # The dHash alone cannot tell these pages apart
+    assert hamming(prints[0][0], [p[0] for p in prints[1:]]).max() <= fingerprinter.max_distance
+
+    for i, fp in enumerate(prints):
+        others = {j: other for j, other in enumerate(prints) if j != i}
+        assert fingerprinter.match(fp, others) is None
+        assert not fingerprinter.is_blank(fp)
+
+
+@pytest.mark.parametrize("quality", [60, 95])
+def test_resaved_page_is_a_duplicate(dense_doc, quality):
+    fingerprinter = PageFingerprinter()
+    images = render(dense_doc)
+    known = {f"page-{i}": fingerprinter.fingerprint(image) for i, image in enumerate(images)}
+
+    resaved = fingerprinter.fingerprint(jpeg(images[2], quality))
+    assert fingerprinter.match(resaved, known) == "page-2"
+
+
+def test_blank_pages():
+    fingerprinter = PageFingerprinter()
+    white = np.full((400, 300, 3), 255, dtype=np.uint8)
+    noise = np.random.default_rng(0).integers(-10, 11, white.shape)
+    scan = np.clip(white.astype(int) - 30 + noise, 0, 255).astype(np.uint8)
+    doc = fitz.open()
+    doc.new_page().insert_text((300, 400), "x", fontsize=12)
+    letter = render(doc)[0]
+
+    assert fingerprinter.is_blank(fingerprinter.fingerprint(white))
+    assert fingerprinter.is_blank(fingerprinter.fingerprint(scan))
+    assert not fingerprinter.is_blank(fingerprinter.fingerprint(letter))
+
+
+def test_dhash_ignores_resolution(dense_doc):
+    small, large = render(dense_doc, 224)[0], render(dense_doc)[0]
+    assert hamming(dhash(small), [dhash(large)])[0] <= 4
+
+
+def test_update_links_duplicates_and_skips_blanks(tmp_path, dense_doc):
+    engine = SearchEngine(index_path=str(tmp_path / "index"))
+    encoded = []
+
+    def encode_images(images):
+        encoded.extend(images)
+        return np.random.default_rng(len(encoded)).standard_normal((len(images), 8))
+
+    engine.encoder = SimpleNamespace(model=None, encode_images=encode_images)
+    pages = render(dense_doc, 224)
+    blank = Image.new("RGB", pages[0].size, "white")
+    # A slide repeated in a deck renders to the same pixels
+    images = [pages[0], pages[1], render(dense_doc, 224)[0], blank, pages[2]]
+
+    update = engine.update_source("deck.pdf", "v1", PageFingerprinter())
+    doc_ids = update.index([(str(i), f"h{i}", image, {"page": i})
+                            for i, image in enumerate(images)])
+    update.commit()
+
+    assert (update.encoded, update.linked, update.blank) == (3, 1, 1)
+    assert len(encoded) == 3 and engine.store.count() == 3
+    assert doc_ids[2] == doc_ids[0] and doc_ids[3] is None
+    assert len(set(doc_ids[:2] + doc_ids[4:])) == 3
+    entry = engine.manifest.sources["deck.pdf"]["pages"]
+    assert entry["2"]["duplicate_of"] == "0" and entry["3"]["blank"]
+
+    # Re-running with page 0 changed: its duplicate follows it to the new row
+    update = engine.update_source("deck.pdf", "v2", PageFingerprinter())
+    changed = images[:]
+    changed[0] = pages[3]
+    doc_ids = update.index([(str(i), "h0-new" if i == 0 else f"h{i}", image, {"page": i})
+                            for i, image in enumerate(changed)])
+    update.commit()
+    entry = engine.manifest.sources["deck.pdf"]["pages"]
+    assert entry["2"]["doc_id"] == doc_ids[0] and entry["2"]["hash"] is None
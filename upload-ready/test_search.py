@@ -3,10 +3,11 @@ import os
 import sys
 sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
 
+from config.settings import settings
 from search_engine import SearchEngine
 
-# Create search engine
-search_engine = SearchEngine()
+# Create search engine over the persistent index
+search_engine = SearchEngine(index_path=settings.index_path, model_name=settings.clip_model_name)
 
 # Test search
 queries = [
@@ -21,9 +22,14 @@ queries = [
 ]
 
 print("🔍 Testing search queries...")
-for query in queries:
+# All queries are encoded in one batch and scored with one matrix product
+all_results = search_engine.search_many(queries, top_k=2)
+for query, results in zip(queries, all_results):
     print(f"\nQuery: '{query}'")
-    results = search_engine.search(query, top_k=2)
     print(f"  Found {len(results)} results")
     for i, result in enumerate(results):
         print(f"  {i+1}. Score: {result['score']:.3f}, Page: {result['metadata'].get('page', 'N/A')}")
+
+# Repeated queries are served from the embedding cache
+search_engine.search("Resistor ", top_k=2)
+print(f"\nQuery cache: {search_engine.cache_stats()}")
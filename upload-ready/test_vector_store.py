@@ -0,0 +1,161 @@
+#!/usr/bin/env python3
+"""Vector store search against the original per-row loop. Run with pytest."""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'src'))
+
+from storage.vector_store import VectorStore
+from storage.persistent_store import PersistentVectorStore
+from storage.sharded_store import ShardedVectorStore
+from storage.metadata_index import MetadataIndex
+
+
+def loop_search(embeddings, query, top_k):
+    """The store's search before it was vectorized"""
+    similarities = []
+    for i, emb in enumerate(embeddings):
+        norm_query, norm_emb = np.linalg.norm(query), np.linalg.norm(emb)
+        if norm_query > 0 and norm_emb > 0:
+            sim = np.dot(query, emb) / (norm_query * norm_emb)
+        else:
+            sim = 0.0
+        similarities.append((i, sim))
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return similarities[:top_k]
+
+
+def corpus(n=200, dim=16, seed=0):
+    rng = np.random.default_rng(seed)
+    embeddings = rng.standard_normal((n, dim)).astype(np.float32)
+    embeddings[[5, 50]] = 0  # zero vectors score 0
+    embeddings[[7, 70, 140]] = embeddings[3] * [[1], [2], [0.5]]  # ties with row 3
+    metadatas = [{"source": f"doc{i % 4}.pdf", "page": i // 4 + 1} for i in range(n)]
+    return embeddings, metadatas
+
+
+def assert_same(results, expected):
+    assert [doc_id for doc_id, _ in results] == [doc_id for doc_id, _ in expected]
+    np.testing.assert_allclose([s for _, s in results], [s for _, s in expected], atol=1e-5)
+
+
+@pytest.mark.parametrize("top_k", [1, 5, 200, 500])
+def test_matches_loop_search(top_k):
+    embeddings, metadatas = corpus()
+    store = VectorStore(initial_capacity=8)  # grows several times
+    for embedding, metadata in zip(embeddings, metadatas):
+        store.add(embedding, metadata)
+    queries = np.vstack([np.random.default_rng(1).standard_normal((6, 16)),
+                         embeddings[3], np.zeros(16)]).astype(np.float32)
+
+    for query, results in zip(queries, store.search_many(queries, top_k=top_k)):
+        assert_same(results, loop_search(embeddings, query, top_k))
+    assert_same(store.search(queries[0], top_k), loop_search(embeddings, queries[0], top_k))
+
+
+def test_ties_keep_insertion_order():
+    embeddings, _ = corpus()
+    store = VectorStore()
+    store.add_many(embeddings, [{}] * len(embeddings))
+
+    results = store.search(embeddings[3], top_k=4)
+
+    assert [doc_id for doc_id, _ in results] == [3, 7, 70, 140]
+    # A zero query ties everything at 0: lowest IDs first, as the loop did
+    assert [doc_id for doc_id, _ in store.search(np.zeros(16), top_k=3)] == [0, 1, 2]
+
+
+def test_persistent_store_reopens(tmp_path):
+    embeddings, metadatas = corpus()
+    store = PersistentVectorStore(str(tmp_path))
+    store.add_many(embeddings[:120], metadatas[:120])
+    store.add_many(embeddings[120:], metadatas[120:])
+    store.remove([3, 7])
+    query = embeddings[3]
+
+    reopened = PersistentVectorStore(str(tmp_path))
+
+    assert len(reopened) == 200 and reopened.count() == 198
+    assert reopened.metadata == metadatas
+    assert reopened.deleted == {3, 7}
+    expected = [hit for hit in loop_search(embeddings, query, 10) if hit[0] not in (3, 7)][:8]
+    assert_same(reopened.search(query, top_k=8), expected)
+
+
+def test_persistent_store_drops_uncommitted_tail(tmp_path):
+    embeddings, metadatas = corpus()
+    store = PersistentVectorStore(str(tmp_path))
+    store.add_many(embeddings[:10], metadatas[:10])
+    # Bytes of an append that crashed before its header commit
+    with open(tmp_path / "embeddings.f32", "ab") as f:
+        f.write(embeddings[10:12].tobytes())
+    with open(tmp_path / "metadata.jsonl", "a") as f:
+        f.write('{"source": "half"')
+
+    reopened = PersistentVectorStore(str(tmp_path))
+
+    assert len(reopened) == 10 and reopened.metadata == metadatas[:10]
+    size = os.path.getsize(tmp_path / "embeddings.f32")
+    assert size == 12 * 16 * 4  # opening leaves the tail alone
+    reopened.discard_uncommitted()
+    assert os.path.getsize(tmp_path / "embeddings.f32") == 10 * 16 * 4
+    assert reopened.add_many(embeddings[10:12], metadatas[10:12]) == [10, 11]
+    assert PersistentVectorStore(str(tmp_path)).metadata == metadatas[:12]
+
+
+def test_filter_candidates():
+    embeddings, metadatas = corpus()
+    store = VectorStore()
+    store.add_many(embeddings, metadatas)
+    index = MetadataIndex(store)
+
+    cases = [
+        ({"source": "doc1.pdf"}, lambda m: m["source"] == "doc1.pdf"),
+        ({"source": ["doc0.pdf", "doc2.pdf"]}, lambda m: m["source"] in ("doc0.pdf", "doc2.pdf")),
+        ({"page": {"min": 3, "max": 10}}, lambda m: 3 <= m["page"] <= 10),
+        ({"page": {"min": 48}}, lambda m: m["page"] >= 48),
+        ({"source": "doc3.pdf", "page": {"max": 2}},
+         lambda m: m["source"] == "doc3.pdf" and m["page"] <= 2),
+        ({"source": "missing.pdf"}, lambda m: False),
+    ]
+    for filter, keep in cases:
+        expected = [i for i, m in enumerate(metadatas) if keep(m)]
+        candidates = index.candidates(filter)
+        assert candidates.tolist() == expected
+        results = store.search_many(embeddings[:1], top_k=5, candidates=candidates)[0]
+        assert_same(results, [hit for hit in loop_search(embeddings, embeddings[0], 200)
+                              if hit[0] in expected][:5])
+
+    # Rows added later are picked up
+    store.add(embeddings[0], {"source": "doc1.pdf", "page": 99})
+    index.sync()
+    assert index.candidates({"source": "doc1.pdf"})[-1] == 200
+
+
+@pytest.mark.parametrize("max_rows,workers", [(None, 4), (16, 4), (16, 1)])
+def test_sharded_search_matches_flat(tmp_path, max_rows, workers):
+    embeddings, metadatas = corpus()
+    flat = VectorStore()
+    flat.add_many(embeddings, metadatas)
+    sharded = ShardedVectorStore(str(tmp_path), max_rows=max_rows, workers=workers)
+    for start in range(0, 200, 30):  # interleaves sources across appends
+        sharded.add_many(embeddings[start:start + 30], metadatas[start:start + 30])
+    queries = np.vstack([embeddings[[3, 0, 5]],
+                         np.random.default_rng(2).standard_normal((4, 16))]).astype(np.float32)
+
+    assert len(sharded.keys) > 1
+    for expected, results in zip(flat.search_many(queries, top_k=10),
+                                 sharded.search_many(queries, top_k=10)):
+        assert_same(results, expected)
+
+    filter = {"source": ["doc1.pdf", "doc2.pdf"], "page": {"min": 5, "max": 30}}
+    candidates = MetadataIndex(flat).candidates(filter)
+    for expected, results in zip(flat.search_many(queries, top_k=10, candidates=candidates),
+                                 sharded.search_many(queries, top_k=10, filter=filter)):
+        assert_same(results, expected)
+
+    reopened = ShardedVectorStore(str(tmp_path), workers=workers)
+    assert_same(reopened.search(queries[3], top_k=10), flat.search(queries[3], top_k=10))